@@ -0,0 +1,152 @@
+import enum
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.aquamonitor.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+FORMATS = {
+    JSON: "json",
+    COLUMNAR_JSON: "columnar",
+    ARROW_STREAM: "arrow",
+}
+
+def negotiate(request: Request) -> str:
+    """
+    Pick "json", "columnar" or "arrow" from the Accept header; the first
+    supported type listed wins and anything else falls back to JSON
+    """
+    for part in request.headers.get("accept", "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in FORMATS:
+            fmt = FORMATS[media_type]
+            if fmt == "arrow" and pa is None:
+                raise HTTPException(
+                    status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                    detail="Arrow output requires pyarrow on the server"
+                )
+            return fmt
+    return "json"
+
+def to_columns(rows: Sequence[Sequence[Any]], names: Sequence[str]) -> Dict[str, List[Any]]:
+    """Transpose result rows into one list per column"""
+    if not rows:
+        return {name: [] for name in names}
+    return dict(zip(names, (list(values) for values in zip(*rows))))
+
+def json_converter(column: Column) -> Optional[Callable[[Any], Any]]:
+    python_type = _python_type(column)
+    if python_type is datetime:
+        return datetime.isoformat
+    if python_type is uuid.UUID:
+        return str
+    if python_type is enum.Enum:
+        return lambda value: value.value
+    return None
+
+def _python_type(column: Column):
+    if isinstance(column.type, DateTime):
+        return datetime
+    if isinstance(column.type, (Float, Integer, Boolean)):
+        return column.type.python_type
+    if getattr(column.type, "as_uuid", False):
+        return uuid.UUID
+    if getattr(column.type, "enum_class", None) is not None:
+        return enum.Enum
+    return str
+
+def columnar_json_response(
+    columns: Dict[str, List[Any]], table_columns: Sequence[Column], row_count: int
+) -> Response:
+    """
+    One array per column. Columns with no values are left out and columns
+    that are mostly null are sent as {"index": [...], "values": [...]}.
+    """
+    body = {}
+    for column in table_columns:
+        values = columns[column.name]
+        present = [i for i, value in enumerate(values) if value is not None]
+        if not present:
+            continue
+
+        convert = json_converter(column)
+        if len(present) * 2 < row_count:
+            picked = [values[i] for i in present]
+            if convert is not None:
+                picked = [convert(value) for value in picked]
+            body[column.name] = {"index": present, "values": picked}
+        else:
+            if convert is not None:
+                values = [None if value is None else convert(value) for value in values]
+            body[column.name] = values
+
+    return Response(
+        content=json.dumps({"row_count": row_count, "columns": body}, separators=(",", ":")),
+        media_type=COLUMNAR_JSON
+    )
+
+def arrow_type(column: Column):
+    python_type = _python_type(column)
+    if python_type is datetime:
+        return pa.timestamp("us")
+    if python_type is float:
+        return pa.float64()
+    if python_type is int:
+        return pa.int64()
+    if python_type is bool:
+        return pa.bool_()
+    return pa.string()
+
+def arrow_record_batch(columns: Dict[str, List[Any]], table_columns: Sequence[Column]):
+    """One Arrow record batch holding every column"""
+    arrays, fields = [], []
+    for column in table_columns:
+        values = columns[column.name]
+        python_type = _python_type(column)
+        if python_type is uuid.UUID:
+            values = [None if value is None else str(value) for value in values]
+        elif python_type is enum.Enum:
+            values = [None if value is None else value.value for value in values]
+        column_type = arrow_type(column)
+        arrays.append(pa.array(values, type=column_type))
+        fields.append(pa.field(column.name, column_type))
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+def arrow_response(columns: Dict[str, List[Any]], table_columns: Sequence[Column]) -> Response:
+    """Arrow IPC stream with one record batch holding every column"""
+    return arrow_batch_response(arrow_record_batch(columns, table_columns))
+
+def arrow_batch_response(batch) -> Response:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM)
+
+def series_arrow_response(series: Dict[str, Dict[str, List[Any]]]) -> Response:
+    """Downsampled series as one long (metric, timestamp, value) record batch"""
+    metrics, timestamps, values = [], [], []
+    for metric, points in series.items():
+        metrics += [metric] * len(points["values"])
+        timestamps += points["timestamps"]
+        values += points["values"]
+
+    batch = pa.RecordBatch.from_arrays(
+        [
+            pa.array(metrics, type=pa.string()).dictionary_encode(),
+            pa.array(timestamps, type=pa.timestamp("us")),
+            pa.array(values, type=pa.float64()),
+        ],
+        names=["metric", "timestamp", "value"]
+    )
+    return arrow_batch_response(batch)
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List
 import os
 
 class Settings(BaseSettings):
@@ -33,6 +34,94 @@ class Settings(BaseSettings):
     # Redis Configuration
     redis_url: str = "redis://localhost:6379"
 
+    # Read Cache (farms, ponds)
+    cache_enabled: bool = True
+    cache_backend: str = "memory"  # "memory" (per worker) or "redis" (shared via redis_url)
+    cache_ttl_seconds: int = 300
+    cache_max_entries: int = 10000
+    etag_memory_window_seconds: int = 5  # ETag lifetime with the per-worker memory backend
+
+    # Sensor Ingestion
+    ingest_batch_max_rows: int = 50000
+    ingest_copy_threshold: int = 1000
+    ingest_stream_chunk_rows: int = 5000
+    ingest_stream_max_line_bytes: int = 65536
+    ingest_stream_max_errors: int = 100
+    ingest_binary_max_bytes: int = 8 * 1024 * 1024
+    ingest_buffer_enabled: bool = True
+    ingest_buffer_max_rows: int = 50000
+    ingest_buffer_flush_rows: int = 1000
+    ingest_buffer_flush_interval_ms: int = 200
+    ingest_buffer_wait_durable: bool = False
+
+    # Latest Reading Cache
+    latest_cache_ttl_ms: int = 1000  # how long another worker's write may go unseen
+    latest_negative_ttl_ms: int = 60000  # how long "no reading yet" is remembered for a pond
+
+    # Chart Series Downsampling
+    series_max_points: int = 1000
+    series_oversample: int = 4  # input points read per output point, at most
+
+    # Sensor Data Export
+    export_chunk_rows: int = 10000  # rows per server-side cursor fetch / Parquet row group
+
+    # Sensor Data Partitioning
+    sensor_partition_interval: str = "month"  # "month" or "week"
+    sensor_partition_premake: int = 3  # future partitions kept ready
+    sensor_retention_days: int = 0  # 0 keeps every partition
+    sensor_retention_action: str = "detach"  # "detach" or "drop"
+    sensor_partition_maintenance_hours: int = 6
+
+    # Threshold Alerts
+    threshold_reload_seconds: int = 60  # picks up threshold changes made by other workers
+    alert_hysteresis_fraction: float = 0.05  # clear band as a fraction of the threshold's range
+    alert_hysteresis_bands: Dict[str, float] = {}  # absolute clear band per parameter, e.g. {"dissolved_oxygen": 0.3}
+    alert_cooldown_minutes: int = 30  # a condition returning within this reopens the previous alert
+    alert_renotify_check_minutes: int = 5  # how often a persisting alert re-checks users' alert_frequency
+    alert_counter_reconcile_minutes: int = 60  # recount of open alerts repairing the trigger-maintained counters
+    backtest_chunk_rows: int = 100000  # rows per columnar chunk when backtesting thresholds
+
+    # Sensor Offline Detection
+    heartbeat_enabled: bool = True
+    heartbeat_default_interval_seconds: int = 300  # 0 watches only devices/ponds in heartbeat_intervals
+    heartbeat_missed_intervals: int = 3  # silent intervals before a device is offline
+    heartbeat_tick_seconds: int = 5  # longest sleep of the watcher
+    heartbeat_reload_seconds: int = 60
+    heartbeat_seed_hours: int = 24  # devices seen this recently are watched from startup
+
+    # Feeding and Maintenance Reminders (from Pond.feeding_schedule)
+    schedule_enabled: bool = True
+    schedule_timezone: str = "UTC"  # for schedules that do not name a time zone
+    schedule_batch_window_seconds: int = 60  # reminders due this close together fire in one batch
+
+    # Anomaly Detection (EWMA per pond parameter)
+    anomaly_detection_enabled: bool = True
+    anomaly_parameters: List[str] = [
+        "temperature", "ph_level", "dissolved_oxygen", "turbidity",
+        "ammonia_level", "nitrite_level", "nitrate_level",
+    ]
+    anomaly_alpha: float = 0.05  # EWMA weight of each new reading
+    anomaly_z_threshold: float = 4.0
+    anomaly_rate_z_threshold: float = 6.0
+    anomaly_max_rates: Dict[str, float] = {}  # absolute rate limit per parameter, units per minute
+    anomaly_warmup_readings: int = 30  # readings before a stream is scored
+    anomaly_min_rate_seconds: int = 60  # shortest interval a rate is computed over
+    anomaly_clear_fraction: float = 0.25  # score must fall below 1 - this to clear
+    anomaly_snapshot_path: str = "anomaly_state.npz"  # base name, one file per process; "" disables snapshots
+    anomaly_snapshot_seconds: int = 300
+
+    # Live Telemetry (WebSocket / SSE)
+    telemetry_max_pending: int = 256  # queued messages per subscriber before the oldest is dropped
+    telemetry_heartbeat_seconds: int = 15
+
+    # Line Protocol Listener (direct device ingestion over TCP/UDP)
+    line_listener_enabled: bool = False
+    line_listener_host: str = "0.0.0.0"
+    line_listener_tcp_port: int = 8094
+    line_listener_udp_port: int = 8094
+    line_listener_max_line_bytes: int = 4096
+    line_listener_user_id: str = "6d8a9b4c-5e6f-7a8b-9c0d-1e2f3a4b5c6d"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the string form of `parts`"""
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """
+    A 304 response when the request's If-None-Match matches `etag`,
+    otherwise None
+    """
+    if etag is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" and "x" match each other
+    bare = etag[2:]
+    if "*" in tags or any(tag.removeprefix("W/") == bare for tag in tags):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+def tag(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
@@ -0,0 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+
+from .config import settings
+from .services.ingestion_buffer import ingestion_buffer
+from .services.line_listener import line_listener
+from .services.partitions import partition_manager
+from .services.pubsub import telemetry_hub
+from .services.alert_state import alert_tracker
+from .services.alert_counters import alert_counter_service
+from .services.anomalies import anomaly_detector
+from .services.heartbeats import heartbeat_monitor
+from .services.schedules import pond_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services with the app and drain them on shutdown"""
+    # Startup
+    telemetry_hub.bind_loop(asyncio.get_running_loop())
+    alert_tracker.bind_loop(asyncio.get_running_loop())
+    if settings.anomaly_detection_enabled:
+        anomaly_detector.claim_snapshot("api")
+    await partition_manager.start()
+    await alert_counter_service.start()
+    if settings.heartbeat_enabled:
+        await heartbeat_monitor.start()
+    if settings.schedule_enabled:
+        await pond_scheduler.start()
+    if settings.ingest_buffer_enabled or settings.line_listener_enabled:
+        await ingestion_buffer.start()
+    if settings.line_listener_enabled:
+        await line_listener.start()
+    
+    yield
+    
+    # Shutdown: stop accepting device traffic, then flush buffered readings
+    await line_listener.stop()
+    await ingestion_buffer.stop()
+    await pond_scheduler.stop()
+    await heartbeat_monitor.stop()
+    await alert_counter_service.stop()
+    await partition_manager.stop()
+    anomaly_detector.snapshot()
@@ -0,0 +1,44 @@
+"""
+Standalone entry point for the TCP/UDP line-protocol listener:
+
+    python -m app.listener
+"""
+
+import asyncio
+
+from .config import settings
+from .services.ingestion_buffer import ingestion_buffer
+from .services.line_listener import line_listener
+from .services.partitions import partition_manager
+
+# Derived-state services register their ingest hooks on import
+from .services import rollups, latest_readings, thresholds  # noqa: F401
+from .services.anomalies import anomaly_detector
+from .services.heartbeats import heartbeat_monitor
+from .services.alert_state import alert_tracker
+
+async def serve():
+    """Run the listener and the ingestion buffer until cancelled"""
+    alert_tracker.bind_loop(asyncio.get_running_loop())
+    if settings.anomaly_detection_enabled:
+        anomaly_detector.claim_snapshot("listener")
+    # The API process runs periodic maintenance; make sure the current
+    # partition exists before the first reading arrives here
+    await partition_manager.maintain()
+    await ingestion_buffer.start()
+    await line_listener.start()
+    if settings.heartbeat_enabled:
+        await heartbeat_monitor.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await heartbeat_monitor.stop()
+        await line_listener.stop()
+        await ingestion_buffer.stop()
+        anomaly_detector.snapshot()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
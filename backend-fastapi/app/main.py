@@ -5,8 +5,9 @@ import uvicorn
 
 from .database import engine, get_db
 from .models import Base
-from .routers import auth, farms, ponds, sensors, alerts
+from .routers import auth, farms, ponds, sensors, sensor_ingest, alerts, thresholds, heartbeats, metrics, telemetry
 from .config import settings
+from .lifespan import lifespan
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -16,7 +17,8 @@ app = FastAPI(
     description="Smart and Responsive Management of Fish Ponds",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -33,7 +36,12 @@ app.include_router(auth.router, prefix="/api/v1")
 app.include_router(farms.router, prefix="/api/v1")
 app.include_router(ponds.router, prefix="/api/v1")
 app.include_router(sensors.router, prefix="/api/v1")
+app.include_router(sensor_ingest.router, prefix="/api/v1")
 app.include_router(alerts.router, prefix="/api/v1")
+app.include_router(thresholds.router, prefix="/api/v1")
+app.include_router(heartbeats.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
+app.include_router(telemetry.router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
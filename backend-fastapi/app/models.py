@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Float, Index, Table, UniqueConstraint, DDL, event, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -70,6 +70,21 @@ class PondStatus(enum.Enum):
     MAINTENANCE = "MAINTENANCE"
     CLOSED = "CLOSED"
 
+# Measured columns of sensor_data, in a fixed order shared by the wire
+# formats, rollups and threshold evaluation
+SENSOR_METRICS = (
+    "temperature",
+    "ph_level",
+    "dissolved_oxygen",
+    "turbidity",
+    "ammonia_level",
+    "nitrite_level",
+    "nitrate_level",
+    "salinity",
+    "water_level",
+    "flow_rate",
+)
+
 # Models
 class User(Base):
     __tablename__ = "users"
@@ -200,17 +215,84 @@ class SensorData(Base):
     flow_rate = Column(Float)    # L/min
     value = Column(Float)
     unit = Column(String(20))
-    timestamp = Column(DateTime, default=func.now())
+    timestamp = Column(DateTime, primary_key=True, default=func.now())
     quality = Column(String(20))  # GOOD, WARNING, CRITICAL
     device_id = Column(String(50))
     location = Column(String(255))  # GPS coordinates or zone identifier
     meta_data = Column(Text)  # JSON string
     created_at = Column(DateTime, default=func.now())
 
+    # Range-partitioned by timestamp; partitions are managed by
+    # services/partitions.py. The partition key must be part of the primary key.
+    # (pond_id, timestamp DESC, id DESC) serves keyset pagination per pond,
+    # (timestamp DESC, id DESC) unfiltered listings (a merge of the partitions'
+    # index scans rather than a sort of every partition) and time range scans.
+    __table_args__ = (
+        Index("idx_sensor_data_pond_id_timestamp_id", pond_id, timestamp.desc(), id.desc()),
+        Index("idx_sensor_data_timestamp_id", timestamp.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
     # Relationships
     pond = relationship("Pond", back_populates="sensor_data")
     user = relationship("User", back_populates="sensor_data")
 
+# Last reading of each pond, upserted on ingest (services/latest_readings.py)
+class PondLatestReading(Base):
+    __tablename__ = "pond_latest_readings"
+
+    pond_id = Column(UUID(as_uuid=True), ForeignKey("ponds.id"), primary_key=True)
+    id = Column(UUID(as_uuid=True), nullable=False)  # sensor_data.id of the reading
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    sensor_type = Column(Enum(SensorType))
+    temperature = Column(Float)
+    ph_level = Column(Float)
+    dissolved_oxygen = Column(Float)
+    turbidity = Column(Float)
+    ammonia_level = Column(Float)
+    nitrite_level = Column(Float)
+    nitrate_level = Column(Float)
+    salinity = Column(Float)
+    water_level = Column(Float)
+    flow_rate = Column(Float)
+    value = Column(Float)
+    unit = Column(String(20))
+    timestamp = Column(DateTime, nullable=False)
+    quality = Column(String(20))
+    device_id = Column(String(50))
+    location = Column(String(255))
+    meta_data = Column(Text)
+    created_at = Column(DateTime)
+
+# Rollups of sensor_data per pond and time bucket, maintained incrementally
+# on ingest (services/rollups.py). Resolution name -> bucket width in seconds.
+ROLLUP_RESOLUTIONS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+def _rollup_table(resolution: str) -> Table:
+    metric_columns = []
+    for metric in SENSOR_METRICS:
+        metric_columns += [
+            Column(f"{metric}_min", Float),
+            Column(f"{metric}_max", Float),
+            Column(f"{metric}_sum", Float),
+            Column(f"{metric}_count", Integer, nullable=False, default=0),
+            Column(f"{metric}_last", Float),
+            Column(f"{metric}_last_ts", DateTime),
+        ]
+    return Table(
+        f"sensor_rollups_{resolution}",
+        Base.metadata,
+        Column("pond_id", UUID(as_uuid=True), ForeignKey("ponds.id"), primary_key=True),
+        Column("bucket", DateTime, primary_key=True),
+        *metric_columns,
+    )
+
+SENSOR_ROLLUP_TABLES = {resolution: _rollup_table(resolution) for resolution in ROLLUP_RESOLUTIONS}
+
 class Alert(Base):
     __tablename__ = "alerts"
 
@@ -233,11 +315,78 @@ class Alert(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    # Serves keyset pagination of a pond's alerts; the partial indexes keep
+    # open/unread lookups and counter reconciliation off resolved history
+    __table_args__ = (
+        Index("idx_alerts_pond_id_created_at_id", pond_id, created_at.desc(), id.desc()),
+        Index("idx_alerts_unresolved", farm_id, pond_id, severity, postgresql_where=text("NOT is_resolved")),
+        Index("idx_alerts_unread", farm_id, pond_id, severity, postgresql_where=text("NOT is_read")),
+    )
+
     # Relationships
     farm = relationship("Farm", back_populates="alerts")
     pond = relationship("Pond", back_populates="alerts")
     user = relationship("User", back_populates="alerts")
 
+# Unresolved/unread alert counts per pond and severity, kept up to date by
+# statement-level triggers on alerts in the same transaction as every insert,
+# update and delete (services/alert_counters.py reconciles them periodically).
+# No foreign keys: rows of deleted ponds drop to zero and are reconciled away.
+class AlertCounter(Base):
+    __tablename__ = "alert_counters"
+
+    farm_id = Column(UUID(as_uuid=True), primary_key=True)
+    pond_id = Column(UUID(as_uuid=True), primary_key=True)
+    severity = Column(String(20), primary_key=True)
+    unresolved = Column(Integer, nullable=False, default=0)
+    unread = Column(Integer, nullable=False, default=0)
+
+def _counter_delta(source: str, sign: str) -> str:
+    return (
+        f"SELECT farm_id, pond_id, severity::text AS severity, "
+        f"{sign}count(*) FILTER (WHERE NOT is_resolved) AS unresolved, "
+        f"{sign}count(*) FILTER (WHERE NOT is_read) AS unread "
+        f"FROM {source} GROUP BY 1, 2, 3"
+    )
+
+def _counter_upsert(*deltas: str) -> str:
+    # Net change per counter row, applied in key order so concurrent
+    # statements lock counter rows consistently
+    return f"""
+        INSERT INTO alert_counters AS c (farm_id, pond_id, severity, unresolved, unread)
+        SELECT farm_id, pond_id, severity, sum(unresolved), sum(unread)
+        FROM ({" UNION ALL ".join(deltas)}) AS delta
+        GROUP BY farm_id, pond_id, severity
+        HAVING sum(unresolved) <> 0 OR sum(unread) <> 0
+        ORDER BY farm_id, pond_id, severity
+        ON CONFLICT (farm_id, pond_id, severity) DO UPDATE
+        SET unresolved = c.unresolved + EXCLUDED.unresolved, unread = c.unread + EXCLUDED.unread;"""
+
+ALERT_COUNTER_DDL = [
+    f"""
+CREATE OR REPLACE FUNCTION count_alerts() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN{_counter_upsert(_counter_delta("new_rows", ""))}
+    ELSIF TG_OP = 'UPDATE' THEN{_counter_upsert(_counter_delta("new_rows", ""), _counter_delta("old_rows", "-"))}
+    ELSE{_counter_upsert(_counter_delta("old_rows", "-"))}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS count_alerts_insert ON alerts",
+    "DROP TRIGGER IF EXISTS count_alerts_update ON alerts",
+    "DROP TRIGGER IF EXISTS count_alerts_delete ON alerts",
+    "CREATE TRIGGER count_alerts_insert AFTER INSERT ON alerts "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts()",
+    "CREATE TRIGGER count_alerts_update AFTER UPDATE ON alerts "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts()",
+    "CREATE TRIGGER count_alerts_delete AFTER DELETE ON alerts "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts()",
+]
+
+for _statement in ALERT_COUNTER_DDL:
+    event.listen(Alert.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
 class Threshold(Base):
     __tablename__ = "thresholds"
 
@@ -255,6 +404,22 @@ class Threshold(Base):
     # Relationships
     pond = relationship("Pond", back_populates="thresholds")
 
+# Expected reporting interval of a device, or of every device of a pond
+# (device_id NULL), for offline detection (services/heartbeats.py)
+class HeartbeatInterval(Base):
+    __tablename__ = "heartbeat_intervals"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    pond_id = Column(UUID(as_uuid=True), ForeignKey("ponds.id"))
+    device_id = Column(String(50))
+    interval_seconds = Column(Integer, nullable=False)  # 0 disables monitoring
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("pond_id", "device_id", name="uq_heartbeat_intervals_pond_device"),
+    )
+
 class UserSession(Base):
     __tablename__ = "user_sessions"
 
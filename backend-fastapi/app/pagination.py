@@ -0,0 +1,46 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: datetime, row_id: Any) -> str:
+    """Opaque cursor pointing just after the row (sort_value, row_id)"""
+    payload = json.dumps([sort_value.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a cursor produced by `encode_cursor`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def apply_keyset(query, sort_column, id_column, cursor: Optional[str]):
+    """
+    Order `query` newest first on (sort_column, id_column) and, when a
+    cursor is given, seek past it instead of using OFFSET
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    return query.order_by(sort_column.desc(), id_column.desc())
+
+def set_next_cursor(response: Response, rows, limit: int, sort_attr: str):
+    """
+    Expose the cursor of the page after `rows` in the X-Next-Cursor header
+    when the page is full
+    """
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), last.id)
@@ -1,16 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, BackgroundTasks
+from sqlalchemy import case, delete, update
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List
 import uuid
 
 from ..database import get_db
 from ..models import Alert, Pond, FarmUser, User
-from ..schemas import AlertCreate, AlertResponse, AlertUpdate
+from ..schemas import (
+    AlertBulkResult, AlertBulkUpdate, AlertCreate, AlertResponse, AlertSelection, AlertStats, AlertUpdate
+)
 from ..auth import get_current_user
+from ..etag import not_modified, tag
+from ..serialization import select_for, rows_response
+from ..pagination import apply_keyset, set_next_cursor
 from ..services.notifications import notification_service
+from ..services.cache import response_cache
+from ..services.pubsub import telemetry_hub
+from ..services.alert_state import alert_tracker
+from ..services.alert_counters import alert_counter_service
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
+def selection_criteria(selection: AlertSelection) -> list:
+    """WHERE clauses of a bulk selection; refuses an empty one rather than touching every alert"""
+    criteria = []
+    if selection.ids is not None:
+        criteria.append(Alert.id.in_(selection.ids))
+    if selection.farm_id:
+        criteria.append(Alert.farm_id == selection.farm_id)
+    if selection.pond_id:
+        criteria.append(Alert.pond_id == selection.pond_id)
+    if selection.severity:
+        criteria.append(Alert.severity.in_([severity.value for severity in selection.severity]))
+    if selection.type:
+        criteria.append(Alert.type.in_([alert_type.value for alert_type in selection.type]))
+    if selection.is_read is not None:
+        criteria.append(Alert.is_read == selection.is_read)
+    if selection.is_resolved is not None:
+        criteria.append(Alert.is_resolved == selection.is_resolved)
+    if selection.older_than:
+        criteria.append(Alert.created_at < selection.older_than)
+    
+    if not criteria:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Select alerts by ids or at least one filter"
+        )
+    return criteria
+
+def user_uuid(current_user: dict):
+    try:
+        return uuid.UUID(str(current_user.get("id")))
+    except ValueError:
+        return None
+
 @router.post("/", response_model=AlertResponse)
 async def create_alert(
     alert: AlertCreate,
@@ -27,6 +71,8 @@ async def create_alert(
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    response_cache.invalidate("alerts")
+    telemetry_hub.publish_alert(db_alert)
     
     # Get users who should receive notifications for this alert
     # This would typically be based on farm membership, roles, etc.
@@ -51,16 +97,27 @@ async def create_alert(
 
 @router.get("/", response_model=List[AlertResponse])
 async def read_alerts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     pond_id: uuid.UUID = None,
     severity: str = None,
     is_resolved: bool = None,
+    cursor: str = None,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
+    """
+    List alerts, newest first. Full pages carry an `X-Next-Cursor` header;
+    pass it back as `cursor` to seek to the next page instead of `skip`.
+    """
     current_user = await get_current_user(session_token)
     
+    etag = response_cache.etag(["alerts"], "list", skip, limit, pond_id, severity, is_resolved, cursor)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
     # For simple auth, return all alerts
     query = db.query(Alert)
     
@@ -73,17 +130,102 @@ async def read_alerts(
     if is_resolved is not None:
         query = query.filter(Alert.is_resolved == is_resolved)
     
-    alerts = query.order_by(Alert.created_at.desc()).offset(skip).limit(limit).all()
-    return alerts
+    query = apply_keyset(query, Alert.created_at, Alert.id, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    
+    alerts = select_for(query, Alert, AlertResponse).limit(limit).all()
+    fast_response = rows_response(alerts, Alert, AlertResponse)
+    set_next_cursor(fast_response, alerts, limit, "created_at")
+    return tag(fast_response, etag)
+
+@router.get("/stats", response_model=AlertStats)
+async def read_alert_stats(
+    farm_id: uuid.UUID = None,
+    pond_id: uuid.UUID = None,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Unresolved and unread counts, in total and by severity, farm and pond"""
+    current_user = await get_current_user(session_token)
+    
+    return alert_counter_service.stats(db, farm_id, pond_id)
+
+@router.post("/bulk/update", response_model=AlertBulkResult)
+async def bulk_update_alerts(
+    bulk_update: AlertBulkUpdate,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Mark many alerts read/unread or resolved/unresolved in one UPDATE"""
+    current_user = await get_current_user(session_token)
+    
+    criteria = selection_criteria(bulk_update.selection)
+    now = datetime.utcnow()
+    values = {"updated_at": now}
+    if bulk_update.is_read is not None:
+        values["is_read"] = bulk_update.is_read
+    if bulk_update.is_resolved is True:
+        # Alerts already resolved keep when and by whom
+        values["is_resolved"] = True
+        values["resolved_at"] = case((Alert.is_resolved, Alert.resolved_at), else_=now)
+        values["resolved_by"] = case((Alert.is_resolved, Alert.resolved_by), else_=user_uuid(current_user))
+    elif bulk_update.is_resolved is False:
+        values.update(is_resolved=False, resolved_at=None, resolved_by=None)
+    if len(values) == 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update: set is_read and/or is_resolved"
+        )
+    
+    alert_ids = db.execute(
+        update(Alert).where(*criteria).values(**values).returning(Alert.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    if alert_ids:
+        response_cache.invalidate("alerts")
+        if bulk_update.is_resolved:
+            alert_tracker.forget(*alert_ids)
+    
+    return {"count": len(alert_ids), "ids": alert_ids}
+
+@router.post("/bulk/delete", response_model=AlertBulkResult)
+async def bulk_delete_alerts(
+    selection: AlertSelection,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Delete many alerts in one DELETE"""
+    current_user = await get_current_user(session_token)
+    
+    criteria = selection_criteria(selection)
+    alert_ids = db.execute(
+        delete(Alert).where(*criteria).returning(Alert.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    if alert_ids:
+        response_cache.invalidate("alerts")
+        alert_tracker.forget(*alert_ids)
+    
+    return {"count": len(alert_ids), "ids": alert_ids}
 
 @router.get("/{alert_id}", response_model=AlertResponse)
 async def read_alert(
+    request: Request,
+    response: Response,
     alert_id: uuid.UUID,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
     current_user = await get_current_user(session_token)
     
+    etag = response_cache.etag(["alerts"], alert_id)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
     alert = db.query(Alert).filter(Alert.id == alert_id).first()
     
     if not alert:
@@ -92,6 +234,7 @@ async def read_alert(
             detail="Alert not found"
         )
     
+    tag(response, etag)
     return alert
 
 @router.put("/{alert_id}", response_model=AlertResponse)
@@ -120,6 +263,9 @@ async def update_alert(
     
     db.commit()
     db.refresh(alert)
+    response_cache.invalidate("alerts")
+    if alert.is_resolved:
+        alert_tracker.forget(alert.id)
     
     return alert
 
@@ -141,5 +287,7 @@ async def delete_alert(
     
     db.delete(alert)
     db.commit()
+    response_cache.invalidate("alerts")
+    alert_tracker.forget(alert_id)
     
     return {"message": "Alert deleted successfully"}
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
 
 from ..database import get_db
-from ..models import Farm, FarmUser, User
-from ..schemas import FarmCreate, FarmResponse, FarmUpdate
+from ..models import Farm, FarmUser, User, Pond, Alert, AlertSeverity
+from ..schemas import FarmCreate, FarmResponse, FarmUpdate, FarmOverview, PondResponse, SensorDataResponse
 from ..auth import get_current_user
+from ..etag import not_modified, tag
+from ..serialization import FastJSONResponse, bytes_response, json_bytes, select_for, rows_to_dicts
+from ..services.latest_readings import latest_store
+from ..services.cache import response_cache
 
 router = APIRouter(prefix="/farms", tags=["farms"])
 
@@ -22,12 +27,14 @@ async def create_farm(
     db.add(db_farm)
     db.commit()
     db.refresh(db_farm)
+    response_cache.invalidate("farms")
     
     # For simple auth, skip the farm_user relationship for now
     return db_farm
 
 @router.get("/", response_model=List[FarmResponse])
 async def read_farms(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     session_token: str = None,
@@ -35,26 +42,104 @@ async def read_farms(
 ):
     current_user = await get_current_user(session_token)
     
-    # For simple auth, return all farms
-    farms = db.query(Farm).offset(skip).limit(limit).all()
-    return farms
+    etag = response_cache.etag(["farms"], "list", skip, limit)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    key = response_cache.key("farms", f"list:{skip}:{limit}")
+    body = response_cache.get(key)
+    if body is None:
+        # For simple auth, return all farms
+        farms = select_for(db.query(Farm), Farm, FarmResponse).offset(skip).limit(limit).all()
+        body = response_cache.set(key, json_bytes(rows_to_dicts(farms, Farm, FarmResponse)))
+    
+    return tag(bytes_response(body), etag)
+
+@router.get("/overview", response_model=List[FarmOverview])
+async def read_farms_overview(
+    skip: int = 0,
+    limit: int = 100,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Farms with their ponds, each pond's latest reading and unresolved alert
+    counts by severity, in one call. Uses four statements however many
+    farms and ponds there are: farms, ponds, latest readings (from the
+    last-value store) and one grouped alert count.
+    """
+    current_user = await get_current_user(session_token)
+    
+    farms = rows_to_dicts(
+        select_for(db.query(Farm), Farm, FarmResponse).order_by(Farm.name).offset(skip).limit(limit).all(),
+        Farm, FarmResponse
+    )
+    farm_ids = [farm["id"] for farm in farms]
+    
+    ponds = rows_to_dicts(
+        select_for(db.query(Pond), Pond, PondResponse).filter(Pond.farm_id.in_(farm_ids)).order_by(Pond.name).all(),
+        Pond, PondResponse
+    ) if farm_ids else []
+    pond_ids = [pond["id"] for pond in ponds]
+    
+    latest = latest_store.get_many(db, pond_ids, seed_missing=False) if pond_ids else {}
+    
+    counts = db.query(Alert.pond_id, Alert.severity, func.count(Alert.id)).filter(
+        Alert.pond_id.in_(pond_ids),
+        Alert.is_resolved.is_(False)
+    ).group_by(Alert.pond_id, Alert.severity).all() if pond_ids else []
+    
+    pond_counts = {pond_id: _empty_counts() for pond_id in pond_ids}
+    for pond_id, severity, count in counts:
+        pond_counts[pond_id][severity.value] = count
+    
+    by_farm = {farm["id"]: farm for farm in farms}
+    for farm in farms:
+        farm["ponds"] = []
+        farm["alert_counts"] = _empty_counts()
+    
+    reading_fields = list(SensorDataResponse.model_fields)
+    for pond in ponds:
+        reading = latest.get(pond["id"])
+        pond["latest_reading"] = {name: reading.get(name) for name in reading_fields} if reading else None
+        pond["alert_counts"] = pond_counts[pond["id"]]
+        farm = by_farm[pond["farm_id"]]
+        farm["ponds"].append(pond)
+        for severity, count in pond["alert_counts"].items():
+            farm["alert_counts"][severity] += count
+    
+    return FastJSONResponse(farms)
+
+def _empty_counts():
+    return {severity.value: 0 for severity in AlertSeverity}
 
 @router.get("/{farm_id}", response_model=FarmResponse)
 async def read_farm(
+    request: Request,
     farm_id: uuid.UUID,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
     current_user = await get_current_user(session_token)
     
-    farm = db.query(Farm).filter(Farm.id == farm_id).first()
-    if not farm:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Farm not found"
-        )
+    etag = response_cache.etag(["farms"], farm_id)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
     
-    return farm
+    key = response_cache.key("farms", str(farm_id))
+    body = response_cache.get(key)
+    if body is None:
+        farm = select_for(db.query(Farm), Farm, FarmResponse).filter(Farm.id == farm_id).first()
+        if not farm:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Farm not found"
+            )
+        body = response_cache.set(key, json_bytes(rows_to_dicts([farm], Farm, FarmResponse)[0]))
+    
+    return tag(bytes_response(body), etag)
 
 @router.put("/{farm_id}", response_model=FarmResponse)
 async def update_farm(
@@ -78,6 +163,7 @@ async def update_farm(
     
     db.commit()
     db.refresh(farm)
+    response_cache.invalidate("farms")
     
     return farm
 
@@ -98,5 +184,6 @@ async def delete_farm(
     
     db.delete(farm)
     db.commit()
+    response_cache.invalidate("farms", "ponds", "alerts")
     
     return {"message": "Farm deleted successfully"}
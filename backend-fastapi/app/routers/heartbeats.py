@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+import uuid
+
+from ..database import get_db
+from ..models import HeartbeatInterval, Pond
+from ..schemas import (
+    DeviceStatus, HeartbeatIntervalCreate, HeartbeatIntervalResponse, HeartbeatIntervalUpdate
+)
+from ..auth import get_current_user
+from ..services.heartbeats import heartbeat_monitor
+
+router = APIRouter(prefix="/heartbeats", tags=["heartbeats"])
+
+@router.get("/", response_model=List[DeviceStatus])
+async def read_device_status(
+    pond_id: uuid.UUID = None,
+    farm_id: uuid.UUID = None,
+    offline_only: bool = False,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Devices watched by this worker, least recently seen first"""
+    current_user = await get_current_user(session_token)
+    
+    pond_ids = None
+    if pond_id:
+        pond_ids = {pond_id}
+    elif farm_id:
+        pond_ids = {row.id for row in db.query(Pond.id).filter(Pond.farm_id == farm_id)}
+    
+    return heartbeat_monitor.status(pond_ids, offline_only)
+
+@router.get("/intervals", response_model=List[HeartbeatIntervalResponse])
+async def read_heartbeat_intervals(
+    pond_id: uuid.UUID = None,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    query = db.query(HeartbeatInterval)
+    
+    if pond_id:
+        query = query.filter(HeartbeatInterval.pond_id == pond_id)
+    
+    return query.all()
+
+@router.post("/intervals", response_model=HeartbeatIntervalResponse)
+async def create_heartbeat_interval(
+    interval: HeartbeatIntervalCreate,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Expected interval of a device (device_id), or of every device of a pond (pond_id only)"""
+    current_user = await get_current_user(session_token)
+    
+    if not interval.pond_id and not interval.device_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either pond_id or device_id is required"
+        )
+    
+    existing = db.query(HeartbeatInterval).filter(
+        HeartbeatInterval.pond_id == interval.pond_id if interval.pond_id else HeartbeatInterval.pond_id.is_(None),
+        HeartbeatInterval.device_id == interval.device_id if interval.device_id else HeartbeatInterval.device_id.is_(None)
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An interval is already configured for this pond/device"
+        )
+    
+    db_interval = HeartbeatInterval(**interval.dict())
+    db.add(db_interval)
+    db.commit()
+    db.refresh(db_interval)
+    heartbeat_monitor.load_intervals(db)
+    
+    return db_interval
+
+@router.put("/intervals/{interval_id}", response_model=HeartbeatIntervalResponse)
+async def update_heartbeat_interval(
+    interval_id: uuid.UUID,
+    interval_update: HeartbeatIntervalUpdate,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    interval = db.query(HeartbeatInterval).filter(HeartbeatInterval.id == interval_id).first()
+    
+    if not interval:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Heartbeat interval not found"
+        )
+    
+    interval.interval_seconds = interval_update.interval_seconds
+    db.commit()
+    db.refresh(interval)
+    heartbeat_monitor.load_intervals(db)
+    
+    return interval
+
+@router.delete("/intervals/{interval_id}")
+async def delete_heartbeat_interval(
+    interval_id: uuid.UUID,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    interval = db.query(HeartbeatInterval).filter(HeartbeatInterval.id == interval_id).first()
+    
+    if not interval:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Heartbeat interval not found"
+        )
+    
+    db.delete(interval)
+    db.commit()
+    heartbeat_monitor.load_intervals(db)
+    
+    return {"message": "Heartbeat interval deleted successfully"}
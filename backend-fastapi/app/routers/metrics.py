@@ -0,0 +1,65 @@
+from fastapi import APIRouter
+
+from ..auth import get_current_user
+from ..services.ingestion_buffer import ingestion_buffer
+from ..services.line_listener import line_listener
+from ..services.cache import response_cache
+from ..services.pubsub import telemetry_hub
+from ..services.thresholds import threshold_engine
+from ..services.anomalies import anomaly_detector
+from ..services.heartbeats import heartbeat_monitor
+from ..services.schedules import pond_scheduler
+from ..services.alert_counters import alert_counter_service
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/ingestion")
+async def read_ingestion_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return {
+        "buffer": ingestion_buffer.get_stats(),
+        "line_listener": line_listener.get_stats()
+    }
+
+@router.get("/cache")
+async def read_cache_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return response_cache.get_stats()
+
+@router.get("/telemetry")
+async def read_telemetry_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return telemetry_hub.get_stats()
+
+@router.get("/thresholds")
+async def read_threshold_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return threshold_engine.get_stats()
+
+@router.get("/anomalies")
+async def read_anomaly_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return anomaly_detector.get_stats()
+
+@router.get("/heartbeats")
+async def read_heartbeat_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return heartbeat_monitor.get_stats()
+
+@router.get("/schedules")
+async def read_schedule_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return pond_scheduler.get_stats()
+
+@router.get("/alert-counters")
+async def read_alert_counter_metrics(session_token: str = None):
+    current_user = await get_current_user(session_token)
+    
+    return alert_counter_service.get_stats()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
@@ -7,9 +7,22 @@ from ..database import get_db
 from ..models import Pond, Farm, FarmUser, User
 from ..schemas import PondCreate, PondResponse, PondUpdate
 from ..auth import get_current_user
+from ..etag import not_modified, tag
+from ..serialization import bytes_response, json_bytes, select_for, rows_to_dicts
+from ..services.cache import response_cache
+from ..services.schedules import ScheduleError, pond_scheduler
 
 router = APIRouter(prefix="/ponds", tags=["ponds"])
 
+def validate_schedule(feeding_schedule: str):
+    try:
+        pond_scheduler.parse(feeding_schedule)
+    except ScheduleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid feeding_schedule: {e}"
+        )
+
 @router.post("/", response_model=PondResponse)
 async def create_pond(
     pond: PondCreate,
@@ -17,6 +30,7 @@ async def create_pond(
     db: Session = Depends(get_db)
 ):
     current_user = await get_current_user(session_token)
+    validate_schedule(pond.feeding_schedule)
     
     # For simple auth, allow all users to create ponds
     pond_data = pond.dict()
@@ -25,11 +39,14 @@ async def create_pond(
     db.add(db_pond)
     db.commit()
     db.refresh(db_pond)
+    response_cache.invalidate("ponds")
+    pond_scheduler.reschedule(db_pond)
     
     return db_pond
 
 @router.get("/", response_model=List[PondResponse])
 async def read_ponds(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     farm_id: uuid.UUID = None,
@@ -38,32 +55,52 @@ async def read_ponds(
 ):
     current_user = await get_current_user(session_token)
     
-    # For simple auth, return all ponds
-    query = db.query(Pond)
-    
-    if farm_id:
-        query = query.filter(Pond.farm_id == farm_id)
-    
-    ponds = query.offset(skip).limit(limit).all()
-    return ponds
+    etag = response_cache.etag(["ponds"], "list", farm_id, skip, limit)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    key = response_cache.key("ponds", f"list:{farm_id}:{skip}:{limit}")
+    body = response_cache.get(key)
+    if body is None:
+        # For simple auth, return all ponds
+        query = db.query(Pond)
+        
+        if farm_id:
+            query = query.filter(Pond.farm_id == farm_id)
+        
+        ponds = select_for(query, Pond, PondResponse).offset(skip).limit(limit).all()
+        body = response_cache.set(key, json_bytes(rows_to_dicts(ponds, Pond, PondResponse)))
+    
+    return tag(bytes_response(body), etag)
 
 @router.get("/{pond_id}", response_model=PondResponse)
 async def read_pond(
+    request: Request,
     pond_id: uuid.UUID,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
     current_user = await get_current_user(session_token)
     
-    pond = db.query(Pond).filter(Pond.id == pond_id).first()
-    
-    if not pond:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pond not found"
-        )
-    
-    return pond
+    etag = response_cache.etag(["ponds"], pond_id)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    key = response_cache.key("ponds", str(pond_id))
+    body = response_cache.get(key)
+    if body is None:
+        pond = select_for(db.query(Pond), Pond, PondResponse).filter(Pond.id == pond_id).first()
+        
+        if not pond:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pond not found"
+            )
+        body = response_cache.set(key, json_bytes(rows_to_dicts([pond], Pond, PondResponse)[0]))
+    
+    return tag(bytes_response(body), etag)
 
 @router.put("/{pond_id}", response_model=PondResponse)
 async def update_pond(
@@ -83,11 +120,16 @@ async def update_pond(
         )
     
     update_data = pond_update.dict(exclude_unset=True)
+    if "feeding_schedule" in update_data:
+        validate_schedule(update_data["feeding_schedule"])
     for field, value in update_data.items():
         setattr(pond, field, value)
     
     db.commit()
     db.refresh(pond)
+    response_cache.invalidate("ponds")
+    if "feeding_schedule" in update_data or "status" in update_data:
+        pond_scheduler.reschedule(pond)
     
     return pond
 
@@ -109,5 +151,7 @@ async def delete_pond(
     
     db.delete(pond)
     db.commit()
+    response_cache.invalidate("ponds", "alerts")
+    pond_scheduler.unschedule(pond_id)
     
     return {"message": "Pond deleted successfully"}
@@ -0,0 +1,211 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import json
+import logging
+
+from ..database import get_db
+from ..schemas import SensorDataBinaryResponse, SensorDataStreamSummary
+from ..auth import get_current_user
+from ..config import settings
+from ..services.ingestion import ingestion_service
+from ..services.binary_protocol import decode_frames
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sensor-data", tags=["sensor-data"])
+
+class StreamIngestState:
+    """
+    Running state of one streaming upload.
+
+    Only the current chunk of readings and a capped list of errors are kept,
+    so memory stays bounded however long the upload runs.
+    """
+
+    def __init__(self, db: Session, user_id, chunk_size: int):
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.pending_indexes = []
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.chunks = 0
+        self.errors = []
+        self.errors_truncated = False
+
+    def add_error(self, index: int, detail):
+        self.rejected += 1
+        if len(self.errors) < settings.ingest_stream_max_errors:
+            self.errors.append({"index": index, "detail": detail})
+        else:
+            self.errors_truncated = True
+
+    async def add_line(self, line: bytes):
+        index = self.lines
+        self.lines += 1
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            item = json.loads(line)
+        except ValueError:
+            self.add_error(index, "Invalid JSON")
+            return
+
+        self.pending.append(item)
+        self.pending_indexes.append(index)
+        if len(self.pending) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+
+        payload, indexes = self.pending, self.pending_indexes
+        self.pending, self.pending_indexes = [], []
+
+        rows, errors = await run_in_threadpool(
+            ingestion_service.validate_batch, self.db, payload, self.user_id, indexes
+        )
+        self.accepted += await run_in_threadpool(ingestion_service.ingest, self.db, rows)
+        self.chunks += 1
+        for error in errors:
+            self.add_error(error["index"], error["detail"])
+
+        logger.info(
+            f"Stream ingest chunk {self.chunks}: {self.accepted} accepted, "
+            f"{self.rejected} rejected after {self.lines} lines"
+        )
+
+    def summary(self):
+        return {
+            "lines": self.lines,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated
+        }
+
+@router.post("/stream", response_model=SensorDataStreamSummary)
+async def stream_sensor_data(
+    request: Request,
+    chunk_size: int = None,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest a newline-delimited JSON body of `SensorDataCreate` readings.
+
+    The body is read incrementally and written to `sensor_data` every
+    `chunk_size` readings, each chunk in its own transaction. Chunks already
+    flushed stay committed if the upload is interrupted. Errors are reported
+    by zero-based line number.
+    """
+    current_user = await get_current_user(session_token)
+
+    chunk_size = min(
+        chunk_size or settings.ingest_stream_chunk_rows,
+        settings.ingest_batch_max_rows
+    )
+    state = StreamIngestState(db, current_user.get("id", "unknown"), max(chunk_size, 1))
+
+    buffer = bytearray()
+    discarding = False
+    async for data in request.stream():
+        buffer.extend(data)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end == -1:
+                break
+            line = bytes(buffer[start:end])
+            start = end + 1
+            if discarding:
+                # Tail of an oversized line that was already rejected
+                discarding = False
+                continue
+            await state.add_line(line)
+        del buffer[:start]
+
+        if len(buffer) > settings.ingest_stream_max_line_bytes:
+            if not discarding:
+                state.add_error(state.lines, "Line too long")
+                state.lines += 1
+            buffer.clear()
+            discarding = True
+
+    if buffer and not discarding:
+        await state.add_line(bytes(buffer))
+    await state.flush()
+
+    return state.summary()
+
+@router.post("/binary", response_model=SensorDataBinaryResponse)
+async def create_sensor_data_binary(
+    request: Request,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest readings encoded with the compact binary frame format
+    (see `app/services/binary_protocol.py`).
+
+    Malformed frames are rejected by frame number; the readings of all
+    valid frames are written in one transaction.
+    """
+    current_user = await get_current_user(session_token)
+
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Body exceeds {settings.ingest_binary_max_bytes} bytes"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid Content-Length header"
+            )
+        if declared > settings.ingest_binary_max_bytes:
+            raise too_large
+
+    # Enforce the cap while reading too: chunked uploads carry no length
+    body = bytearray()
+    async for data in request.stream():
+        body.extend(data)
+        if len(body) > settings.ingest_binary_max_bytes:
+            raise too_large
+
+    readings = []
+    frame_ids = []
+    errors = []
+    frames = 0
+    malformed = 0
+    for index, frame_readings, error in decode_frames(bytes(body)):
+        frames += 1
+        if error:
+            malformed += 1
+            errors.append({"index": index, "detail": error})
+            continue
+        readings.extend(frame_readings)
+        frame_ids.extend([index] * len(frame_readings))
+
+    rows = ingestion_service.rows_from_readings(readings, current_user.get("id", "unknown"))
+    rows, unknown = ingestion_service.split_unknown_ponds(db, rows)
+    for frame in sorted({frame_ids[position] for position in unknown}):
+        errors.append({"index": frame, "detail": "Pond not found"})
+    accepted = ingestion_service.ingest(db, rows)
+
+    return {
+        "frames": frames,
+        "accepted": accepted,
+        "rejected": len(unknown) + malformed,
+        "errors": sorted(errors, key=lambda error: error["index"])
+    }
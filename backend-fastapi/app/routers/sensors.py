@@ -1,42 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List
+from datetime import datetime
 import uuid
 
 from ..database import get_db
-from ..models import SensorData, Pond, FarmUser, User
-from ..schemas import SensorDataCreate, SensorDataResponse
+from ..models import SensorData, Pond, FarmUser, User, SENSOR_METRICS, ROLLUP_RESOLUTIONS
+from ..schemas import (
+    SensorDataCreate, SensorDataResponse, SensorDataBatchResponse, SensorRollupResponse,
+    SensorSeriesResponse
+)
 from ..auth import get_current_user
+from ..config import settings
+from ..pagination import apply_keyset, set_next_cursor
+from ..etag import make_etag, not_modified, tag
+from ..serialization import select_for, rows_response
+from ..columnar import (
+    COLUMNAR_JSON, negotiate, to_columns, columnar_json_response, arrow_response,
+    series_arrow_response
+)
+from ..services.ingestion import ingestion_service, naive_utc
+from ..services.ingestion_buffer import ingestion_buffer, IngestionBufferFull, UnknownPondError
+from ..services.rollups import rollup_service
+from ..services.latest_readings import latest_store
+from ..services.downsampling import METHODS as DOWNSAMPLING_METHODS
+from ..services.series import series_service
+from ..services import export
 
 router = APIRouter(prefix="/sensor-data", tags=["sensor-data"])
 
 @router.post("/", response_model=SensorDataResponse)
 async def create_sensor_data(
     sensor_data: SensorDataCreate,
+    durable: bool = None,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
+    """
+    Ingest one reading.
+
+    When the ingestion buffer is running the reading is group-committed with
+    other requests; pass `durable=true` to wait until it has been written.
+    """
     current_user = await get_current_user(session_token)
     
     # For simple auth, allow all users to create sensor data
-    sensor_data_dict = sensor_data.dict()
-    sensor_data_dict["user_id"] = current_user.get("id", "unknown")
-    db_sensor_data = SensorData(**sensor_data_dict)
-    db.add(db_sensor_data)
-    db.commit()
-    db.refresh(db_sensor_data)
+    row = ingestion_service.prepare_row(sensor_data, current_user.get("id", "unknown"))
+    
+    if not (settings.ingest_buffer_enabled and ingestion_buffer.running):
+        ingestion_service.ingest(db, [row])
+        return row
+    
+    if durable is None:
+        durable = settings.ingest_buffer_wait_durable
+    
+    try:
+        waiter = ingestion_buffer.submit(row, durable=durable)
+    except IngestionBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Sensor ingestion buffer is full, retry later",
+            headers={"Retry-After": "1"}
+        )
     
-    return db_sensor_data
+    if waiter is not None:
+        try:
+            await waiter
+        except UnknownPondError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pond not found"
+            )
+    
+    return row
+
+@router.post("/batch", response_model=SensorDataBatchResponse)
+async def create_sensor_data_batch(
+    readings: List[Any] = Body(...),
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest many readings in one transaction.
+
+    Each item has the shape of `SensorDataCreate`. Invalid items are
+    rejected by index and the remaining ones are still written.
+    """
+    current_user = await get_current_user(session_token)
+    
+    if len(readings) > settings.ingest_batch_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.ingest_batch_max_rows} readings"
+        )
+    
+    rows, errors = ingestion_service.validate_batch(
+        db, readings, current_user.get("id", "unknown")
+    )
+    accepted = ingestion_service.ingest(db, rows)
+    
+    return {
+        "accepted": accepted,
+        "rejected": len(errors),
+        "errors": errors
+    }
 
 @router.get("/", response_model=List[SensorDataResponse])
 async def read_sensor_data(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     pond_id: uuid.UUID = None,
+    start_time: datetime = None,
+    end_time: datetime = None,
+    cursor: str = None,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
+    """
+    List readings, newest first. `start_time` / `end_time` bound the
+    timestamp range so only the matching partitions are scanned.
+
+    Full pages carry an `X-Next-Cursor` header; pass it back as `cursor`
+    to seek to the next page instead of paging with `skip`.
+
+    Send `Accept: application/vnd.aquamonitor.columnar+json` for one array
+    per column, or `Accept: application/vnd.apache.arrow.stream` for an
+    Arrow IPC stream; both are built from result columns without ORM objects.
+    """
     current_user = await get_current_user(session_token)
+    fmt = negotiate(request)
     
     # For simple auth, return all sensor data
     query = db.query(SensorData)
@@ -44,18 +139,118 @@ async def read_sensor_data(
     if pond_id:
         query = query.filter(SensorData.pond_id == pond_id)
     
-    sensor_data = query.order_by(SensorData.timestamp.desc()).offset(skip).limit(limit).all()
-    return sensor_data
+    if start_time:
+        query = query.filter(SensorData.timestamp >= start_time)
+    
+    if end_time:
+        query = query.filter(SensorData.timestamp < end_time)
+    
+    query = apply_keyset(query, SensorData.timestamp, SensorData.id, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    
+    if fmt != "json":
+        table_columns = list(SensorData.__table__.columns)
+        rows = query.with_entities(*table_columns).limit(limit).all()
+        columns = to_columns(rows, [column.name for column in table_columns])
+        if fmt == "arrow":
+            columnar = arrow_response(columns, table_columns)
+        else:
+            columnar = columnar_json_response(columns, table_columns, len(rows))
+        set_next_cursor(columnar, rows, limit, "timestamp")
+        return columnar
+    
+    sensor_data = select_for(query, SensorData, SensorDataResponse).limit(limit).all()
+    fast_response = rows_response(sensor_data, SensorData, SensorDataResponse)
+    set_next_cursor(fast_response, sensor_data, limit, "timestamp")
+    return fast_response
+
+@router.get("/latest", response_model=List[SensorDataResponse])
+async def get_latest_sensor_data_many(
+    request: Request,
+    response: Response,
+    pond_ids: List[uuid.UUID] = Query(...),
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Latest reading of several ponds (`?pond_ids=a&pond_ids=b`), served
+    from the last-value store. Ponds without readings are omitted.
+
+    The ETag is derived from the ids of the latest readings, so an
+    unchanged poll is answered with 304 before anything is serialized.
+    """
+    current_user = await get_current_user(session_token)
+    
+    latest = latest_store.get_many(db, pond_ids)
+    readings = [latest[pond_id] for pond_id in pond_ids if pond_id in latest]
+    
+    etag = make_etag("latest", *(reading["id"] for reading in readings))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    tag(response, etag)
+    return readings
+
+@router.get("/export")
+async def export_sensor_data(
+    format: str = "csv",
+    pond_id: uuid.UUID = None,
+    farm_id: uuid.UUID = None,
+    start_time: datetime = None,
+    end_time: datetime = None,
+    session_token: str = None
+):
+    """
+    Stream the full history of a pond or of every pond of a farm, oldest
+    first, as `csv`, `ndjson` or `parquet` (one row group per chunk).
+    """
+    current_user = await get_current_user(session_token)
+    
+    if format not in export.ENCODERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format must be one of {', '.join(export.ENCODERS)}"
+        )
+    
+    if format == "parquet" and export.pq is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Parquet export requires pyarrow on the server"
+        )
+    
+    if not pond_id and not farm_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either pond_id or farm_id is required"
+        )
+    
+    query = export.build_query(pond_id, farm_id, start_time, end_time)
+    scope = f"pond-{pond_id}" if pond_id else f"farm-{farm_id}"
+    return StreamingResponse(
+        export.export_rows(query, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="sensor-data-{scope}.{format}"'}
+    )
 
 @router.get("/{sensor_data_id}", response_model=SensorDataResponse)
 async def read_sensor_data_by_id(
     sensor_data_id: uuid.UUID,
+    timestamp: datetime = None,
     session_token: str = None,
     db: Session = Depends(get_db)
 ):
+    """
+    Get one reading. Passing its `timestamp` turns the lookup into a
+    primary-key probe of a single partition instead of one per partition.
+    """
     current_user = await get_current_user(session_token)
     
-    sensor_data = db.query(SensorData).filter(SensorData.id == sensor_data_id).first()
+    query = db.query(SensorData).filter(SensorData.id == sensor_data_id)
+    if timestamp:
+        query = query.filter(SensorData.timestamp == timestamp)
+    sensor_data = query.first()
     
     if not sensor_data:
         raise HTTPException(
@@ -67,6 +262,8 @@ async def read_sensor_data_by_id(
 
 @router.get("/pond/{pond_id}/latest", response_model=SensorDataResponse)
 async def get_latest_sensor_data(
+    request: Request,
+    response: Response,
     pond_id: uuid.UUID,
     session_token: str = None,
     db: Session = Depends(get_db)
@@ -74,9 +271,7 @@ async def get_latest_sensor_data(
     current_user = await get_current_user(session_token)
     
     # For simple auth, allow access to all ponds
-    latest_data = db.query(SensorData).filter(
-        SensorData.pond_id == pond_id
-    ).order_by(SensorData.timestamp.desc()).first()
+    latest_data = latest_store.get(db, pond_id)
     
     if not latest_data:
         raise HTTPException(
@@ -84,4 +279,105 @@ async def get_latest_sensor_data(
             detail="No sensor data found for this pond"
         )
     
+    etag = make_etag("latest", latest_data["id"])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    
+    tag(response, etag)
     return latest_data
+
+def _check_metrics(metrics: List[str]) -> List[str]:
+    metrics = metrics or list(SENSOR_METRICS)
+    unknown = [metric for metric in metrics if metric not in SENSOR_METRICS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metrics: {', '.join(unknown)}"
+        )
+    return metrics
+
+@router.get("/pond/{pond_id}/rollups", response_model=SensorRollupResponse)
+async def get_sensor_rollups(
+    pond_id: uuid.UUID,
+    start_time: datetime,
+    end_time: datetime = None,
+    metrics: List[str] = Query(None),
+    max_points: int = Query(500, ge=1, le=10000),
+    resolution: str = None,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Aggregated history of a pond (min/max/avg/count/last per bucket).
+
+    Without an explicit `resolution`, the finest of 1m / 1h / 1d whose
+    bucket count over the range fits in `max_points` is used.
+    """
+    current_user = await get_current_user(session_token)
+    
+    metrics = _check_metrics(metrics)
+    
+    if resolution and resolution not in ROLLUP_RESOLUTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Resolution must be one of {', '.join(ROLLUP_RESOLUTIONS)}"
+        )
+    
+    return rollup_service.query(
+        db, pond_id, naive_utc(start_time), naive_utc(end_time) or datetime.utcnow(),
+        metrics, max_points, resolution
+    )
+
+@router.get("/pond/{pond_id}/series", response_model=SensorSeriesResponse)
+async def get_sensor_series(
+    request: Request,
+    pond_id: uuid.UUID,
+    start_time: datetime,
+    end_time: datetime = None,
+    metrics: List[str] = Query(None),
+    max_points: int = Query(settings.series_max_points, ge=2, le=10000),
+    method: str = "lttb",
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Chart-ready history of a pond, at most `max_points` points per metric.
+
+    `method=lttb` keeps the visual shape (largest-triangle-three-buckets);
+    `method=minmax` keeps the low and high of each time bucket. The body is
+    already columnar; `Accept: application/vnd.apache.arrow.stream` returns
+    it as a long (metric, timestamp, value) Arrow stream instead.
+    """
+    current_user = await get_current_user(session_token)
+    fmt = negotiate(request)
+    
+    metrics = _check_metrics(metrics)
+    
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Method must be one of {', '.join(DOWNSAMPLING_METHODS)}"
+        )
+    
+    # Timestamps are stored as naive UTC; clients may send offsets ("Z")
+    start_time = naive_utc(start_time)
+    end_time = naive_utc(end_time) or datetime.utcnow()
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_time must be after start_time"
+        )
+    
+    result = await run_in_threadpool(
+        series_service.query, db, pond_id, start_time, end_time, metrics, max_points, method
+    )
+    
+    if fmt == "arrow":
+        return series_arrow_response(result["series"])
+    if fmt == "columnar":
+        return Response(
+            content=SensorSeriesResponse(**result).model_dump_json(),
+            media_type=COLUMNAR_JSON
+        )
+    return result
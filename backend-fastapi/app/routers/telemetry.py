@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import List
+import asyncio
+import uuid
+
+from ..auth import get_current_user
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Pond
+from ..services.pubsub import telemetry_hub
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+
+def _check_scope(farm_ids: List[uuid.UUID], pond_ids: List[uuid.UUID]):
+    if not farm_ids and not pond_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Subscribe to at least one farm_ids or pond_ids"
+        )
+
+def _subscribe(farm_ids: List[uuid.UUID], pond_ids: List[uuid.UUID]):
+    """
+    Readings carry only a pond id, so farm subscriptions are expanded to the
+    farm's current ponds; alerts match on the farm itself
+    """
+    pond_ids = set(pond_ids or [])
+    if farm_ids:
+        db = SessionLocal()
+        try:
+            pond_ids.update(row.id for row in db.query(Pond.id).filter(Pond.farm_id.in_(farm_ids)))
+        finally:
+            db.close()
+    return telemetry_hub.subscribe(pond_ids, farm_ids or [])
+
+@router.websocket("/ws")
+async def telemetry_websocket(
+    websocket: WebSocket,
+    farm_ids: List[uuid.UUID] = Query(None),
+    pond_ids: List[uuid.UUID] = Query(None),
+    session_token: str = None
+):
+    """
+    Live readings and alerts of the given farms and/or ponds, one JSON
+    message per event: {"type": "reading" | "alert", "pond_id", "data"}.
+    Readings of a pond are coalesced while the client lags behind.
+    """
+    try:
+        current_user = await get_current_user(session_token)
+        _check_scope(farm_ids, pond_ids)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    
+    await websocket.accept()
+    subscription = _subscribe(farm_ids, pond_ids)
+    # Clients send nothing; reading only detects the disconnect
+    closed = asyncio.create_task(_wait_closed(websocket))
+    try:
+        while not closed.done():
+            batch = asyncio.create_task(subscription.next_batch())
+            await asyncio.wait({batch, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not batch.done():
+                batch.cancel()
+                break
+            for message in batch.result():
+                await websocket.send_text(message.decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        telemetry_hub.unsubscribe(subscription)
+
+async def _wait_closed(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+@router.get("/sse")
+async def telemetry_events(
+    request: Request,
+    farm_ids: List[uuid.UUID] = Query(None),
+    pond_ids: List[uuid.UUID] = Query(None),
+    session_token: str = None
+):
+    """
+    Server-Sent Events fallback of `/telemetry/ws` for clients without
+    WebSocket support; each event's data is one message.
+    """
+    current_user = await get_current_user(session_token)
+    _check_scope(farm_ids, pond_ids)
+    
+    async def events():
+        subscription = _subscribe(farm_ids, pond_ids)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    batch = await asyncio.wait_for(
+                        subscription.next_batch(), timeout=settings.telemetry_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+                    continue
+                yield b"".join(b"data: " + message + b"\n\n" for message in batch)
+        finally:
+            telemetry_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
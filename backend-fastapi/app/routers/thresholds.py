@@ -0,0 +1,185 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List
+from datetime import datetime, timedelta
+import uuid
+
+from ..database import get_db
+from ..models import SENSOR_METRICS, Threshold, Pond
+from ..schemas import (
+    BacktestRequest, BacktestResponse, ThresholdCreate, ThresholdResponse, ThresholdUpdate
+)
+from ..auth import get_current_user
+from ..services.backtest import backtest_service
+from ..services.ingestion import naive_utc
+from ..services.thresholds import threshold_engine
+
+router = APIRouter(prefix="/thresholds", tags=["thresholds"])
+
+def _pond_farm(db: Session, pond_id: uuid.UUID):
+    farm_id = db.query(Pond.farm_id).filter(Pond.id == pond_id).scalar()
+    if farm_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pond not found"
+        )
+    return farm_id
+
+@router.post("/", response_model=ThresholdResponse)
+async def create_threshold(
+    threshold: ThresholdCreate,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    farm_id = _pond_farm(db, threshold.pond_id)
+    
+    db_threshold = Threshold(**threshold.dict())
+    db.add(db_threshold)
+    db.commit()
+    db.refresh(db_threshold)
+    threshold_engine.index.upsert(db_threshold, farm_id)
+    
+    return db_threshold
+
+@router.post("/backtest", response_model=BacktestResponse)
+async def backtest_thresholds(
+    backtest: BacktestRequest,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    How many alerts proposed thresholds would have raised over a pond's (or
+    every pond of a farm's) stored history, with the live hysteresis band and
+    cooldown: violation counts, alert counts, durations and timestamps.
+    """
+    current_user = await get_current_user(session_token)
+    
+    if not backtest.pond_id and not backtest.farm_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either pond_id or farm_id is required"
+        )
+    
+    for threshold in backtest.thresholds or []:
+        if threshold.parameter not in SENSOR_METRICS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown parameter: {threshold.parameter}"
+            )
+        if all(
+            getattr(threshold, bound) is None
+            for bound in ("min_value", "max_value", "optimal_min", "optimal_max")
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Threshold for {threshold.parameter} has no bounds"
+            )
+    
+    # Timestamps are stored as naive UTC; clients may send offsets ("Z")
+    end_time = naive_utc(backtest.end_time) or datetime.utcnow()
+    start_time = naive_utc(backtest.start_time) or end_time - timedelta(days=backtest.days)
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_time must be after start_time"
+        )
+    
+    return await run_in_threadpool(
+        backtest_service.run,
+        db,
+        start_time,
+        end_time,
+        pond_id=backtest.pond_id,
+        farm_id=backtest.farm_id,
+        thresholds=backtest.thresholds,
+        cooldown_minutes=backtest.cooldown_minutes,
+        max_events=backtest.max_events
+    )
+
+@router.get("/", response_model=List[ThresholdResponse])
+async def read_thresholds(
+    skip: int = 0,
+    limit: int = 100,
+    pond_id: uuid.UUID = None,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    query = db.query(Threshold)
+    
+    if pond_id:
+        query = query.filter(Threshold.pond_id == pond_id)
+    
+    thresholds = query.offset(skip).limit(limit).all()
+    return thresholds
+
+@router.get("/{threshold_id}", response_model=ThresholdResponse)
+async def read_threshold(
+    threshold_id: uuid.UUID,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    threshold = db.query(Threshold).filter(Threshold.id == threshold_id).first()
+    
+    if not threshold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threshold not found"
+        )
+    
+    return threshold
+
+@router.put("/{threshold_id}", response_model=ThresholdResponse)
+async def update_threshold(
+    threshold_id: uuid.UUID,
+    threshold_update: ThresholdUpdate,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    threshold = db.query(Threshold).filter(Threshold.id == threshold_id).first()
+    
+    if not threshold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threshold not found"
+        )
+    
+    update_data = threshold_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(threshold, field, value)
+    
+    db.commit()
+    db.refresh(threshold)
+    threshold_engine.index.upsert(threshold, _pond_farm(db, threshold.pond_id))
+    
+    return threshold
+
+@router.delete("/{threshold_id}")
+async def delete_threshold(
+    threshold_id: uuid.UUID,
+    session_token: str = None,
+    db: Session = Depends(get_db)
+):
+    current_user = await get_current_user(session_token)
+    
+    threshold = db.query(Threshold).filter(Threshold.id == threshold_id).first()
+    
+    if not threshold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threshold not found"
+        )
+    
+    db.delete(threshold)
+    db.commit()
+    threshold_engine.index.remove(threshold_id)
+    
+    return {"message": "Threshold deleted successfully"}
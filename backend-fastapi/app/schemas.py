@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Any, Dict
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -200,6 +200,7 @@ class SensorDataBase(BaseModel):
 
 class SensorDataCreate(SensorDataBase):
     pond_id: uuid.UUID
+    timestamp: Optional[datetime] = None  # defaults to ingestion time
 
 class SensorDataResponse(SensorDataBase):
     id: uuid.UUID
@@ -211,6 +212,66 @@ class SensorDataResponse(SensorDataBase):
     class Config:
         from_attributes = True
 
+class SensorDataBatchError(BaseModel):
+    index: int
+    detail: Any
+
+class SensorDataBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[SensorDataBatchError] = []
+
+class SensorDataBinaryResponse(BaseModel):
+    frames: int
+    accepted: int
+    rejected: int  # readings of unknown ponds plus malformed frames
+    errors: List[SensorDataBatchError] = []  # index is the frame number
+
+class SensorDataStreamSummary(BaseModel):
+    lines: int
+    accepted: int
+    rejected: int
+    chunks: int
+    errors: List[SensorDataBatchError] = []
+    errors_truncated: bool = False
+
+class SensorRollupSeries(BaseModel):
+    min: List[Optional[float]]
+    max: List[Optional[float]]
+    avg: List[Optional[float]]
+    count: List[int]
+    last: List[Optional[float]]
+
+class SensorRollupResponse(BaseModel):
+    pond_id: uuid.UUID
+    resolution: str
+    start_time: datetime
+    end_time: datetime
+    buckets: List[datetime]
+    series: Dict[str, SensorRollupSeries]
+
+class SensorSeries(BaseModel):
+    timestamps: List[datetime]
+    values: List[float]
+
+class SensorSeriesResponse(BaseModel):
+    pond_id: uuid.UUID
+    method: str
+    source: str
+    start_time: datetime
+    end_time: datetime
+    max_points: int
+    series: Dict[str, SensorSeries]
+
+# Farm overview schemas
+class PondOverview(PondResponse):
+    latest_reading: Optional[SensorDataResponse] = None
+    alert_counts: Dict[str, int]
+
+class FarmOverview(FarmResponse):
+    ponds: List[PondOverview]
+    alert_counts: Dict[str, int]
+
 # Alert schemas
 class AlertBase(BaseModel):
     type: AlertType
@@ -246,6 +307,35 @@ class AlertResponse(AlertBase):
     class Config:
         from_attributes = True
 
+class AlertSelection(BaseModel):
+    """Alerts matching all given criteria; ids alone select exactly those alerts"""
+    ids: Optional[List[uuid.UUID]] = None
+    farm_id: Optional[uuid.UUID] = None
+    pond_id: Optional[uuid.UUID] = None
+    severity: Optional[List[AlertSeverity]] = None
+    type: Optional[List[AlertType]] = None
+    is_read: Optional[bool] = None
+    is_resolved: Optional[bool] = None
+    older_than: Optional[datetime] = None
+
+class AlertBulkUpdate(BaseModel):
+    selection: AlertSelection
+    is_read: Optional[bool] = None
+    is_resolved: Optional[bool] = None
+
+class AlertBulkResult(BaseModel):
+    count: int
+    ids: List[uuid.UUID]
+
+class AlertCounts(BaseModel):
+    unresolved: int = 0
+    unread: int = 0
+
+class AlertStats(AlertCounts):
+    by_severity: Dict[str, AlertCounts] = {}
+    by_farm: Dict[str, AlertCounts] = {}
+    by_pond: Dict[str, AlertCounts] = {}
+
 # Threshold schemas
 class ThresholdBase(BaseModel):
     parameter: str
@@ -274,6 +364,86 @@ class ThresholdResponse(ThresholdBase):
     class Config:
         from_attributes = True
 
+class BacktestThreshold(BaseModel):
+    parameter: str
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    optimal_min: Optional[float] = None
+    optimal_max: Optional[float] = None
+    hysteresis_band: Optional[float] = None  # defaults to the live alerting band
+
+class BacktestRequest(BaseModel):
+    pond_id: Optional[uuid.UUID] = None
+    farm_id: Optional[uuid.UUID] = None
+    start_time: Optional[datetime] = None  # defaults to `days` before end_time
+    end_time: Optional[datetime] = None
+    days: int = 90
+    thresholds: Optional[List[BacktestThreshold]] = None  # each pond's active thresholds when omitted
+    cooldown_minutes: Optional[int] = None
+    max_events: int = 1000
+
+class BacktestEvent(BaseModel):
+    start: datetime
+    end: datetime
+    duration_seconds: float
+
+class BacktestResult(BaseModel):
+    parameter: str
+    direction: str
+    bound: float
+    severe_bound: Optional[float] = None
+    band: float
+    readings: int
+    violating_readings: int
+    severe_readings: int
+    crossings: int  # alerts without hysteresis or cooldown
+    episodes: int
+    alerts: int
+    ongoing: bool
+    total_duration_seconds: float
+    longest_duration_seconds: float
+    events: List[BacktestEvent]
+    truncated: bool
+
+class BacktestPond(BaseModel):
+    pond_id: uuid.UUID
+    readings: int
+    results: List[BacktestResult]
+
+class BacktestResponse(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    cooldown_minutes: int
+    ponds: List[BacktestPond]
+
+# Heartbeat schemas
+class HeartbeatIntervalBase(BaseModel):
+    pond_id: Optional[uuid.UUID] = None
+    device_id: Optional[str] = None
+    interval_seconds: int = Field(..., ge=0)  # 0 disables monitoring
+
+class HeartbeatIntervalCreate(HeartbeatIntervalBase):
+    pass
+
+class HeartbeatIntervalUpdate(BaseModel):
+    interval_seconds: int = Field(..., ge=0)
+
+class HeartbeatIntervalResponse(HeartbeatIntervalBase):
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DeviceStatus(BaseModel):
+    pond_id: uuid.UUID
+    device_id: Optional[str] = None
+    interval_seconds: int
+    last_seen: datetime
+    deadline: datetime
+    online: bool
+
 # User Preferences schemas
 class UserPreferencesBase(BaseModel):
     email_notifications: bool = True
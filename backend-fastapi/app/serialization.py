@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson (UUIDs, datetimes and enums natively)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+def json_bytes(content: Any) -> bytes:
+    return orjson.dumps(content)
+
+def bytes_response(body: bytes) -> Response:
+    """Response for a body that is already encoded JSON, e.g. from the cache"""
+    return Response(content=body, media_type="application/json")
+
+@lru_cache(maxsize=None)
+def schema_columns(model, schema: Type[BaseModel]) -> Tuple[Any, ...]:
+    """Table columns of `model` backing the fields of `schema`, in field order"""
+    table = model.__table__
+    return tuple(table.c[name] for name in schema.model_fields)
+
+def select_for(query, model, schema: Type[BaseModel]):
+    """Narrow an ORM query to plain rows holding only the fields of `schema`"""
+    return query.with_entities(*schema_columns(model, schema))
+
+def rows_to_dicts(rows: Sequence[Any], model, schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    names = [column.name for column in schema_columns(model, schema)]
+    return [dict(zip(names, row)) for row in rows]
+
+def rows_response(rows: Sequence[Any], model, schema: Type[BaseModel]) -> FastJSONResponse:
+    """
+    Encode rows fetched through `select_for` straight to JSON bytes,
+    skipping per-row pydantic validation and FastAPI's re-encoding. The
+    output matches `List[schema]` for values loaded from the database.
+    """
+    return FastJSONResponse(rows_to_dicts(rows, model, schema))
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import ALERT_COUNTER_DDL, AlertCounter
+
+logger = logging.getLogger(__name__)
+
+# Actual counts from the alerts table; the partial indexes on unresolved and
+# unread alerts keep this off resolved history
+_ACTUAL_COUNTS = """
+    SELECT farm_id, pond_id, severity::text AS severity,
+           count(*) FILTER (WHERE NOT is_resolved) AS unresolved,
+           count(*) FILTER (WHERE NOT is_read) AS unread
+    FROM alerts
+    WHERE NOT is_resolved OR NOT is_read
+    GROUP BY 1, 2, 3
+"""
+
+# Actual minus stored count of every counter that is off
+_DRIFT = f"""
+    SELECT coalesce(a.farm_id, c.farm_id) AS farm_id,
+           coalesce(a.pond_id, c.pond_id) AS pond_id,
+           coalesce(a.severity, c.severity) AS severity,
+           coalesce(a.unresolved, 0) - coalesce(c.unresolved, 0) AS unresolved,
+           coalesce(a.unread, 0) - coalesce(c.unread, 0) AS unread
+    FROM ({_ACTUAL_COUNTS}) a
+    FULL JOIN alert_counters c
+        ON a.farm_id = c.farm_id AND a.pond_id = c.pond_id AND a.severity = c.severity
+    WHERE coalesce(a.unresolved, 0) <> coalesce(c.unresolved, 0)
+       OR coalesce(a.unread, 0) <> coalesce(c.unread, 0)
+    ORDER BY 1, 2, 3
+"""
+
+# Corrections are applied as increments, so they compose with the trigger
+# updates of transactions that committed after the recount
+_APPLY_DRIFT = """
+    INSERT INTO alert_counters AS c (farm_id, pond_id, severity, unresolved, unread)
+    VALUES (:farm_id, :pond_id, :severity, :unresolved, :unread)
+    ON CONFLICT (farm_id, pond_id, severity) DO UPDATE
+    SET unresolved = c.unresolved + EXCLUDED.unresolved, unread = c.unread + EXCLUDED.unread
+"""
+
+_DROP_EMPTY_COUNTERS = "DELETE FROM alert_counters WHERE unresolved = 0 AND unread = 0"
+
+
+class AlertCounterService:
+    """
+    Unresolved/unread alert counts per pond and severity.
+
+    The `alert_counters` table is kept current by statement-level triggers on
+    `alerts` (see models.ALERT_COUNTER_DDL), so every writer - API, ingest
+    hooks, bulk statements, cascading pond deletes - updates it in its own
+    transaction and reading stats costs one row per pond and severity however
+    large `alerts` grows. Reconciliation recounts open alerts now and then,
+    without blocking writers, to repair drift (e.g. rows changed with
+    triggers disabled) and to drop counters that reached zero. Only
+    PostgreSQL supports this.
+    """
+
+    def __init__(self, reconcile_minutes: int):
+        self.reconcile_minutes = reconcile_minutes
+        self._task: Optional[asyncio.Task] = None
+        self.reconciles = 0
+        self.corrected = 0
+
+    def install(self, db: Session) -> bool:
+        """Create the triggers on databases whose alerts table predates them"""
+        installed = db.execute(text(
+            "SELECT count(*) FROM pg_trigger WHERE tgrelid = 'alerts'::regclass AND tgname LIKE 'count_alerts_%'"
+        )).scalar()
+        if installed == 3:
+            return False
+        connection = db.connection()
+        for statement in ALERT_COUNTER_DDL:
+            connection.exec_driver_sql(statement)
+        db.commit()
+        logger.info("Installed alert counter triggers")
+        return True
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Recount open alerts and correct counters that differ; returns the
+        number of counters corrected. Nothing is locked: the recount and the
+        counters are read from one snapshot, and the differences are then
+        added to whatever the counters hold by now.
+        """
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        drift = [dict(row) for row in db.execute(text(_DRIFT)).mappings()]
+        db.rollback()
+        if drift:
+            db.execute(text(_APPLY_DRIFT), drift)
+        db.execute(text(_DROP_EMPTY_COUNTERS))
+        db.commit()
+        corrected = len(drift)
+        self.reconciles += 1
+        self.corrected += corrected
+        return corrected
+
+    def run_maintenance(self, db: Session = None) -> Dict[str, Any]:
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            if db.get_bind().dialect.name != "postgresql":
+                return {"installed": False, "corrected": 0}
+            return {"installed": self.install(db), "corrected": self.reconcile(db)}
+        finally:
+            if own_session:
+                db.close()
+
+    def stats(self, db: Session, farm_id: Any = None, pond_id: Any = None) -> Dict[str, Any]:
+        query = db.query(
+            AlertCounter.farm_id, AlertCounter.pond_id, AlertCounter.severity,
+            AlertCounter.unresolved, AlertCounter.unread
+        )
+        if farm_id:
+            query = query.filter(AlertCounter.farm_id == farm_id)
+        if pond_id:
+            query = query.filter(AlertCounter.pond_id == pond_id)
+
+        result = {"unresolved": 0, "unread": 0, "by_severity": {}, "by_farm": {}, "by_pond": {}}
+        for row in query:
+            if not row.unresolved and not row.unread:
+                continue
+            for group in (
+                result,
+                result["by_severity"].setdefault(row.severity, {"unresolved": 0, "unread": 0}),
+                result["by_farm"].setdefault(str(row.farm_id), {"unresolved": 0, "unread": 0}),
+                result["by_pond"].setdefault(str(row.pond_id), {"unresolved": 0, "unread": 0}),
+            ):
+                group["unresolved"] += row.unresolved
+                group["unread"] += row.unread
+        return result
+
+    async def start(self):
+        """Install triggers if needed, reconcile now and then every `reconcile_minutes`"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                summary = await run_in_threadpool(self.run_maintenance)
+                if summary["installed"] or summary["corrected"]:
+                    logger.info(f"Alert counter maintenance: {summary}")
+            except Exception as e:
+                logger.error(f"Alert counter maintenance failed: {e}")
+            await asyncio.sleep(self.reconcile_minutes * 60)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "reconcile_minutes": self.reconcile_minutes,
+            "reconciles": self.reconciles,
+            "corrected": self.corrected,
+        }
+
+
+# Create global instance
+alert_counter_service = AlertCounterService(
+    reconcile_minutes=settings.alert_counter_reconcile_minutes
+)
@@ -0,0 +1,417 @@
+"""
+Alert state tracking: hysteresis, deduplication and cooldown.
+
+Generated alerts (threshold violations, anomalies and the like) go through
+one tracker that keeps a state per (pond, signal, type). A signal is the
+parameter for threshold alerts; other detectors use their own signal names
+(stored as `signal` in the alert's meta_data) so their states stay apart:
+
+- while a condition persists, the open alert's `current_value` is updated in
+  place instead of inserting another row (a "suppressed" alert);
+- a condition clears only once the value is back inside its bound by the
+  hysteresis band, so a reading hovering around the bound does not flap;
+- a condition that returns within `alert_cooldown_minutes` of clearing
+  reopens the same alert rather than creating a new one; once the cooldown
+  has passed the cleared alert is resolved;
+- notifications for an open alert are repeated to each farm member at most
+  every `UserPreferences.alert_frequency` minutes.
+
+Inserts and updates are executed in the caller's transaction and become
+visible (published, notified) only once it commits.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, event, insert, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Alert, AlertSeverity, AlertType, FarmUser, User, UserPreferences
+from .cache import response_cache
+from .notifications import notification_service
+from .pubsub import telemetry_hub
+
+logger = logging.getLogger(__name__)
+
+PENDING_CHANGES = "alert_changes"
+DEFAULT_ALERT_FREQUENCY = 30  # minutes, UserPreferences.alert_frequency default
+
+SEVERITY_RANK = {
+    AlertSeverity.LOW: 0,
+    AlertSeverity.MEDIUM: 1,
+    AlertSeverity.HIGH: 2,
+    AlertSeverity.CRITICAL: 3,
+}
+
+AlertKey = Tuple[Any, str, AlertType]
+
+
+def signal_meta(meta_data: Optional[str]) -> Dict[str, Any]:
+    """
+    Tracking keys of an alert's meta_data: `signal` and, when the tracked
+    value is not the reading itself (e.g. an anomaly score), its `direction`
+    and `bound`
+    """
+    if meta_data and '"signal"' in meta_data:
+        try:
+            meta = json.loads(meta_data)
+            if isinstance(meta, dict):
+                return meta
+        except ValueError:
+            pass
+    return {}
+
+
+class AlertState:
+    __slots__ = ("alert_id", "farm_id", "severity", "direction", "bound", "band",
+                 "open", "cleared_at", "notify_checked_at", "notified")
+
+    def __init__(self, alert_id: Any, farm_id: Any, severity: AlertSeverity, direction: str,
+                 bound: float, band: Optional[float], now: float):
+        self.alert_id = alert_id
+        self.farm_id = farm_id
+        self.severity = severity
+        self.direction = direction
+        self.bound = bound
+        self.band = band
+        self.open = True
+        self.cleared_at: Optional[float] = None
+        self.notify_checked_at = now
+        self.notified: Dict[Any, float] = {}  # user id -> monotonic time of the last notification
+
+
+@dataclass
+class Violation:
+    alert_type: AlertType
+    severity: AlertSeverity
+    direction: str  # "high" or "low"
+    bound: float
+    # Stored on the alert when the tracked value is not the reading itself
+    current_value: Optional[float] = None
+    threshold_value: Optional[float] = None
+
+
+@dataclass
+class AlertChanges:
+    """What one batch did to the alerts table, applied on commit"""
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    notify: List[Tuple[Any, AlertKey, bool]] = field(default_factory=list)  # (alert id, key, new)
+    resolves: List[Any] = field(default_factory=list)  # alert ids
+
+    def __bool__(self):
+        return bool(self.inserts or self.updates or self.notify or self.resolves)
+
+
+class AlertTracker:
+    def __init__(self, hysteresis_fraction: float, hysteresis_bands: Dict[str, float],
+                 cooldown_minutes: int, renotify_check_minutes: int):
+        self.hysteresis_fraction = hysteresis_fraction
+        self.hysteresis_bands = hysteresis_bands
+        self.cooldown_seconds = cooldown_minutes * 60
+        self.renotify_check_seconds = renotify_check_minutes * 60
+        self.states: Dict[Tuple[Any, str], Dict[AlertType, AlertState]] = {}
+        self.loaded = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.suppressed = 0
+        self.escalated = 0
+        self.cleared = 0
+        self.notifications_sent = 0
+        self.notifications_suppressed = 0
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Loop on which notifications are sent"""
+        self._loop = loop
+
+    def band(self, parameter: str, span: Optional[float]) -> Optional[float]:
+        """
+        Hysteresis band of a parameter: the configured absolute band, else a
+        fraction of the rule's span (None falls back to a fraction of the bound)
+        """
+        if parameter in self.hysteresis_bands:
+            return self.hysteresis_bands[parameter]
+        return self.hysteresis_fraction * span if span else None
+
+    def load(self, db: Session):
+        """
+        Rebuild open states from unresolved alerts, keeping this worker's own
+        states (and their notification times) for alerts still unresolved
+        """
+        rows = db.query(
+            Alert.id, Alert.farm_id, Alert.pond_id, Alert.parameter, Alert.type,
+            Alert.severity, Alert.current_value, Alert.threshold_value, Alert.meta_data
+        ).filter(
+            Alert.is_resolved.is_(False),
+            or_(Alert.parameter.isnot(None), Alert.meta_data.like('%"signal"%'))
+        ).order_by(Alert.created_at).all()
+        now = time.monotonic()
+        with self._lock:
+            states: Dict[Tuple[Any, str], Dict[AlertType, AlertState]] = {}
+            for row in rows:
+                meta = signal_meta(row.meta_data)
+                source = (row.pond_id, meta.get("signal", row.parameter))
+                current = self.states.get(source, {}).get(row.type)
+                if current is None or current.alert_id != row.id:
+                    bound = meta.get("bound", row.threshold_value or 0.0)
+                    direction = meta.get("direction") or (
+                        "low" if (row.current_value or 0) < (row.threshold_value or 0) else "high"
+                    )
+                    current = AlertState(row.id, row.farm_id, row.severity, direction, bound, None, now)
+                states.setdefault(source, {})[row.type] = current
+            self.states = states
+            self.loaded = True
+
+    def forget(self, *alert_ids: Any):
+        """Drop the state of resolved or deleted alerts; the next violation opens a new one"""
+        alert_ids = set(alert_ids)
+        with self._lock:
+            for source in list(self.states):
+                by_type = self.states[source]
+                for alert_type in [t for t, state in by_type.items() if state.alert_id in alert_ids]:
+                    del by_type[alert_type]
+                if not by_type:
+                    del self.states[source]
+
+    def observe(
+        self,
+        changes: AlertChanges,
+        pond_id: Any,
+        signal: str,
+        value: float,
+        violation: Optional[Violation],
+        band: Optional[float],
+        make_alert: Callable[[], Dict[str, Any]]
+    ):
+        """
+        Fold one observation of a pond signal (the batch's worst or latest) into the state and
+        record the resulting insert/update/notification in `changes`
+        """
+        now = time.monotonic()
+        with self._lock:
+            by_type = self.states.get((pond_id, signal), {})
+            for alert_type, state in list(by_type.items()):
+                if state.open:
+                    if violation is None or violation.alert_type != alert_type:
+                        self._maybe_clear(state, value, now)
+                elif now - state.cleared_at >= self.cooldown_seconds:
+                    # Past the cooldown a return opens a new alert, so this one is over
+                    changes.resolves.append(state.alert_id)
+                    del by_type[alert_type]
+            if not by_type:
+                self.states.pop((pond_id, signal), None)
+            if violation is None:
+                return
+            key = (pond_id, signal, violation.alert_type)
+            state = by_type.get(violation.alert_type)
+            if state is None:
+                alert = make_alert()
+                changes.inserts.append(alert)
+                changes.notify.append((alert["id"], key, True))
+                self.states.setdefault((pond_id, signal), {})[violation.alert_type] = AlertState(
+                    alert["id"], alert["farm_id"], violation.severity, violation.direction,
+                    violation.bound, band, now
+                )
+                self.emitted += 1
+                return
+            self.suppressed += 1
+            state.open = True
+            state.direction, state.bound, state.band = violation.direction, violation.bound, band
+            escalated = SEVERITY_RANK[violation.severity] > SEVERITY_RANK[state.severity]
+            if escalated:
+                state.severity = violation.severity
+                self.escalated += 1
+            changes.updates.append({
+                "b_id": state.alert_id,
+                "b_value": value if violation.current_value is None else violation.current_value,
+                "b_threshold": violation.bound if violation.threshold_value is None else violation.threshold_value,
+                "b_severity": state.severity,
+            })
+            if escalated:
+                changes.notify.append((state.alert_id, key, True))
+            elif now - state.notify_checked_at >= self.renotify_check_seconds:
+                state.notify_checked_at = now
+                changes.notify.append((state.alert_id, key, False))
+
+    def is_open(self, pond_id: Any, signal: str) -> bool:
+        by_type = self.states.get((pond_id, signal))
+        return bool(by_type) and any(state.open for state in by_type.values())
+
+    def resolve(self, changes: AlertChanges, pond_id: Any, signal: str):
+        """
+        End a signal's alerts outright (e.g. a device reporting again): they
+        are marked resolved rather than merely cleared
+        """
+        with self._lock:
+            by_type = self.states.pop((pond_id, signal), None)
+        if by_type:
+            changes.resolves.extend(state.alert_id for state in by_type.values())
+            self.cleared += len(by_type)
+
+    def _maybe_clear(self, state: AlertState, value: float, now: float):
+        band = state.band if state.band is not None else self.hysteresis_fraction * abs(state.bound)
+        if state.direction == "high":
+            inside = value <= state.bound - band
+        else:
+            inside = value >= state.bound + band
+        if inside:
+            state.open = False
+            state.cleared_at = now
+            self.cleared += 1
+
+    def record(self, db: Session, changes: AlertChanges):
+        """Execute a batch's changes in the caller's transaction"""
+        if changes.inserts:
+            self._insert(db, changes)
+        if changes.updates:
+            # Core executemany on the session's connection: Session.execute
+            # would take a list of parameters as an ORM bulk UPDATE by primary key
+            alerts = Alert.__table__
+            db.connection().execute(
+                update(alerts).where(alerts.c.id == bindparam("b_id")).values(
+                    current_value=bindparam("b_value"),
+                    threshold_value=bindparam("b_threshold"),
+                    severity=bindparam("b_severity"),
+                    updated_at=datetime.utcnow()
+                ),
+                changes.updates
+            )
+        if changes.resolves:
+            now = datetime.utcnow()
+            db.execute(
+                update(Alert).where(Alert.id.in_(changes.resolves), Alert.is_resolved.is_(False)).values(
+                    is_resolved=True, resolved_at=now, updated_at=now
+                ).execution_options(synchronize_session=False)
+            )
+        self.defer(db, changes)
+
+    def _insert(self, db: Session, changes: AlertChanges):
+        if db.get_bind().dialect.name != "postgresql":
+            db.execute(insert(Alert), changes.inserts)
+            return
+        # Alerts with deterministic ids (e.g. SENSOR_OFFLINE) may already have
+        # been raised by another process; only the one that inserted notifies
+        alerts = Alert.__table__
+        inserted = set(db.connection().execute(
+            pg_insert(alerts).on_conflict_do_nothing(index_elements=["id"]).returning(alerts.c.id),
+            changes.inserts
+        ).scalars())
+        if len(inserted) < len(changes.inserts):
+            self.emitted -= len(changes.inserts) - len(inserted)
+            changes.inserts = [alert for alert in changes.inserts if alert["id"] in inserted]
+            changes.notify = [notice for notice in changes.notify if not notice[2] or notice[0] in inserted]
+
+    def defer(self, db: Session, changes: AlertChanges):
+        """Publish and notify `changes` once the session commits"""
+        if changes:
+            db.info.setdefault(PENDING_CHANGES, []).append(changes)
+
+    def rolled_back(self, changes: AlertChanges):
+        """Alerts of a rolled back batch were never inserted; drop their states"""
+        if changes.inserts:
+            self.forget(*(alert["id"] for alert in changes.inserts))
+            self.emitted -= len(changes.inserts)
+
+    def committed(self, changes: AlertChanges):
+        """Publish committed alerts and schedule their notifications"""
+        response_cache.invalidate("alerts")
+        for alert in changes.inserts:
+            telemetry_hub.publish("alert", alert["pond_id"], alert["farm_id"], ("alert", alert["id"]), alert)
+        if changes.notify and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._loop.create_task, self.notify(changes.notify))
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    def _due(self, key: AlertKey, user_id: Any, frequency_minutes: int, force: bool) -> bool:
+        """Whether a user may be notified about `key` now; records the notification if so"""
+        with self._lock:
+            state = self.states.get(key[:2], {}).get(key[2])
+            if state is None:
+                return force
+            now = time.monotonic()
+            last = state.notified.get(user_id)
+            if not force and last is not None and now - last < frequency_minutes * 60:
+                return False
+            state.notified[user_id] = now
+            return True
+
+    async def notify(self, notices: List[Tuple[Any, AlertKey, bool]]):
+        db = SessionLocal()
+        try:
+            alerts = {
+                alert.id: alert
+                for alert in db.query(Alert).filter(Alert.id.in_({notice[0] for notice in notices}))
+            }
+            members: Dict[Any, List[User]] = {}
+            for user, farm_id in db.query(User, FarmUser.farm_id).join(
+                FarmUser, FarmUser.user_id == User.id
+            ).filter(FarmUser.farm_id.in_({alert.farm_id for alert in alerts.values()})):
+                members.setdefault(farm_id, []).append(user)
+            user_ids = {user.id for users in members.values() for user in users}
+            frequencies = dict(db.query(UserPreferences.user_id, UserPreferences.alert_frequency).filter(
+                UserPreferences.user_id.in_(user_ids)
+            )) if user_ids else {}
+
+            for alert_id, key, new in notices:
+                alert = alerts.get(alert_id)
+                if alert is None or alert.is_resolved:
+                    continue
+                users = members.get(alert.farm_id, [])
+                due = [
+                    user for user in users
+                    if self._due(key, user.id, frequencies.get(user.id) or DEFAULT_ALERT_FREQUENCY, new)
+                ]
+                self.notifications_suppressed += len(users) - len(due)
+                if due:
+                    self.notifications_sent += len(due)
+                    await notification_service.send_alert_notification(alert, due, db)
+        except Exception as e:
+            logger.error(f"Alert notification failed: {e}")
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [state for by_type in self.states.values() for state in by_type.values()]
+        return {
+            "open_states": sum(1 for state in states if state.open),
+            "cleared_states": sum(1 for state in states if not state.open),
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+            "escalated": self.escalated,
+            "clears": self.cleared,
+            "notifications_sent": self.notifications_sent,
+            "notifications_suppressed": self.notifications_suppressed,
+        }
+
+
+# Create global instance
+alert_tracker = AlertTracker(
+    hysteresis_fraction=settings.alert_hysteresis_fraction,
+    hysteresis_bands=settings.alert_hysteresis_bands,
+    cooldown_minutes=settings.alert_cooldown_minutes,
+    renotify_check_minutes=settings.alert_renotify_check_minutes,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _alerts_committed(session: Session):
+    for changes in session.info.pop(PENDING_CHANGES, None) or ():
+        alert_tracker.committed(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _alerts_rolled_back(session: Session, previous_transaction):
+    for changes in session.info.pop(PENDING_CHANGES, None) or ():
+        alert_tracker.rolled_back(changes)
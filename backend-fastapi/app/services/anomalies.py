@@ -0,0 +1,409 @@
+"""
+Streaming anomaly detection on sensor readings.
+
+Each (pond, parameter) stream owns a slot in a handful of flat NumPy arrays
+holding its exponentially weighted mean and variance, the EWMA of its rate
+of change (per minute) and its last reading. A reading is scored in O(1)
+against that state:
+
+- value score: |z| of the reading against the EWMA mean / deviation,
+  divided by `anomaly_z_threshold`;
+- rate score: |rate| against the parameter's configured limit in
+  `anomaly_max_rates` (units per minute), or otherwise the rate's own
+  z-score divided by `anomaly_rate_z_threshold`.
+
+A score of 1 or more is an anomaly. Scores are raised as alerts of the
+parameter's high/low `AlertType` through the alert tracker under the
+signal "anomaly:<parameter>", so they are deduplicated apart from threshold
+alerts and clear once the score falls below 1 - `anomaly_clear_fraction`.
+
+Batches are scored in rounds, each round taking the next reading of every
+stream at once, so the arithmetic is vectorized across streams. State is
+per process and snapshotted every `anomaly_snapshot_seconds` (and at
+shutdown), so a restart resumes from the snapshot instead of rescanning
+history. Each process claims its own snapshot file next to
+`anomaly_snapshot_path` ("anomaly_state.api-0.npz", "...listener-0.npz")
+under an advisory lock, so workers never overwrite each other's state and a
+restarted worker takes over the file of exactly one previous worker.
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): one file per process id
+    fcntl = None
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import AlertSeverity, Pond
+from .alert_state import AlertChanges, AlertTracker, Violation, alert_tracker
+from .ingestion import ingestion_service
+from .thresholds import ALERT_TYPES, DEFAULT_ALERT_TYPES
+
+logger = logging.getLogger(__name__)
+
+STATE_ARRAYS = ("mean", "var", "rate_mean", "rate_var", "last_value", "last_time", "count")
+
+
+class AnomalyDetector:
+    def __init__(
+        self,
+        tracker: AlertTracker,
+        parameters: Sequence[str],
+        alpha: float,
+        z_threshold: float,
+        rate_z_threshold: float,
+        max_rates: Dict[str, float],
+        warmup_readings: int,
+        min_rate_seconds: int,
+        clear_fraction: float,
+        snapshot_path: str,
+        snapshot_seconds: int,
+        initial_slots: int = 1024
+    ):
+        self.tracker = tracker
+        self.parameters = list(parameters)
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.rate_z_threshold = rate_z_threshold
+        self.max_rates = max_rates
+        self.warmup_readings = warmup_readings
+        self.min_rate_seconds = min_rate_seconds
+        self.clear_fraction = clear_fraction
+        self.snapshot_base = snapshot_path
+        self.snapshot_path = ""  # set by claim_snapshot
+        self.snapshot_seconds = snapshot_seconds
+        self._snapshot_lock = None
+        self.slots: Dict[Tuple[Any, str], int] = {}
+        self.keys: List[Tuple[Any, str]] = []
+        self._allocate(initial_slots)
+        self.pond_farms: Dict[Any, Any] = {}
+        self.restored = False
+        self.snapshot_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.anomalies = 0
+
+    def _allocate(self, size: int):
+        self.mean = np.zeros(size)
+        self.var = np.zeros(size)
+        self.rate_mean = np.zeros(size)
+        self.rate_var = np.zeros(size)
+        self.last_value = np.zeros(size)
+        self.last_time = np.zeros(size)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.rate_limit = np.full(size, np.nan)
+
+    def _grow(self, size: int):
+        for name in STATE_ARRAYS + ("rate_limit",):
+            old = getattr(self, name)
+            new = np.full(size, np.nan) if name == "rate_limit" else np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def slot(self, pond_id: Any, parameter: str) -> int:
+        key = (pond_id, parameter)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.keys)
+            if slot >= len(self.count):
+                self._grow(2 * len(self.count))
+            self.slots[key] = slot
+            self.keys.append(key)
+            self.rate_limit[slot] = self.max_rates.get(parameter, np.nan)
+        return slot
+
+    def _step(self, s: np.ndarray, t: np.ndarray, v: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score and absorb one reading for each of the distinct slots `s`;
+        returns (score, sign of the deviation)
+        """
+        n = self.count[s]
+        mean, var = self.mean[s], self.var[s]
+        rate_mean, rate_var = self.rate_mean[s], self.rate_var[s]
+        # Late readings (older than the stream's last one) are ignored
+        fresh = (n == 0) | (t > self.last_time[s])
+        warm = n >= self.warmup_readings
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(var)
+            z = np.where(std > 0, (v - mean) / std, 0.0)
+            dt = np.maximum(t - self.last_time[s], self.min_rate_seconds)
+            rate = np.where(n > 0, (v - self.last_value[s]) * 60.0 / dt, 0.0)
+            rate_std = np.sqrt(rate_var)
+            rate_z = np.where(rate_std > 0, (rate - rate_mean) / rate_std, 0.0)
+            limit = self.rate_limit[s]
+
+            value_score = np.where(warm, np.abs(z) / self.z_threshold, 0.0)
+            rate_score = np.where(
+                np.isnan(limit),
+                np.where(warm & (n > 1), np.abs(rate_z) / self.rate_z_threshold, 0.0),
+                np.where(n > 0, np.abs(rate) / limit, 0.0)
+            )
+        score = np.where(fresh, np.maximum(value_score, rate_score), 0.0)
+        sign = np.where(value_score >= rate_score, np.sign(z), np.sign(rate))
+
+        # EWMA mean/variance update (West's incremental form)
+        diff = v - mean
+        incr = self.alpha * diff
+        new_mean = np.where(n == 0, v, mean + incr)
+        new_var = np.where(n == 0, 0.0, (1 - self.alpha) * (var + diff * incr))
+        rate_diff = rate - rate_mean
+        rate_incr = self.alpha * rate_diff
+        new_rate_mean = np.where(n == 1, rate, np.where(n > 1, rate_mean + rate_incr, 0.0))
+        new_rate_var = np.where(n > 1, (1 - self.alpha) * (rate_var + rate_diff * rate_incr), 0.0)
+
+        s = s[fresh]
+        self.mean[s] = new_mean[fresh]
+        self.var[s] = new_var[fresh]
+        self.rate_mean[s] = new_rate_mean[fresh]
+        self.rate_var[s] = new_rate_var[fresh]
+        self.last_value[s] = v[fresh]
+        self.last_time[s] = t[fresh]
+        self.count[s] += 1
+        return score, sign
+
+    def score(self, slots: np.ndarray, times: np.ndarray, values: np.ndarray):
+        """
+        Score readings of many streams, in timestamp order per stream.
+        Returns the (slot, time) sort order of the inputs, the sorted slots
+        and values, their scores and signs, and where each slot's run starts.
+        """
+        order = np.lexsort((times, slots))
+        slots, times, values = slots[order], times[order], values[order]
+        starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        # Position of each reading within its stream
+        rank = np.arange(len(slots)) - np.repeat(starts, np.diff(np.r_[starts, len(slots)]))
+        scores = np.zeros(len(slots))
+        signs = np.zeros(len(slots))
+        for position in range(int(rank.max()) + 1 if len(rank) else 0):
+            batch = np.flatnonzero(rank == position)
+            scores[batch], signs[batch] = self._step(slots[batch], times[batch], values[batch])
+        return order, slots, values, scores, signs, starts
+
+    def evaluate(self, rows: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        One observation per stream of the batch: its highest-scoring reading
+        if any was anomalous, else its latest one (which may clear an alert).
+        Items are (slot, row, value, score, sign).
+        """
+        slots, times, values, refs = [], [], [], []
+        with self._lock:
+            for i, row in enumerate(rows):
+                timestamp = row["timestamp"].timestamp()
+                for parameter in self.parameters:
+                    value = row.get(parameter)
+                    if value is None:
+                        continue
+                    slots.append(self.slot(row["pond_id"], parameter))
+                    times.append(timestamp)
+                    values.append(value)
+                    refs.append(i)
+            if not slots:
+                return []
+            order, slots, values, scores, signs, starts = self.score(
+                np.array(slots), np.array(times), np.array(values, dtype=float)
+            )
+        refs = np.array(refs)[order]
+        self.scored += len(scores)
+
+        observations = []
+        for start, end in zip(starts, np.r_[starts[1:], len(slots)]):
+            worst = start + int(np.argmax(scores[start:end]))
+            pick = worst if scores[worst] >= 1.0 else end - 1
+            observations.append((int(slots[pick]), rows[refs[pick]], float(values[pick]),
+                                 float(scores[pick]), float(signs[pick])))
+        return observations
+
+    def build_alert(
+        self, pond_id: Any, parameter: str, row: Dict[str, Any],
+        violation: Violation, slot: int, score: float
+    ) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        label = parameter.replace("_", " ").capitalize()
+        value = violation.current_value
+        expected = float(self.mean[slot])
+        deviation = float(np.sqrt(self.var[slot]))
+        trend = "rising" if violation.alert_type == ALERT_TYPES.get(parameter, DEFAULT_ALERT_TYPES)[0] else "falling"
+        return {
+            "id": uuid.uuid4(),
+            "farm_id": self.pond_farms[pond_id],
+            "pond_id": pond_id,
+            "user_id": None,
+            "type": violation.alert_type,
+            "severity": violation.severity,
+            "title": f"Abnormal {label.lower()} reading ({trend})",
+            "message": f"{label} is {value:g}, expected around {expected:.3g} ± {deviation:.2g}",
+            "parameter": parameter,
+            "current_value": value,
+            "threshold_value": expected,
+            "is_read": False,
+            "is_resolved": False,
+            "resolved_at": None,
+            "resolved_by": None,
+            "meta_data": json.dumps({
+                "signal": f"anomaly:{parameter}",
+                "direction": "high",
+                "bound": 1.0,
+                "score": round(score, 3),
+                "reading_id": str(row["id"]),
+                "reading_timestamp": row["timestamp"].isoformat(),
+            }),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def apply_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """Ingest hook: score the batch and raise, update or clear anomaly alerts"""
+        if not self.restored:
+            self.restore()
+        if not self.tracker.loaded:
+            self.tracker.load(db)
+        observations = self.evaluate(rows)
+        if not observations:
+            return
+
+        missing = {row["pond_id"] for row in rows} - self.pond_farms.keys()
+        if missing:
+            self.pond_farms.update(db.query(Pond.id, Pond.farm_id).filter(Pond.id.in_(missing)).all())
+
+        changes = AlertChanges()
+        band = self.clear_fraction
+        for slot, row, value, score, sign in observations:
+            pond_id, parameter = self.keys[slot]
+            if pond_id not in self.pond_farms:
+                continue
+            violation = None
+            if score >= 1.0:
+                self.anomalies += 1
+                high_type, low_type = ALERT_TYPES.get(parameter, DEFAULT_ALERT_TYPES)
+                violation = Violation(
+                    high_type if sign >= 0 else low_type,
+                    AlertSeverity.HIGH if score >= 2.0 else AlertSeverity.MEDIUM,
+                    "high", 1.0,
+                    current_value=value,
+                    threshold_value=float(self.mean[slot])
+                )
+            self.tracker.observe(
+                changes, pond_id, f"anomaly:{parameter}", score, violation, band,
+                partial(self.build_alert, pond_id, parameter, row, violation, slot, score)
+            )
+        self.tracker.record(db, changes)
+
+    def claim_snapshot(self, role: str) -> str:
+        """
+        Take the first snapshot file of `role` ("api", "listener") that no
+        live process holds and keep its lock until exit. Returns its path,
+        or "" when snapshots are disabled or the lock file cannot be created.
+        """
+        if not self.snapshot_base or self.snapshot_path:
+            return self.snapshot_path
+        base, extension = os.path.splitext(self.snapshot_base)
+        if fcntl is None:
+            self.snapshot_path = f"{base}.{role}-{os.getpid()}{extension}"
+            return self.snapshot_path
+        for slot in itertools.count():
+            path = f"{base}.{role}-{slot}{extension}"
+            try:
+                lock = open(f"{path}.lock", "a")
+            except OSError as e:
+                logger.error(f"Anomaly state snapshots disabled: {e}")
+                return ""
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()  # held by another live process
+                continue
+            self._snapshot_lock = lock
+            self.snapshot_path = path
+            logger.info(f"Anomaly state snapshots go to {path}")
+            return path
+
+    def maybe_snapshot(self, rows: List[Dict[str, Any]]):
+        """After-commit hook: snapshot the state every `snapshot_seconds`"""
+        if self.snapshot_path and time.monotonic() - self.snapshot_at >= self.snapshot_seconds:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the state atomically (temp file + rename) as an .npz archive"""
+        if not self.snapshot_path:
+            return
+        self.snapshot_at = time.monotonic()
+        with self._lock:
+            used = len(self.keys)
+            arrays = {name: getattr(self, name)[:used].copy() for name in STATE_ARRAYS}
+            ponds = np.array([str(pond_id) for pond_id, _ in self.keys], dtype=str)
+            parameters = np.array([parameter for _, parameter in self.keys], dtype=str)
+        temporary = f"{self.snapshot_path}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                np.savez(f, ponds=ponds, parameters=parameters, **arrays)
+            os.replace(temporary, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Anomaly state snapshot failed: {e}")
+
+    def restore(self):
+        """Load the last snapshot, if any; called once before the first batch"""
+        with self._lock:
+            if self.restored:
+                return
+            self.restored = True
+            if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+                return
+            try:
+                with np.load(self.snapshot_path) as snapshot:
+                    keys = [
+                        (uuid.UUID(pond_id), str(parameter))
+                        for pond_id, parameter in zip(snapshot["ponds"], snapshot["parameters"])
+                    ]
+                    arrays = {name: snapshot[name] for name in STATE_ARRAYS}
+            except (OSError, KeyError, ValueError) as e:
+                logger.error(f"Ignoring unreadable anomaly snapshot: {e}")
+                return
+            self._allocate(max(len(self.count), 2 * len(keys)))
+            for name, values in arrays.items():
+                getattr(self, name)[:len(keys)] = values
+            self.slots = {key: slot for slot, key in enumerate(keys)}
+            self.keys = keys
+            for slot, (_, parameter) in enumerate(keys):
+                self.rate_limit[slot] = self.max_rates.get(parameter, np.nan)
+            logger.info(f"Restored anomaly state of {len(keys)} streams")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "streams": len(self.keys),
+            "scored": self.scored,
+            "anomalies": self.anomalies,
+            "warm_streams": int(np.count_nonzero(self.count[:len(self.keys)] >= self.warmup_readings)),
+        }
+
+
+# Create global instance
+anomaly_detector = AnomalyDetector(
+    alert_tracker,
+    parameters=settings.anomaly_parameters,
+    alpha=settings.anomaly_alpha,
+    z_threshold=settings.anomaly_z_threshold,
+    rate_z_threshold=settings.anomaly_rate_z_threshold,
+    max_rates=settings.anomaly_max_rates,
+    warmup_readings=settings.anomaly_warmup_readings,
+    min_rate_seconds=settings.anomaly_min_rate_seconds,
+    clear_fraction=settings.anomaly_clear_fraction,
+    snapshot_path=settings.anomaly_snapshot_path,
+    snapshot_seconds=settings.anomaly_snapshot_seconds,
+)
+if settings.anomaly_detection_enabled:
+    ingestion_service.add_before_commit_hook(anomaly_detector.apply_rows)
+    ingestion_service.add_after_commit_hook(anomaly_detector.maybe_snapshot)
@@ -0,0 +1,250 @@
+"""
+Historical threshold backtesting.
+
+Replays a pond's stored readings against proposed thresholds to show how
+many alerts they would have raised. History is read through a server-side
+cursor in columnar chunks of `backtest_chunk_rows` and each chunk is
+evaluated with array operations only; the hysteresis state (and any
+episode still open) is carried from one chunk to the next, so results do
+not depend on the chunk size.
+
+The model mirrors live alerting (`alert_state`): a direction opens when a
+reading crosses its least severe bound, stays open until a reading is back
+inside by the hysteresis band, and an episode starting within the cooldown
+of the previous one is folded into the same alert.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Pond, SensorData, Threshold
+from .alert_state import alert_tracker
+
+SECOND = np.timedelta64(1, "s")
+
+
+class DirectionBacktest:
+    """Hysteresis state of one side (high or low) of a proposed threshold"""
+
+    def __init__(self, parameter: str, direction: str, bound: float, severe_bound: Optional[float], band: float):
+        self.parameter = parameter
+        self.direction = direction
+        self.bound = bound
+        self.severe_bound = severe_bound
+        self.band = band
+        # Work on sign * value so both directions compare "above"
+        self.sign = 1.0 if direction == "high" else -1.0
+        self.open = False
+        self.was_on = False
+        self.last_time: Optional[np.datetime64] = None
+        self.readings = 0
+        self.violating = 0
+        self.severe = 0
+        self.crossings = 0
+        self.starts: List[np.ndarray] = []
+        self.ends: List[np.ndarray] = []
+
+    def feed(self, timestamps: np.ndarray, values: np.ndarray):
+        if not len(values):
+            return
+        scaled = self.sign * values
+        trigger = self.sign * self.bound
+        with np.errstate(invalid="ignore"):
+            on = scaled > trigger
+            off = scaled <= trigger - self.band
+            if self.severe_bound is not None:
+                self.severe += int(np.count_nonzero(scaled > self.sign * self.severe_bound))
+        self.readings += int(np.count_nonzero(~np.isnan(values)))
+        self.violating += int(np.count_nonzero(on))
+
+        # Alerts a bare threshold would raise: every off -> on transition
+        previous = np.concatenate(([self.was_on], on[:-1]))
+        self.crossings += int(np.count_nonzero(on & ~previous))
+        self.was_on = bool(on[-1])
+
+        # Hysteresis: readings inside the band (or missing) keep the last
+        # decisive state, found by forward-filling the index of the last
+        # reading that was either on or off
+        decisive = on | off
+        last = np.where(decisive, np.arange(len(values)), -1)
+        np.maximum.accumulate(last, out=last)
+        state = np.where(last >= 0, on[np.maximum(last, 0)], self.open)
+
+        edges = np.diff(state.astype(np.int8), prepend=np.int8(self.open))
+        self.starts.append(timestamps[edges == 1])
+        self.ends.append(timestamps[edges == -1])
+        self.open = bool(state[-1])
+        self.last_time = timestamps[-1]
+
+    def result(self, cooldown_seconds: int, max_events: int) -> Dict[str, Any]:
+        starts = np.concatenate(self.starts) if self.starts else np.array([], dtype="datetime64[us]")
+        ends = np.concatenate(self.ends) if self.ends else np.array([], dtype="datetime64[us]")
+        ongoing = len(ends) < len(starts)
+        if ongoing:
+            ends = np.append(ends, self.last_time)
+
+        # Episodes starting within the cooldown of the previous one's end
+        # reopen the same alert
+        new_alert = np.ones(len(starts), dtype=bool)
+        if len(starts) > 1:
+            new_alert[1:] = (starts[1:] - ends[:-1]) >= np.timedelta64(cooldown_seconds, "s")
+        first = np.flatnonzero(new_alert)
+        last = np.append(first[1:] - 1, len(starts) - 1) if len(first) else first
+        alert_starts, alert_ends = starts[first], ends[last]
+        durations = (alert_ends - alert_starts) / SECOND
+
+        return {
+            "parameter": self.parameter,
+            "direction": self.direction,
+            "bound": self.bound,
+            "severe_bound": self.severe_bound,
+            "band": self.band,
+            "readings": self.readings,
+            "violating_readings": self.violating,
+            "severe_readings": self.severe,
+            "crossings": self.crossings,
+            "episodes": len(starts),
+            "alerts": len(first),
+            "ongoing": ongoing,
+            "total_duration_seconds": float(durations.sum()),
+            "longest_duration_seconds": float(durations.max()) if len(durations) else 0.0,
+            "events": [
+                {"start": start, "end": end, "duration_seconds": duration}
+                for start, end, duration in zip(
+                    alert_starts[:max_events].tolist(),
+                    alert_ends[:max_events].tolist(),
+                    durations[:max_events].tolist()
+                )
+            ],
+            "truncated": len(first) > max_events,
+        }
+
+
+def directions_for(threshold: Any) -> List[DirectionBacktest]:
+    """
+    The high and/or low sides of a threshold. Each opens at its least severe
+    bound (optimal range first) and counts readings past the outer bound as
+    severe, like live evaluation.
+    """
+    if threshold.min_value is not None and threshold.max_value is not None:
+        span = threshold.max_value - threshold.min_value
+    elif threshold.optimal_min is not None and threshold.optimal_max is not None:
+        span = threshold.optimal_max - threshold.optimal_min
+    else:
+        span = None
+    band = getattr(threshold, "hysteresis_band", None)
+    if band is None:
+        band = alert_tracker.band(threshold.parameter, span)
+
+    sides = []
+    high = threshold.optimal_max if threshold.optimal_max is not None else threshold.max_value
+    if high is not None:
+        sides.append(DirectionBacktest(
+            threshold.parameter, "high", high, threshold.max_value,
+            band if band is not None else alert_tracker.hysteresis_fraction * abs(high)
+        ))
+    low = threshold.optimal_min if threshold.optimal_min is not None else threshold.min_value
+    if low is not None:
+        sides.append(DirectionBacktest(
+            threshold.parameter, "low", low, threshold.min_value,
+            band if band is not None else alert_tracker.hysteresis_fraction * abs(low)
+        ))
+    return sides
+
+
+class ThresholdBacktester:
+    def __init__(self, chunk_rows: int):
+        self.chunk_rows = chunk_rows
+
+    def iter_chunks(
+        self, db: Session, pond_id: Any, start: datetime, end: datetime, parameters: Sequence[str]
+    ) -> Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """(timestamps, {parameter: values}) arrays per chunk, NaN for missing values"""
+        columns = [SensorData.timestamp] + [getattr(SensorData, parameter) for parameter in parameters]
+        result = db.execute(
+            select(*columns)
+            .where(
+                SensorData.pond_id == pond_id,
+                SensorData.timestamp >= start,
+                SensorData.timestamp < end
+            )
+            .order_by(SensorData.timestamp)
+            .execution_options(yield_per=self.chunk_rows)
+        )
+        for chunk in result.partitions():
+            transposed = list(zip(*chunk))
+            yield np.array(transposed[0], dtype="datetime64[us]"), {
+                parameter: np.array(transposed[i + 1], dtype=float)
+                for i, parameter in enumerate(parameters)
+            }
+
+    def pond_thresholds(self, db: Session, pond_id: Any) -> List[Threshold]:
+        return db.query(Threshold).filter(
+            Threshold.pond_id == pond_id, Threshold.is_active.is_(True)
+        ).all()
+
+    def run_pond(
+        self,
+        db: Session,
+        pond_id: Any,
+        start: datetime,
+        end: datetime,
+        thresholds: Sequence[Any],
+        cooldown_minutes: int,
+        max_events: int
+    ) -> Dict[str, Any]:
+        sides = [side for threshold in thresholds for side in directions_for(threshold)]
+        parameters = sorted({side.parameter for side in sides})
+        readings = 0
+        if parameters:
+            for timestamps, values in self.iter_chunks(db, pond_id, start, end, parameters):
+                readings += len(timestamps)
+                for side in sides:
+                    side.feed(timestamps, values[side.parameter])
+        return {
+            "pond_id": pond_id,
+            "readings": readings,
+            "results": [side.result(cooldown_minutes * 60, max_events) for side in sides],
+        }
+
+    def run(
+        self,
+        db: Session,
+        start: datetime,
+        end: datetime,
+        pond_id: Any = None,
+        farm_id: Any = None,
+        thresholds: Optional[Sequence[Any]] = None,
+        cooldown_minutes: Optional[int] = None,
+        max_events: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Backtest `thresholds` (or each pond's active thresholds when None)
+        on one pond or on every pond of a farm over [start, end)
+        """
+        if cooldown_minutes is None:
+            cooldown_minutes = settings.alert_cooldown_minutes
+        if pond_id:
+            pond_ids = [pond_id]
+        else:
+            pond_ids = [row.id for row in db.query(Pond.id).filter(Pond.farm_id == farm_id).order_by(Pond.name)]
+
+        ponds = []
+        for pond in pond_ids:
+            proposed = thresholds if thresholds is not None else self.pond_thresholds(db, pond)
+            ponds.append(self.run_pond(db, pond, start, end, proposed, cooldown_minutes, max_events))
+        return {
+            "start_time": start,
+            "end_time": end,
+            "cooldown_minutes": cooldown_minutes,
+            "ponds": ponds,
+        }
+
+
+# Create global instance
+backtest_service = ThresholdBacktester(chunk_rows=settings.backtest_chunk_rows)
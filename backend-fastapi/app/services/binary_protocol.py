@@ -0,0 +1,187 @@
+"""
+Compact binary wire format for pond sensor readings.
+
+A body is a sequence of frames. Each frame carries the readings of one
+device for one pond (all integers little-endian):
+
+    header   magic "AQ"          2 bytes
+             version             u8
+             flags               u8   (reserved, 0)
+             pond_id             16 bytes (UUID)
+             field_mask          u16  bit i set => SENSOR_METRICS[i] present
+             record_count        u16
+             base_timestamp      u32  unix seconds (UTC) of the first record
+             device_id_length    u8
+             device_id           device_id_length bytes, UTF-8
+    records  record_count times:
+             delta               u16  seconds since the previous record
+             values              f32 per set bit of field_mask, NaN = null
+
+Every record of a frame has the same fixed layout, so a frame is decoded
+with one precompiled struct per field mask instead of parsing fields.
+"""
+
+import struct
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..models import SENSOR_METRICS
+
+MAGIC = b"AQ"
+VERSION = 1
+
+HEADER = struct.Struct("<2sBB16sHHIB")
+MAX_RECORDS = 0xFFFF
+MAX_DELTA = 0xFFFF
+
+NAN = float("nan")
+
+
+class BinaryFrameError(ValueError):
+    """Raised when a frame is truncated or malformed"""
+
+
+@lru_cache(maxsize=None)
+def record_struct(field_mask: int) -> struct.Struct:
+    """Fixed record layout for a field mask"""
+    return struct.Struct("<H" + "f" * bin(field_mask).count("1"))
+
+
+@lru_cache(maxsize=None)
+def mask_fields(field_mask: int) -> Tuple[str, ...]:
+    """Metric names present in a field mask, in wire order"""
+    return tuple(name for bit, name in enumerate(SENSOR_METRICS) if field_mask & (1 << bit))
+
+
+def _epoch_to_datetime(seconds: int) -> datetime:
+    # sensor_data.timestamp is a naive UTC column
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def decode_frames(body: bytes) -> Iterator[Tuple[int, Optional[List[Dict[str, Any]]], Optional[str]]]:
+    """
+    Iterate over the frames of a body.
+
+    Yields (frame_index, readings, error). `readings` are dicts holding
+    pond_id, device_id, timestamp and the metrics of the frame; `error` is
+    set instead when the frame is malformed. Decoding stops at the first
+    frame whose length cannot be determined.
+    """
+    view = memoryview(body)
+    offset = 0
+    index = 0
+
+    while offset < len(view):
+        if len(view) - offset < HEADER.size:
+            yield index, None, "Truncated frame header"
+            return
+
+        magic, version, _flags, pond_bytes, field_mask, count, base_ts, device_len = \
+            HEADER.unpack_from(view, offset)
+        if magic != MAGIC:
+            yield index, None, "Bad frame magic"
+            return
+
+        offset += HEADER.size
+        device_id = bytes(view[offset:offset + device_len]).decode("utf-8", errors="replace") or None
+        offset += device_len
+
+        record = record_struct(field_mask)
+        end = offset + record.size * count
+        if end > len(view):
+            yield index, None, "Truncated frame records"
+            return
+
+        if version != VERSION:
+            yield index, None, f"Unsupported frame version {version}"
+        elif field_mask >> len(SENSOR_METRICS):
+            yield index, None, "Unknown fields in frame mask"
+        else:
+            yield index, _decode_records(
+                view[offset:end], record, field_mask, uuid.UUID(bytes=bytes(pond_bytes)),
+                device_id, base_ts
+            ), None
+
+        offset = end
+        index += 1
+
+
+def _decode_records(
+    records: memoryview,
+    record: struct.Struct,
+    field_mask: int,
+    pond_id: uuid.UUID,
+    device_id: Optional[str],
+    base_ts: int
+) -> List[Dict[str, Any]]:
+    fields = mask_fields(field_mask)
+    readings = []
+    ts = base_ts
+    for delta, *values in record.iter_unpack(records):
+        ts += delta
+        reading = {"pond_id": pond_id, "device_id": device_id, "timestamp": _epoch_to_datetime(ts)}
+        # NaN != NaN marks a missing value
+        reading.update((name, value if value == value else None) for name, value in zip(fields, values))
+        readings.append(reading)
+    return readings
+
+
+def encode_frames(
+    pond_id: uuid.UUID,
+    device_id: Optional[str],
+    readings: Iterable[Dict[str, Any]]
+) -> bytes:
+    """
+    Encode readings of one device into frames.
+
+    Each reading needs a `timestamp` (datetime, naive UTC, or unix seconds)
+    and any of the SENSOR_METRICS keys. Readings must be in time order; a new
+    frame is started when a gap or the record count no longer fits.
+    """
+    readings = list(readings)
+    if not readings:
+        return b""
+
+    field_mask = 0
+    for bit, name in enumerate(SENSOR_METRICS):
+        if any(reading.get(name) is not None for reading in readings):
+            field_mask |= 1 << bit
+    fields = mask_fields(field_mask)
+    record = record_struct(field_mask)
+
+    device_bytes = (device_id or "").encode("utf-8")[:255]
+    pond_bytes = (pond_id if isinstance(pond_id, uuid.UUID) else uuid.UUID(str(pond_id))).bytes
+
+    frames = []
+    chunk: List[bytes] = []
+    base_ts = previous_ts = None
+
+    def close_frame():
+        header = HEADER.pack(
+            MAGIC, VERSION, 0, pond_bytes, field_mask, len(chunk), base_ts, len(device_bytes)
+        )
+        frames.append(header + device_bytes + b"".join(chunk))
+
+    for reading in readings:
+        ts = _to_epoch(reading["timestamp"])
+        if chunk and (ts - previous_ts > MAX_DELTA or ts < previous_ts or len(chunk) == MAX_RECORDS):
+            close_frame()
+            chunk = []
+        if not chunk:
+            base_ts = previous_ts = ts
+        values = [NAN if reading.get(name) is None else reading[name] for name in fields]
+        chunk.append(record.pack(ts - previous_ts, *values))
+        previous_ts = ts
+
+    close_frame()
+    return b"".join(frames)
+
+
+def _to_epoch(value: Any) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
@@ -0,0 +1,225 @@
+"""
+Read cache for slowly changing resources (farms, ponds).
+
+Entries are encoded response bodies stored under versioned keys:
+
+    <namespace>:v<version>:<key>
+
+Writers invalidate a whole namespace by bumping its version, which makes
+every older key unreachable at once; the stale entries then age out through
+TTL or LRU eviction. With the Redis backend the versions live in Redis, so
+every worker sees an invalidation immediately. The in-memory backend is per
+process, so other workers may serve stale data for up to `cache_ttl_seconds`.
+
+The same versions back the ETags of conditional GETs (see `etag`), so an
+unchanged resource is answered with 304 from the version map alone.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import redis
+
+from ..config import settings
+from ..etag import make_etag
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """Size-bounded LRU with per-entry expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, etag_window: int):
+        self.max_entries = max_entries
+        self.etag_window = etag_window
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, namespaces: Sequence[str]) -> List[int]:
+        return [self._versions.get(namespace, 0) for namespace in namespaces]
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+    def epoch(self) -> str:
+        """
+        Versions restart at boot and other workers' writes are invisible
+        here, so ETags also carry the boot id and roll over every
+        `etag_window` seconds
+        """
+        return f"{self.boot_id}.{int(time.time() // self.etag_window)}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+class RedisCacheBackend:
+    """Shared cache; Redis applies TTLs and evicts under its own maxmemory policy"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"cache:{key}")
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(f"cache:{key}", value, ex=ttl)
+
+    def versions(self, namespaces: Sequence[str]) -> List[int]:
+        values = self.client.mget([f"cache:version:{namespace}" for namespace in namespaces])
+        return [int(value or 0) for value in values]
+
+    def bump(self, namespace: str) -> int:
+        return self.client.incr(f"cache:version:{namespace}")
+
+    def epoch(self) -> str:
+        return ""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class ResponseCache:
+    """
+    Cache front end used by the routers. Backend failures are logged and
+    treated as misses, so a Redis outage degrades to uncached reads.
+    """
+
+    def __init__(self, backend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.invalidations: Dict[str, int] = {}
+        self.errors = 0
+
+    def key(self, namespace: str, key: str) -> Optional[str]:
+        """Versioned key of `key` in `namespace`; None when caching is off or unavailable"""
+        if not self.enabled:
+            return None
+        try:
+            version = self.backend.versions([namespace])[0]
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+        return f"{namespace}:v{version}:{key}"
+
+    def get(self, key: Optional[str]) -> Optional[bytes]:
+        if key is None:
+            return None
+        namespace = key.split(":", 1)[0]
+        try:
+            value = self.backend.get(key)
+        except redis.RedisError as e:
+            self._failed(e)
+            value = None
+        counter = self.hits if value is not None else self.misses
+        counter[namespace] = counter.get(namespace, 0) + 1
+        return value
+
+    def set(self, key: Optional[str], value: bytes) -> bytes:
+        if key is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except redis.RedisError as e:
+                self._failed(e)
+        return value
+
+    def etag(self, namespaces: Sequence[str], *parts: Any) -> Optional[str]:
+        """
+        ETag for a response derived only from `namespaces` and the request
+        `parts`; None when the versions cannot be read
+        """
+        try:
+            versions = self.backend.versions(namespaces)
+            epoch = self.backend.epoch()
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+        return make_etag(epoch, *namespaces, *versions, *parts)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            try:
+                self.backend.bump(namespace)
+            except redis.RedisError as e:
+                self._failed(e)
+            self.invalidations[namespace] = self.invalidations.get(namespace, 0) + 1
+
+    def _failed(self, error: Exception):
+        self.errors += 1
+        logger.warning(f"Response cache backend error: {error}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        namespaces = sorted(set(self.hits) | set(self.misses) | set(self.invalidations))
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "errors": self.errors,
+            "namespaces": {
+                namespace: {
+                    "hits": self.hits.get(namespace, 0),
+                    "misses": self.misses.get(namespace, 0),
+                    "hit_ratio": _ratio(self.hits.get(namespace, 0), self.misses.get(namespace, 0)),
+                    "invalidations": self.invalidations.get(namespace, 0),
+                }
+                for namespace in namespaces
+            },
+            **self.backend.get_stats()
+        }
+
+
+def _ratio(hits: int, misses: int) -> Optional[float]:
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def _create_backend():
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(settings.redis_url)
+    if settings.cache_backend != "memory":
+        raise ValueError("cache_backend must be 'memory' or 'redis'")
+    return MemoryCacheBackend(settings.cache_max_entries, settings.etag_memory_window_seconds)
+
+
+# Create global instance
+response_cache = ResponseCache(
+    backend=_create_backend(),
+    ttl=settings.cache_ttl_seconds,
+    enabled=settings.cache_enabled
+)
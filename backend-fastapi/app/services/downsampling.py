@@ -0,0 +1,84 @@
+"""
+Vectorized time-series downsampling for chart queries.
+
+Both methods take `x` (float seconds, ascending) and `y` (float, NaN for
+missing) and return the indices of the points to keep, in time order.
+"""
+
+import numpy as np
+
+
+def _finite(y: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(~np.isnan(y))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last points and, for
+    each of `max_points - 2` equal-count buckets, the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket. Work per bucket is vectorized; the loop runs `max_points`
+    times regardless of input size.
+    """
+    valid = _finite(y)
+    n = len(valid)
+    if n <= max_points:
+        return valid
+    if max_points < 3:
+        return valid[np.linspace(0, n - 1, max_points).astype(int)]
+
+    xs, ys = x[valid], y[valid]
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+
+    # Averages of every bucket, computed at once; the last "next bucket" is the final point
+    sums_x = np.add.reduceat(xs[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(ys[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, xs[-1])
+    avg_y = np.append(sums_y / counts, ys[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        px, py = xs[previous], ys[previous]
+        nx, ny = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((px - nx) * (ys[start:end] - py) - (px - xs[start:end]) * (ny - py))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return valid[selected]
+
+
+def min_max(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Min/max bucketing: splits the time range into `max_points // 2` equal
+    buckets and keeps the lowest and highest point of each, preserving
+    spikes that averaging would hide. Fully vectorized.
+    """
+    valid = _finite(y)
+    n = len(valid)
+    buckets = max(max_points // 2, 1)
+    if n <= max_points:
+        return valid
+
+    xs, ys = x[valid], y[valid]
+    span = xs[-1] - xs[0] or 1.0
+    bucket_ids = np.minimum(((xs - xs[0]) / span * buckets).astype(np.int64), buckets - 1)
+
+    # Sorted by (bucket, value): first of each bucket is its min, last is its max
+    order = np.lexsort((ys, bucket_ids))
+    sorted_buckets = bucket_ids[order]
+    firsts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    lasts = np.r_[firsts[1:] - 1, n - 1]
+
+    keep = np.unique(np.concatenate([order[firsts], order[lasts]]))
+    return valid[keep]
+
+
+METHODS = {
+    "lttb": lttb,
+    "minmax": min_max,
+}
@@ -0,0 +1,159 @@
+"""
+Streaming export of sensor history as CSV, NDJSON or Parquet.
+
+Rows are read through a server-side cursor (`yield_per`) in chunks of
+`export_chunk_rows` and each chunk is encoded and handed to the response
+before the next one is fetched, so memory stays flat whatever the size of
+the export.
+"""
+
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select
+
+from ..columnar import arrow_record_batch, json_converter, to_columns
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Pond, SensorData
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = list(SensorData.__table__.columns)
+EXPORT_NAMES = [column.name for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def build_query(
+    pond_id: Any = None,
+    farm_id: Any = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    query = select(*EXPORT_COLUMNS)
+    if pond_id:
+        query = query.where(SensorData.pond_id == pond_id)
+    if farm_id:
+        query = query.where(SensorData.pond_id.in_(select(Pond.id).where(Pond.farm_id == farm_id)))
+    if start:
+        query = query.where(SensorData.timestamp >= start)
+    if end:
+        query = query.where(SensorData.timestamp < end)
+    return query.order_by(SensorData.timestamp, SensorData.id)
+
+
+def iter_chunks(query, chunk_rows: int) -> Iterator[Sequence[Any]]:
+    """Row chunks from a server-side cursor on a session owned by the generator"""
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=chunk_rows))
+        for chunk in result.partitions():
+            yield chunk
+    finally:
+        db.close()
+
+
+def encode_csv(chunks: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    converters = [json_converter(column) for column in EXPORT_COLUMNS]
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_NAMES)
+    for chunk in chunks:
+        for row in chunk:
+            writer.writerow([
+                value if value is None or convert is None else convert(value)
+                for value, convert in zip(row, converters)
+            ])
+        yield out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def encode_ndjson(chunks: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_NAMES, row))) + b"\n" for row in chunk)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are taken out after every row group"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def encode_parquet(chunks: Iterator[Sequence[Any]]) -> Iterator[bytes]:
+    """One Parquet row group per chunk, streamed as soon as it is written"""
+    sink = _ChunkSink()
+    writer = None
+    for chunk in chunks:
+        batch = arrow_record_batch(to_columns(chunk, EXPORT_NAMES), EXPORT_COLUMNS)
+        if writer is None:
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), batch.schema)
+        writer.write_table(pa.Table.from_batches([batch]))
+        yield sink.take()
+
+    if writer is None:
+        # No rows: still produce a valid file with the schema
+        empty = arrow_record_batch(to_columns([], EXPORT_NAMES), EXPORT_COLUMNS)
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), empty.schema)
+    writer.close()
+    yield sink.take()
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "parquet": encode_parquet,
+}
+
+
+def export_rows(query, fmt: str, chunk_rows: int = None) -> Iterator[bytes]:
+    """Encoded export body for a query built by `build_query`"""
+    chunks = iter_chunks(query, chunk_rows or settings.export_chunk_rows)
+    try:
+        yield from ENCODERS[fmt](chunks)
+    except Exception as e:
+        # Headers are already sent; all we can do is log and cut the stream short
+        logger.error(f"Sensor data export failed: {e}")
+        raise
+    finally:
+        chunks.close()
@@ -0,0 +1,415 @@
+"""
+Sensor offline detection.
+
+Every ingested batch refreshes the last-seen time of its devices, keyed by
+(pond, device_id), in memory. A device is offline once it has been silent
+for `heartbeat_missed_intervals` times its expected interval, taken from
+`heartbeat_intervals` (per device, then per pond) or else
+`heartbeat_default_interval_seconds`.
+
+Deadlines sit in a min-heap with one entry per device. A reading only moves
+the device's deadline in the registry (O(1)); the heap entry is fixed up
+lazily when it surfaces: an entry whose device has since reported is pushed
+back with the new deadline, so the watcher only ever touches devices that
+are actually due (O(log n) each) and never scans the fleet.
+
+Before raising SENSOR_OFFLINE for due devices, one query over their ponds'
+recent readings confirms they really are silent (another worker or the
+line listener may have ingested their data). Each process runs its own
+monitor, so the alert id derives from the device and its last reading and a
+second insert of it is skipped. When an offline device reports again its
+alert is resolved. Alerts go through the alert tracker under the
+signal "heartbeat:<device_id>".
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import AlertSeverity, AlertType, HeartbeatInterval, Pond, PondLatestReading, SensorData
+from .alert_state import AlertChanges, AlertTracker, Violation, alert_tracker
+from .ingestion import ingestion_service
+
+logger = logging.getLogger(__name__)
+
+DeviceKey = Tuple[Any, Optional[str]]
+
+_OFFLINE_NAMESPACE = uuid.UUID("0b7d2c4e-8a1f-4e6b-9c3d-5f2a7e1b4c90")
+
+
+def to_epoch(ts: datetime) -> float:
+    """Seconds since the epoch; naive timestamps are UTC"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)
+
+
+def signal_for(device_id: Optional[str]) -> str:
+    return f"heartbeat:{device_id or ''}"
+
+
+class Device:
+    __slots__ = ("key", "interval", "last_seen", "deadline", "offline")
+
+    def __init__(self, key: DeviceKey, interval: int, last_seen: float, deadline: float):
+        self.key = key
+        self.interval = interval
+        self.last_seen = last_seen
+        self.deadline = deadline
+        self.offline = False
+
+
+class HeartbeatMonitor:
+    def __init__(
+        self,
+        tracker: AlertTracker,
+        default_interval: int,
+        missed_intervals: int,
+        tick_seconds: int,
+        reload_seconds: int,
+        seed_hours: int
+    ):
+        self.tracker = tracker
+        self.default_interval = default_interval
+        self.missed_intervals = missed_intervals
+        self.tick_seconds = tick_seconds
+        self.reload_seconds = reload_seconds
+        self.seed_hours = seed_hours
+        self.devices: Dict[DeviceKey, Device] = {}
+        self.heap: List[Tuple[float, int, DeviceKey]] = []
+        self._sequence = itertools.count()
+        self.device_intervals: Dict[Tuple[Any, str], int] = {}  # (pond id or None, device id)
+        self.pond_intervals: Dict[Any, int] = {}
+        self.intervals_loaded_at: Optional[float] = None
+        self.recovered: Set[DeviceKey] = set()
+        self.pond_farms: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.beats = 0
+        self.went_offline = 0
+        self.came_back = 0
+        self.confirmed_alive = 0
+
+    def interval_for(self, pond_id: Any, device_id: Optional[str]) -> int:
+        if device_id:
+            for key in ((pond_id, device_id), (None, device_id)):
+                if key in self.device_intervals:
+                    return self.device_intervals[key]
+        return self.pond_intervals.get(pond_id, self.default_interval)
+
+    def load_intervals(self, db: Session):
+        device_intervals, pond_intervals = {}, {}
+        for row in db.query(HeartbeatInterval):
+            if row.device_id:
+                device_intervals[(row.pond_id, row.device_id)] = row.interval_seconds
+            elif row.pond_id:
+                pond_intervals[row.pond_id] = row.interval_seconds
+        self.device_intervals, self.pond_intervals = device_intervals, pond_intervals
+        self.intervals_loaded_at = time.monotonic()
+        with self._lock:
+            for device in self.devices.values():
+                device.interval = self.interval_for(*device.key)
+
+    def _push(self, device: Device):
+        heapq.heappush(self.heap, (device.deadline, next(self._sequence), device.key))
+
+    def _observe(self, key: DeviceKey, seen: float, now: float, allow_overdue: bool = False):
+        """Record that a device reported at `seen`; caller holds the lock"""
+        device = self.devices.get(key)
+        if device is None:
+            interval = self.interval_for(*key)
+            if interval <= 0:
+                return
+            deadline = seen + interval * self.missed_intervals
+            if deadline <= now and not allow_overdue:
+                return  # backfilled history, not a live device
+            device = self.devices[key] = Device(key, interval, seen, deadline)
+            self._push(device)
+            if self.tracker.is_open(key[0], signal_for(key[1])):
+                self.recovered.add(key)
+        elif seen > device.last_seen:
+            device.last_seen = seen
+            device.deadline = seen + device.interval * self.missed_intervals
+            if device.offline:
+                device.offline = False
+                self._push(device)
+                self.recovered.add(key)
+
+    def beat(self, rows: List[Dict[str, Any]]):
+        """After-commit hook: refresh the deadline of each device in the batch"""
+        latest: Dict[DeviceKey, float] = {}
+        for row in rows:
+            key = (row["pond_id"], row.get("device_id"))
+            seen = to_epoch(row["timestamp"])
+            if seen > latest.get(key, 0.0):
+                latest[key] = seen
+        now = time.time()
+        with self._lock:
+            for key, seen in latest.items():
+                self._observe(key, seen, now)
+            self.beats += len(latest)
+            recovered = bool(self.recovered)
+        if recovered:
+            self._wake_soon()
+
+    def _wake_soon(self):
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    def seed(self, db: Session):
+        """Start watching the last reporting device of each pond seen recently"""
+        cutoff = datetime.utcnow() - timedelta(hours=self.seed_hours)
+        rows = db.query(
+            PondLatestReading.pond_id, PondLatestReading.device_id, PondLatestReading.timestamp
+        ).filter(PondLatestReading.timestamp >= cutoff).all()
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                self._observe((row.pond_id, row.device_id), to_epoch(row.timestamp), now, allow_overdue=True)
+
+    def pop_due(self, now: float) -> List[Device]:
+        due = []
+        with self._lock:
+            while self.heap and self.heap[0][0] <= now:
+                deadline, _, key = heapq.heappop(self.heap)
+                device = self.devices.get(key)
+                if device is None or device.offline:
+                    continue
+                if device.deadline > now:
+                    self._push(device)  # reported since this entry was pushed
+                    continue
+                due.append(device)
+        return due
+
+    def confirm_silent(self, db: Session, due: List[Device], now: float) -> List[Device]:
+        """Drop due devices whose readings reached the database through another process"""
+        since = from_epoch(min(device.last_seen for device in due))
+        rows = db.query(
+            SensorData.pond_id, SensorData.device_id, func.max(SensorData.timestamp)
+        ).filter(
+            SensorData.pond_id.in_({device.key[0] for device in due}),
+            SensorData.timestamp > since
+        ).group_by(SensorData.pond_id, SensorData.device_id).all()
+        latest = {(pond_id, device_id): to_epoch(ts) for pond_id, device_id, ts in rows}
+
+        silent = []
+        with self._lock:
+            for device in due:
+                seen = latest.get(device.key)
+                if seen is not None and seen > device.last_seen:
+                    device.last_seen = seen
+                    device.deadline = seen + device.interval * self.missed_intervals
+                    if device.deadline > now:
+                        self._push(device)
+                        self.confirmed_alive += 1
+                        continue
+                silent.append(device)
+        return silent
+
+    def build_alert(self, device: Device, silence: float) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        pond_id, device_id = device.key
+        name = f"Sensor {device_id}" if device_id else "Pond sensor"
+        minutes = silence / 60
+        # Every process watching the device (API workers, line listener)
+        # confirms the same last reading, so they raise the same alert
+        last_seen = from_epoch(device.last_seen).isoformat()
+        return {
+            "id": uuid.uuid5(_OFFLINE_NAMESPACE, f"{pond_id}:{device_id or ''}:{last_seen}"),
+            "farm_id": self.pond_farms[pond_id],
+            "pond_id": pond_id,
+            "user_id": None,
+            "type": AlertType.SENSOR_OFFLINE,
+            "severity": AlertSeverity.HIGH,
+            "title": f"{name} offline",
+            "message": (
+                f"{name} has not reported for {minutes:.0f} minutes "
+                f"(expected every {device.interval / 60:g} minutes)"
+            ),
+            "parameter": None,
+            "current_value": silence,
+            "threshold_value": float(device.interval * self.missed_intervals),
+            "is_read": False,
+            "is_resolved": False,
+            "resolved_at": None,
+            "resolved_by": None,
+            "meta_data": json.dumps({
+                "signal": signal_for(device_id),
+                "device_id": device_id,
+                "last_seen": last_seen,
+            }),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def check(self):
+        """Raise alerts for devices past their deadline and resolve those back online"""
+        now = time.time()
+        due = self.pop_due(now)
+        with self._lock:
+            recovered, self.recovered = self.recovered, set()
+        reload = self.intervals_loaded_at is None or time.monotonic() - self.intervals_loaded_at > self.reload_seconds
+        if not due and not recovered and not reload:
+            return
+
+        db = SessionLocal()
+        try:
+            if reload:
+                self.load_intervals(db)
+            if not self.tracker.loaded:
+                self.tracker.load(db)
+            if due:
+                due = self.confirm_silent(db, due, now)
+            missing = {device.key[0] for device in due} - self.pond_farms.keys()
+            if missing:
+                self.pond_farms.update(db.query(Pond.id, Pond.farm_id).filter(Pond.id.in_(missing)).all())
+
+            changes = AlertChanges()
+            for device in due:
+                pond_id, device_id = device.key
+                if pond_id not in self.pond_farms:
+                    with self._lock:
+                        self.devices.pop(device.key, None)  # pond was deleted
+                    continue
+                device.offline = True
+                silence = now - device.last_seen
+                violation = Violation(
+                    AlertType.SENSOR_OFFLINE, AlertSeverity.HIGH, "high", 1.0,
+                    current_value=silence,
+                    threshold_value=float(device.interval * self.missed_intervals)
+                )
+                self.tracker.observe(
+                    changes, pond_id, signal_for(device_id), 1.0, violation, 0.0,
+                    partial(self.build_alert, device, silence)
+                )
+            for pond_id, device_id in recovered:
+                self.tracker.resolve(changes, pond_id, signal_for(device_id))
+            self.tracker.record(db, changes)
+            db.commit()
+            self.went_offline += sum(1 for device in due if device.offline)
+            self.came_back += len(recovered)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Every due device was popped from the heap; retry them all on the next tick
+                for device in due:
+                    device.offline = False
+                    self._push(device)
+                self.recovered |= recovered
+            # Alert states touched by this check are rebuilt from the database
+            self.tracker.loaded = False
+            raise
+        finally:
+            db.close()
+
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        try:
+            await run_in_threadpool(self._prepare)
+        except Exception as e:
+            logger.error(f"Heartbeat seeding failed: {e}")
+        while True:
+            with self._lock:
+                next_deadline = self.heap[0][0] if self.heap else None
+            timeout = self.tick_seconds
+            if next_deadline is not None:
+                timeout = min(timeout, max(next_deadline - time.time(), 0.0))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.check)
+            except Exception as e:
+                logger.error(f"Heartbeat check failed: {e}")
+                await asyncio.sleep(self.tick_seconds)
+
+    def _prepare(self):
+        db = SessionLocal()
+        try:
+            self.load_intervals(db)
+            self.seed(db)
+        finally:
+            db.close()
+
+    def status(self, pond_ids: Optional[Set[Any]] = None, offline_only: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            devices = [
+                device for device in self.devices.values()
+                if (pond_ids is None or device.key[0] in pond_ids) and (device.offline or not offline_only)
+            ]
+            return [
+                {
+                    "pond_id": device.key[0],
+                    "device_id": device.key[1],
+                    "interval_seconds": device.interval,
+                    "last_seen": from_epoch(device.last_seen),
+                    "deadline": from_epoch(device.deadline),
+                    "online": not device.offline,
+                }
+                for device in sorted(devices, key=lambda device: device.last_seen)
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            offline = sum(1 for device in self.devices.values() if device.offline)
+            return {
+                "devices": len(self.devices),
+                "offline": offline,
+                "heap_entries": len(self.heap),
+                "beats": self.beats,
+                "went_offline": self.went_offline,
+                "came_back": self.came_back,
+                "confirmed_alive": self.confirmed_alive,
+            }
+
+
+# Create global instance
+heartbeat_monitor = HeartbeatMonitor(
+    alert_tracker,
+    default_interval=settings.heartbeat_default_interval_seconds,
+    missed_intervals=settings.heartbeat_missed_intervals,
+    tick_seconds=settings.heartbeat_tick_seconds,
+    reload_seconds=settings.heartbeat_reload_seconds,
+    seed_hours=settings.heartbeat_seed_hours,
+)
+if settings.heartbeat_enabled:
+    ingestion_service.add_after_commit_hook(heartbeat_monitor.beat)
@@ -0,0 +1,229 @@
+import csv
+import enum
+import io
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Pond, SensorData
+from ..schemas import SensorDataCreate
+
+logger = logging.getLogger(__name__)
+
+# Column order used for COPY and for every prepared row
+SENSOR_DATA_COLUMNS = [column.name for column in SensorData.__table__.columns]
+
+
+def naive_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    """`ts` as naive UTC, the convention of every timestamp column"""
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+BeforeCommitHook = Callable[[Session, List[Dict[str, Any]]], None]
+AfterCommitHook = Callable[[List[Dict[str, Any]]], None]
+
+
+class SensorIngestionService:
+    """
+    Single write path for sensor readings.
+
+    Every ingestion route (single row, batch, streaming, ...) prepares plain
+    row dicts and hands them to `ingest`, which writes them with one multi-row
+    INSERT or a PostgreSQL COPY inside a single transaction. Other services
+    register hooks to maintain derived state from the same rows.
+    """
+
+    def __init__(self):
+        self.before_commit_hooks: List[BeforeCommitHook] = []
+        self.after_commit_hooks: List[AfterCommitHook] = []
+
+    def add_before_commit_hook(self, hook: BeforeCommitHook):
+        """Run `hook(db, rows)` inside the ingest transaction"""
+        self.before_commit_hooks.append(hook)
+
+    def add_after_commit_hook(self, hook: AfterCommitHook):
+        """Run `hook(rows)` once the rows are durable"""
+        self.after_commit_hooks.append(hook)
+
+    def prepare_row(self, reading: SensorDataCreate, user_id: Any) -> Dict[str, Any]:
+        """
+        Turn a validated reading into a complete `sensor_data` row
+        """
+        row = reading.dict()
+        now = datetime.utcnow()
+        row["id"] = uuid.uuid4()
+        row["user_id"] = user_id
+        # Clients send offsets (JS toISOString() ends in "Z")
+        row["timestamp"] = naive_utc(row.get("timestamp")) or now
+        row["created_at"] = now
+        return {column: row.get(column) for column in SENSOR_DATA_COLUMNS}
+
+    def rows_from_readings(
+        self,
+        readings: List[Dict[str, Any]],
+        user_id: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        Complete already-typed readings (e.g. decoded from a binary frame)
+        into `sensor_data` rows without going through pydantic
+        """
+        now = datetime.utcnow()
+        template = dict.fromkeys(SENSOR_DATA_COLUMNS)
+        template["user_id"] = user_id
+        template["created_at"] = now
+        rows = []
+        for reading in readings:
+            row = template.copy()
+            row.update(reading)
+            row["id"] = uuid.uuid4()
+            if row["timestamp"] is None:
+                row["timestamp"] = now
+            rows.append(row)
+        return rows
+
+    def validate_batch(
+        self,
+        db: Session,
+        payload: List[Any],
+        user_id: Any,
+        indexes: Optional[List[int]] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Validate raw readings and return (rows, errors).
+
+        Invalid items are reported by index (their position in `payload`, or
+        the matching entry of `indexes`) instead of failing the whole batch.
+        Pond existence is checked with one query for the batch so a single
+        unknown pond cannot abort the insert on a foreign key error.
+        """
+        rows = []
+        row_indexes = []
+        errors = []
+
+        if indexes is None:
+            indexes = range(len(payload))
+
+        for index, item in zip(indexes, payload):
+            try:
+                reading = SensorDataCreate(**item)
+            except ValidationError as e:
+                errors.append({"index": index, "detail": e.errors()})
+                continue
+            except TypeError:
+                errors.append({"index": index, "detail": "Reading must be a JSON object"})
+                continue
+            rows.append(self.prepare_row(reading, user_id))
+            row_indexes.append(index)
+
+        rows, unknown = self.split_unknown_ponds(db, rows)
+        for position in unknown:
+            errors.append({"index": row_indexes[position], "detail": "Pond not found"})
+
+        errors.sort(key=lambda error: error["index"])
+        return rows, errors
+
+    def split_unknown_ponds(
+        self,
+        db: Session,
+        rows: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Return (rows with an existing pond, positions of the other rows)
+        using a single query for the whole batch
+        """
+        if not rows:
+            return rows, []
+
+        pond_ids = {row["pond_id"] for row in rows}
+        known_ponds = {
+            pond_id for (pond_id,) in
+            db.query(Pond.id).filter(Pond.id.in_(pond_ids)).all()
+        }
+        if len(known_ponds) == len(pond_ids):
+            return rows, []
+
+        valid_rows = []
+        unknown = []
+        for position, row in enumerate(rows):
+            if row["pond_id"] in known_ponds:
+                valid_rows.append(row)
+            else:
+                unknown.append(position)
+        return valid_rows, unknown
+
+    def ingest(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write prepared rows in a single transaction and run the ingest hooks
+        """
+        if not rows:
+            return 0
+
+        try:
+            if self.should_copy(db, rows):
+                self.copy_rows(db, rows)
+            else:
+                db.execute(insert(SensorData), rows)
+
+            for hook in self.before_commit_hooks:
+                hook(db, rows)
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for hook in self.after_commit_hooks:
+            try:
+                hook(rows)
+            except Exception as e:
+                logger.error(f"Sensor ingest hook {hook!r} failed: {e}")
+
+        return len(rows)
+
+    def should_copy(self, db: Session, rows: List[Dict[str, Any]]) -> bool:
+        """COPY only pays off for large batches and only exists on PostgreSQL"""
+        return (
+            len(rows) >= settings.ingest_copy_threshold
+            and db.get_bind().dialect.name == "postgresql"
+        )
+
+    def copy_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """
+        Stream rows into `sensor_data` with COPY on the session's connection
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in SENSOR_DATA_COLUMNS])
+        buffer.seek(0)
+
+        statement = (
+            f"COPY {SensorData.__tablename__} ({', '.join(SENSOR_DATA_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+
+def _copy_value(value: Any) -> Any:
+    """Render a row value for COPY csv (None becomes an unquoted NULL)"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# Create global instance
+ingestion_service = SensorIngestionService()
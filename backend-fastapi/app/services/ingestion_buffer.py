@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from ..config import settings
+from ..database import SessionLocal
+from .ingestion import ingestion_service
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionBufferFull(Exception):
+    """Raised when the buffer already holds `max_rows` unflushed readings"""
+
+
+class UnknownPondError(Exception):
+    """Raised on a durable waiter whose reading references a missing pond"""
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a write failed because of the database rather than the rows"""
+    return isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
+
+class IngestionBuffer:
+    """
+    Write-behind group-commit buffer for single-reading requests.
+
+    Requests append prepared rows and return immediately (or wait for the
+    flush when durable acknowledgement is requested). A background task
+    writes everything pending as one multi-row insert whenever `flush_rows`
+    readings are queued or `flush_interval_ms` has elapsed.
+
+    Readings are acknowledged before they are written, so a failed flush
+    does not drop the batch: a lost connection puts it back at the head of
+    the queue and flushing backs off, while any other error is narrowed
+    down by bisecting the batch and only the rows that fail on their own
+    are discarded.
+    """
+
+    def __init__(self, max_rows: int, flush_rows: int, flush_interval_ms: int):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.pending: List[Dict[str, Any]] = []
+        self.waiters: List[Tuple[int, asyncio.Future]] = []
+        self.stats = {
+            "submitted": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "rejected_full": 0,
+            "rejected_unknown_pond": 0,
+            "failed": 0,
+            "requeued": 0,
+            "last_flush_ms": 0.0
+        }
+        self.consecutive_failures = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the background flush task on the running loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Sensor ingestion buffer started")
+
+    async def stop(self):
+        """Stop the flush task after its current flush and write whatever is still pending"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        await self.flush()
+        if self.pending:
+            logger.error(f"Sensor ingestion buffer stopped with {len(self.pending)} unwritten rows")
+        logger.info("Sensor ingestion buffer stopped")
+
+    def submit(self, row: Dict[str, Any], durable: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queue a prepared row. Returns a future resolved once the row is
+        committed when `durable` is set, otherwise None.
+        """
+        if len(self.pending) >= self.max_rows:
+            self.stats["rejected_full"] += 1
+            raise IngestionBufferFull()
+
+        waiter = None
+        if durable:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append((len(self.pending), waiter))
+
+        self.pending.append(row)
+        self.stats["submitted"] += 1
+        if len(self.pending) >= self.flush_rows:
+            self._wakeup.set()
+        return waiter
+
+    def submit_many(self, rows: List[Dict[str, Any]]):
+        """
+        Queue prepared rows without durable acknowledgement. The whole list
+        is accepted as long as the buffer is not already full, so callers
+        should keep their lists small.
+        """
+        if len(self.pending) >= self.max_rows:
+            self.stats["rejected_full"] += len(rows)
+            raise IngestionBufferFull()
+
+        self.pending.extend(rows)
+        self.stats["submitted"] += len(rows)
+        if len(self.pending) >= self.flush_rows:
+            self._wakeup.set()
+
+    async def wait_for_space(self):
+        """Block until the buffer is below `max_rows`"""
+        while len(self.pending) >= self.max_rows:
+            self._wakeup.set()
+            await self._drained.wait()
+
+    async def flush(self):
+        """Write all pending rows in one transaction"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self.pending:
+                return
+
+            rows, waiters = self.pending, self.waiters
+            self.pending, self.waiters = [], []
+            if self._drained is not None:
+                # Wake producers blocked in wait_for_space
+                self._drained.set()
+                self._drained = asyncio.Event()
+
+            started = time.perf_counter()
+            try:
+                unknown, failed, retry = await run_in_threadpool(self._write, rows)
+            except Exception as e:
+                logger.error(f"Sensor ingestion buffer flush of {len(rows)} rows failed: {e}")
+                if is_transient(e):
+                    unknown, failed, retry = set(), {}, list(range(len(rows)))
+                else:
+                    unknown, failed, retry = set(), dict.fromkeys(range(len(rows)), e), []
+
+            if retry:
+                # Database unreachable: keep the unwritten rows ahead of newer ones
+                self.consecutive_failures += 1
+                self.stats["requeued"] += len(retry)
+                moved = {position: index for index, position in enumerate(retry)}
+                self.waiters = [
+                    (moved[position], waiter) for position, waiter in waiters if position in moved
+                ] + [(position + len(retry), waiter) for position, waiter in self.waiters]
+                self.pending = [rows[position] for position in retry] + self.pending
+                if len(retry) == len(rows):
+                    return
+            else:
+                self.consecutive_failures = 0
+
+            self.stats["flushes"] += 1
+            self.stats["flushed"] += len(rows) - len(unknown) - len(failed) - len(retry)
+            self.stats["rejected_unknown_pond"] += len(unknown)
+            self.stats["failed"] += len(failed)
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+            retry = set(retry)
+            for position, waiter in waiters:
+                if waiter.done() or position in retry:
+                    continue
+                if position in unknown:
+                    waiter.set_exception(UnknownPondError())
+                elif position in failed:
+                    waiter.set_exception(failed[position])
+                else:
+                    waiter.set_result(True)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> Tuple[set, Dict[int, Exception], List[int]]:
+        """
+        Insert rows on a dedicated session, dropping unknown ponds. Returns
+        (positions of unknown ponds, {position: error} of rejected rows,
+        positions left unwritten because the database was unreachable).
+        """
+        db = SessionLocal()
+        try:
+            unknown = set(ingestion_service.split_unknown_ponds(db, rows)[1])
+            positions = [position for position in range(len(rows)) if position not in unknown]
+            retry: List[int] = []
+            failed = self._insert(db, [rows[position] for position in positions], positions, retry)
+            return unknown, failed, retry
+        finally:
+            db.close()
+
+    def _insert(
+        self,
+        db,
+        rows: List[Dict[str, Any]],
+        positions: List[int],
+        retry: List[int]
+    ) -> Dict[int, Exception]:
+        """Ingest rows, bisecting on failure until the rows that fail alone are isolated"""
+        if not rows:
+            return {}
+        try:
+            ingestion_service.ingest(db, rows)
+            return {}
+        except Exception as e:
+            if is_transient(e):
+                retry.extend(positions)
+                return {}
+            if len(rows) == 1:
+                logger.error(f"Sensor ingestion buffer dropped a reading of pond {rows[0].get('pond_id')}: {e}")
+                return {positions[0]: e}
+            middle = len(rows) // 2
+            return {
+                **self._insert(db, rows[:middle], positions[:middle], retry),
+                **self._insert(db, rows[middle:], positions[middle:], retry),
+            }
+
+    async def _run(self):
+        while not self._stopping:
+            # Back off while the database keeps failing
+            timeout = self.flush_interval * 2 ** min(self.consecutive_failures, 6)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": len(self.pending), "running": self.running}
+
+
+# Create global instance
+ingestion_buffer = IngestionBuffer(
+    max_rows=settings.ingest_buffer_max_rows,
+    flush_rows=settings.ingest_buffer_flush_rows,
+    flush_interval_ms=settings.ingest_buffer_flush_interval_ms
+)
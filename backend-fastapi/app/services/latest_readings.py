@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import PondLatestReading, SensorData
+from .ingestion import ingestion_service
+
+logger = logging.getLogger(__name__)
+
+LATEST_COLUMNS = [column.name for column in PondLatestReading.__table__.columns]
+
+_upsert = pg_insert(PondLatestReading)
+UPSERT_LATEST = _upsert.on_conflict_do_update(
+    index_elements=["pond_id"],
+    set_={column: _upsert.excluded[column] for column in LATEST_COLUMNS if column != "pond_id"},
+    # Late or replayed readings never overwrite a newer one
+    where=_upsert.excluded.timestamp >= PondLatestReading.__table__.c.timestamp
+)
+
+
+class LatestReadingStore:
+    """
+    Last-value store for pond readings.
+
+    Ingest upserts the newest row of each pond into `pond_latest_readings`
+    (inside the ingest transaction) and into an in-process map once
+    committed. Reads are served from the map, falling back to one primary
+    key lookup for the missing or expired ponds, so the `sensor_data`
+    history table is only touched for ponds the store has never seen, and
+    what it finds there is written back to `pond_latest_readings`.
+    Entries expire after `latest_cache_ttl_ms` so writes made by other
+    workers become visible; ponds without any reading are remembered for
+    `latest_negative_ttl_ms` (this worker's own ingest replaces them at once).
+    """
+
+    def __init__(self, ttl_ms: int, negative_ttl_ms: int):
+        self.ttl = ttl_ms / 1000
+        self.negative_ttl = negative_ttl_ms / 1000
+        self._entries: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+        self._warned_dialect = False
+
+    def newest_per_pond(self, rows: Iterable[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        newest = {}
+        for row in rows:
+            current = newest.get(row["pond_id"])
+            if current is None or row["timestamp"] >= current["timestamp"]:
+                newest[row["pond_id"]] = row
+        return newest
+
+    def apply_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """Ingest hook: upsert the newest row of each pond in the batch"""
+        if db.get_bind().dialect.name != "postgresql":
+            if not self._warned_dialect:
+                logger.warning("pond_latest_readings upsert requires PostgreSQL; skipping")
+                self._warned_dialect = True
+            return
+
+        newest = self.newest_per_pond(rows)
+        values = [
+            {column: row.get(column) for column in LATEST_COLUMNS}
+            for _, row in sorted(newest.items(), key=lambda item: str(item[0]))
+        ]
+        db.execute(UPSERT_LATEST, values)
+
+    def persist(self, db: Session, rows: List[Dict[str, Any]]):
+        """
+        Store rows seeded from history so the next lookup (from any worker)
+        is a primary key hit. Runs in its own transaction on the session's
+        engine, leaving the caller's session untouched.
+        """
+        engine = db.get_bind()
+        if engine.dialect.name != "postgresql":
+            return
+        try:
+            with engine.begin() as connection:
+                connection.execute(UPSERT_LATEST, sorted(rows, key=lambda row: str(row["pond_id"])))
+        except Exception as e:
+            logger.warning(f"Could not store {len(rows)} seeded latest readings: {e}")
+
+    def remember(self, rows: List[Dict[str, Any]]):
+        """After-commit hook: refresh the in-process map"""
+        now = time.monotonic()
+        with self._lock:
+            for pond_id, row in self.newest_per_pond(rows).items():
+                entry = self._entries.get(pond_id)
+                if entry is None or entry[0] is None or row["timestamp"] >= entry[0]["timestamp"]:
+                    self._entries[pond_id] = (row, now)
+
+    def get(self, db: Session, pond_id: Any) -> Optional[Dict[str, Any]]:
+        return self.get_many(db, [pond_id]).get(pond_id)
+
+    def get_many(
+        self, db: Session, pond_ids: List[Any], seed_missing: bool = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Latest reading of each pond that has one. With `seed_missing=False`
+        ponds absent from the store are not looked up in history, which
+        keeps the lookup to a single statement.
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            for pond_id in pond_ids:
+                entry = self._entries.get(pond_id)
+                if entry is not None and now - entry[1] < (self.ttl if entry[0] is not None else self.negative_ttl):
+                    # A None entry remembers that the pond has no reading yet
+                    if entry[0] is not None:
+                        found[pond_id] = entry[0]
+                else:
+                    missing.append(pond_id)
+
+        if missing:
+            loaded = {
+                reading.pond_id: _as_dict(reading, LATEST_COLUMNS)
+                for reading in db.query(PondLatestReading).filter(
+                    PondLatestReading.pond_id.in_(missing)
+                ).all()
+            }
+            seeded = []
+            for pond_id in missing:
+                if seed_missing and pond_id not in loaded:
+                    # Pond ingested before the store existed: seed it once from
+                    # history. Ordered by the partition key, so PostgreSQL walks
+                    # partitions newest first and stops at the first hit.
+                    reading = db.query(SensorData).filter(
+                        SensorData.pond_id == pond_id
+                    ).order_by(SensorData.timestamp.desc()).first()
+                    if reading is not None:
+                        loaded[pond_id] = _as_dict(reading, LATEST_COLUMNS)
+                        seeded.append(loaded[pond_id])
+            if seeded:
+                self.persist(db, seeded)
+            with self._lock:
+                for pond_id in missing:
+                    self._entries[pond_id] = (loaded.get(pond_id), now)
+            found.update(loaded)
+
+        return found
+
+
+def _as_dict(obj: Any, columns: List[str]) -> Dict[str, Any]:
+    return {column: getattr(obj, column) for column in columns}
+
+
+# Create global instance
+latest_store = LatestReadingStore(
+    ttl_ms=settings.latest_cache_ttl_ms,
+    negative_ttl_ms=settings.latest_negative_ttl_ms
+)
+ingestion_service.add_before_commit_hook(latest_store.apply_rows)
+ingestion_service.add_after_commit_hook(latest_store.remember)
@@ -0,0 +1,244 @@
+"""
+Line-protocol listener for direct device ingestion over TCP and UDP.
+
+Each line is one reading:
+
+    <pond_id>[,<device_id>] [<timestamp>] <field>=<value>[,<field>=<value>...]
+
+for example
+
+    3f1c...-9a2e,probe-7 1721314800 temperature=24.6,ph_level=7.4
+
+The timestamp is unix time in seconds, milliseconds or nanoseconds and
+defaults to the arrival time; fields are SENSOR_METRICS columns. Parsed
+lines skip FastAPI/pydantic entirely and go straight to the ingestion
+buffer, so one process can absorb tens of thousands of readings per second.
+"""
+
+import asyncio
+import logging
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..models import SENSOR_METRICS
+from .ingestion import ingestion_service
+from .ingestion_buffer import ingestion_buffer, IngestionBufferFull
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAMES = frozenset(SENSOR_METRICS)
+READ_SIZE = 64 * 1024
+
+
+def parse_line(line: bytes) -> Dict[str, Any]:
+    """Parse one line into a reading dict, raising ValueError when malformed"""
+    parts = line.decode("utf-8").split()
+    if len(parts) == 3:
+        head, ts, fields = parts
+    elif len(parts) == 2:
+        head, fields = parts
+        ts = None
+    else:
+        raise ValueError("Expected '<pond_id>[,<device_id>] [<timestamp>] <fields>'")
+
+    pond_part, _, device_id = head.partition(",")
+    reading = {
+        "pond_id": uuid.UUID(pond_part),
+        "device_id": device_id or None,
+        "timestamp": _parse_timestamp(ts) if ts else None,
+    }
+    for pair in fields.split(","):
+        name, _, value = pair.partition("=")
+        if name not in METRIC_NAMES:
+            raise ValueError(f"Unknown field '{name}'")
+        reading[name] = _parse_finite(value, name)
+    return reading
+
+
+def _parse_finite(value: str, name: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"Non-finite {name} '{value}'")
+    return number
+
+
+def _parse_timestamp(value: str) -> datetime:
+    ts = _parse_finite(value, "timestamp")
+    if ts > 1e17:
+        ts /= 1e9  # nanoseconds
+    elif ts > 1e11:
+        ts /= 1e3  # milliseconds
+    try:
+        return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f"Timestamp '{value}' out of range")
+
+
+class ConnectionStats:
+    """Counters for one TCP connection (or for all UDP datagrams)"""
+
+    def __init__(self, peer: str):
+        self.peer = peer
+        self.connected_at = datetime.utcnow()
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.paused = 0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "peer": self.peer,
+            "connected_at": self.connected_at.isoformat(),
+            "lines": self.lines,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "paused": self.paused,
+            "last_error": self.last_error,
+        }
+
+
+class LineProtocolListener:
+    """
+    Asyncio TCP and UDP servers feeding the shared ingestion buffer.
+
+    TCP connections get real backpressure: when the buffer is full the
+    connection stops reading until a flush drains it, which lets the
+    kernel's TCP window push back on the device. UDP has no flow control,
+    so datagrams arriving while the buffer is full are dropped and counted.
+    """
+
+    def __init__(self):
+        self.user_id = settings.line_listener_user_id
+        self.max_line = settings.line_listener_max_line_bytes
+        self.tcp_server: Optional[asyncio.AbstractServer] = None
+        self.udp_transport: Optional[asyncio.DatagramTransport] = None
+        self.connections: Dict[int, ConnectionStats] = {}
+        self.closed = ConnectionStats("closed-connections")
+        self.udp = ConnectionStats("udp")
+        self.connections_total = 0
+
+    async def start(self, host: str = None, tcp_port: int = None, udp_port: int = None):
+        host = host or settings.line_listener_host
+        tcp_port = tcp_port if tcp_port is not None else settings.line_listener_tcp_port
+        udp_port = udp_port if udp_port is not None else settings.line_listener_udp_port
+
+        loop = asyncio.get_running_loop()
+        self.tcp_server = await asyncio.start_server(self._handle_tcp, host, tcp_port)
+        self.udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UDPProtocol(self), local_addr=(host, udp_port)
+        )
+        logger.info(f"Line protocol listener on {host} tcp:{tcp_port} udp:{udp_port}")
+
+    async def stop(self):
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            await self.tcp_server.wait_closed()
+            self.tcp_server = None
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+            self.udp_transport = None
+
+    def parse_lines(self, lines: List[bytes], stats: ConnectionStats) -> List[Dict[str, Any]]:
+        """Parse lines into prepared rows, counting malformed ones"""
+        readings = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            stats.lines += 1
+            try:
+                readings.append(parse_line(line))
+            except (ValueError, OverflowError, OSError) as e:
+                stats.rejected += 1
+                stats.last_error = str(e)
+        return ingestion_service.rows_from_readings(readings, self.user_id)
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        stats = ConnectionStats(f"{peer[0]}:{peer[1]}" if peer else "unknown")
+        key = id(writer)
+        self.connections[key] = stats
+        self.connections_total += 1
+
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                buffer.extend(data)
+                end = buffer.rfind(b"\n")
+                if end == -1:
+                    if len(buffer) > self.max_line:
+                        stats.rejected += 1
+                        stats.last_error = "Line too long"
+                        break
+                    continue
+
+                lines = bytes(buffer[:end]).split(b"\n")
+                del buffer[:end + 1]
+                rows = self.parse_lines(lines, stats)
+                if not rows:
+                    continue
+
+                if len(ingestion_buffer.pending) >= ingestion_buffer.max_rows:
+                    # Stop reading from this socket until a flush frees space
+                    stats.paused += 1
+                    await ingestion_buffer.wait_for_space()
+                ingestion_buffer.submit_many(rows)
+                stats.accepted += len(rows)
+
+            if buffer.strip():
+                rows = self.parse_lines([bytes(buffer)], stats)
+                if rows:
+                    await ingestion_buffer.wait_for_space()
+                    ingestion_buffer.submit_many(rows)
+                    stats.accepted += len(rows)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            stats.last_error = str(e)
+        finally:
+            self._close_connection(key, stats)
+            writer.close()
+
+    def _close_connection(self, key: int, stats: ConnectionStats):
+        self.connections.pop(key, None)
+        for counter in ("lines", "accepted", "rejected", "dropped", "paused"):
+            setattr(self.closed, counter, getattr(self.closed, counter) + getattr(stats, counter))
+
+    def handle_datagram(self, data: bytes):
+        rows = self.parse_lines(data.split(b"\n"), self.udp)
+        if not rows:
+            return
+        try:
+            ingestion_buffer.submit_many(rows)
+            self.udp.accepted += len(rows)
+        except IngestionBufferFull:
+            self.udp.dropped += len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.tcp_server is not None,
+            "connections_active": len(self.connections),
+            "connections_total": self.connections_total,
+            "closed_connections": self.closed.as_dict(),
+            "udp": self.udp.as_dict(),
+            "connections": [stats.as_dict() for stats in self.connections.values()],
+        }
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: LineProtocolListener):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr):
+        self.listener.handle_datagram(data)
+
+
+# Create global instance
+line_listener = LineProtocolListener()
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import SensorData
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = SensorData.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class SensorPartitionManager:
+    """
+    Maintains the time partitions of `sensor_data`.
+
+    Partitions cover one calendar month or one ISO week. Maintenance creates
+    the current and the next `premake` partitions ahead of time, and detaches
+    (or drops) partitions whose whole range is older than the retention
+    period. Only PostgreSQL supports this; on other databases it is a no-op.
+    """
+
+    def __init__(self, interval: str, premake: int, retention_days: int, retention_action: str):
+        if interval not in ("month", "week"):
+            raise ValueError("sensor_partition_interval must be 'month' or 'week'")
+        if retention_action not in ("detach", "drop"):
+            raise ValueError("sensor_retention_action must be 'detach' or 'drop'")
+        self.interval = interval
+        self.premake = premake
+        self.retention_days = retention_days
+        self.retention_action = retention_action
+        self._task: Optional[asyncio.Task] = None
+
+    def period_start(self, ts: datetime) -> datetime:
+        """Start of the partition period containing `ts`"""
+        day = datetime(ts.year, ts.month, ts.day)
+        if self.interval == "week":
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    def next_period(self, start: datetime) -> datetime:
+        if self.interval == "week":
+            return start + timedelta(days=7)
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{PARENT_TABLE}_p{start:%Y%m%d}"
+
+    def list_partitions(self, db: Session) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+        """Attached partitions as (name, start, end); the default partition has no bounds"""
+        result = db.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {"parent": PARENT_TABLE})
+
+        partitions = []
+        for name, bound in result:
+            match = _BOUND_RE.search(bound or "")
+            if match:
+                partitions.append((
+                    name,
+                    datetime.fromisoformat(match.group(1)),
+                    datetime.fromisoformat(match.group(2))
+                ))
+            else:
+                partitions.append((name, None, None))
+        return partitions
+
+    def ensure_partitions(self, db: Session, now: datetime = None) -> List[str]:
+        """Create missing partitions from the current period up to `premake` ahead"""
+        now = now or datetime.utcnow()
+        existing = self.list_partitions(db)
+        ranges = [(start, end) for _, start, end in existing if start is not None]
+        created = []
+
+        if not any(name == DEFAULT_PARTITION for name, _, _ in existing):
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+            db.commit()
+
+        start = self.period_start(now)
+        for _ in range(self.premake + 1):
+            end = self.next_period(start)
+            # Skip periods already covered, e.g. after switching month <-> week
+            if not any(start < r_end and r_start < end for r_start, r_end in ranges):
+                name = self.partition_name(start)
+                bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                try:
+                    db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+                    db.commit()
+                except Exception:
+                    # Rows for this range already sit in the default partition
+                    db.rollback()
+                    try:
+                        self.split_default(db, name, start, end, bounds)
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Could not create partition {name}: {e}")
+                        start = end
+                        continue
+                created.append(name)
+                ranges.append((start, end))
+            start = end
+
+        return created
+
+    def split_default(self, db: Session, name: str, start: datetime, end: datetime, bounds: str):
+        """
+        Create partition `name` when the default partition holds rows of its
+        range: move those rows into a new table and attach it, in one
+        transaction
+        """
+        db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        moved = db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ), {"start": start, "end": end}).rowcount
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+        db.commit()
+        logger.info(f"Partition {name} created with {moved} rows moved from {DEFAULT_PARTITION}")
+
+    def apply_retention(self, db: Session, now: datetime = None) -> List[str]:
+        """Detach or drop partitions that end before the retention cutoff"""
+        if self.retention_days <= 0:
+            return []
+
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+        expired = []
+        for name, start, end in self.list_partitions(db):
+            if end is None or end > cutoff:
+                continue
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if self.retention_action == "drop":
+                db.execute(text(f"DROP TABLE {name}"))
+            db.commit()
+            expired.append(name)
+            logger.info(f"Partition {name} expired ({self.retention_action})")
+        return expired
+
+    def run_maintenance(self, db: Session = None) -> Dict[str, Any]:
+        """Create upcoming partitions and expire old ones"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            if db.get_bind().dialect.name != "postgresql":
+                return {"created": [], "expired": []}
+            return {
+                "created": self.ensure_partitions(db),
+                "expired": self.apply_retention(db)
+            }
+        finally:
+            if own_session:
+                db.close()
+
+    async def start(self):
+        """
+        Run maintenance now and then every `sensor_partition_maintenance_hours`.
+        The first run is awaited so the current partition exists before
+        ingestion starts.
+        """
+        if self._task is None:
+            await self.maintain()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def maintain(self):
+        try:
+            summary = await run_in_threadpool(self.run_maintenance)
+            if summary["created"] or summary["expired"]:
+                logger.info(f"Sensor partition maintenance: {summary}")
+        except Exception as e:
+            logger.error(f"Sensor partition maintenance failed: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.sensor_partition_maintenance_hours * 3600)
+            await self.maintain()
+
+
+# Create global instance
+partition_manager = SensorPartitionManager(
+    interval=settings.sensor_partition_interval,
+    premake=settings.sensor_partition_premake,
+    retention_days=settings.sensor_retention_days,
+    retention_action=settings.sensor_retention_action
+)
@@ -0,0 +1,146 @@
+"""
+In-process pub/sub hub pushing live readings and alerts to subscribers.
+
+Publishers (ingest after-commit hooks, alert creation) may run on the event
+loop or on worker threads; messages are encoded once and handed to the loop
+with `call_soon_threadsafe`, so publishing never blocks on a subscriber.
+
+Each subscriber has a bounded mailbox. Readings are coalesced per pond (a
+slow client gets the newest reading of each pond rather than a backlog),
+and when the mailbox is full the oldest message is dropped. Producers are
+never stalled by a slow consumer.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from ..config import settings
+from .ingestion import ingestion_service
+from .latest_readings import latest_store
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Bounded, coalescing mailbox of one client; used on the loop thread only"""
+
+    def __init__(self, pond_ids: Set[Any], farm_ids: Set[Any], max_pending: int):
+        self.pond_ids = pond_ids
+        self.farm_ids = farm_ids
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[Any, bytes]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, key: Any, message: bytes):
+        if key in self.pending:
+            # Newer message for the same key replaces the queued one
+            del self.pending[key]
+            self.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = message
+        self._ready.set()
+
+    async def next_batch(self) -> List[bytes]:
+        """Wait for messages and take everything queued"""
+        await self._ready.wait()
+        self._ready.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.delivered += len(batch)
+        return batch
+
+
+class TelemetryHub:
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._by_pond: Dict[Any, Set[Subscription]] = {}
+        self._by_farm: Dict[Any, Set[Subscription]] = {}
+        self.subscriptions: Set[Subscription] = set()
+        self.published = 0
+        self.closed = {"delivered": 0, "coalesced": 0, "dropped": 0}
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Called at startup with the loop that serves subscribers"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def subscribe(self, pond_ids: Iterable[Any], farm_ids: Iterable[Any]) -> Subscription:
+        subscription = Subscription(set(pond_ids), set(farm_ids), self.max_pending)
+        for pond_id in subscription.pond_ids:
+            self._by_pond.setdefault(pond_id, set()).add(subscription)
+        for farm_id in subscription.farm_ids:
+            self._by_farm.setdefault(farm_id, set()).add(subscription)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, keys in ((self._by_pond, subscription.pond_ids), (self._by_farm, subscription.farm_ids)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del index[key]
+        self.subscriptions.discard(subscription)
+        for counter in self.closed:
+            self.closed[counter] += getattr(subscription, counter)
+
+    def publish(self, kind: str, pond_id: Any, farm_id: Any, key: Any, data: Dict[str, Any]):
+        """Publish from any thread; a no-op while nobody is subscribed"""
+        if self._loop is None or not self.subscriptions:
+            return
+        message = orjson.dumps({"type": kind, "pond_id": pond_id, "data": data})
+        if threading.get_ident() == self._loop_thread:
+            self._dispatch(pond_id, farm_id, key, message)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._dispatch, pond_id, farm_id, key, message)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    def _dispatch(self, pond_id: Any, farm_id: Any, key: Any, message: bytes):
+        subscribers = set(self._by_pond.get(pond_id, ()))
+        if farm_id is not None:
+            subscribers |= self._by_farm.get(farm_id, set())
+        for subscription in subscribers:
+            subscription.offer(key, message)
+        self.published += 1
+
+    def publish_readings(self, rows: List[Dict[str, Any]]):
+        """After-commit hook: publish the newest reading of each pond in the batch"""
+        if not self.subscriptions:
+            return
+        for pond_id, row in latest_store.newest_per_pond(rows).items():
+            self.publish("reading", pond_id, None, ("reading", pond_id), row)
+
+    def publish_alert(self, alert: Any):
+        data = {column.name: getattr(alert, column.name) for column in alert.__table__.columns}
+        self.publish("alert", alert.pond_id, alert.farm_id, ("alert", alert.id), data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        open_totals = {
+            counter: sum(getattr(subscription, counter) for subscription in self.subscriptions)
+            for counter in self.closed
+        }
+        return {
+            "subscribers": len(self.subscriptions),
+            "published": self.published,
+            **{counter: self.closed[counter] + open_totals[counter] for counter in self.closed}
+        }
+
+
+# Create global instance
+telemetry_hub = TelemetryHub(max_pending=settings.telemetry_max_pending)
+ingestion_service.add_after_commit_hook(telemetry_hub.publish_readings)
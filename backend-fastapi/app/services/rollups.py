@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models import ROLLUP_RESOLUTIONS, SENSOR_METRICS, SENSOR_ROLLUP_TABLES
+from .ingestion import ingestion_service
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def floor_timestamp(ts: datetime, width: int) -> datetime:
+    """Start of the `width`-second bucket containing `ts`"""
+    seconds = int((ts - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % width)
+
+
+@lru_cache(maxsize=None)
+def _upsert_statement(resolution: str):
+    """
+    Multi-row upsert merging pre-aggregated buckets into a rollup table.
+    Built once per table.
+    """
+    table = SENSOR_ROLLUP_TABLES[resolution]
+    stmt = pg_insert(table)
+    current, new = table.c, stmt.excluded
+
+    merge = {}
+    for metric in SENSOR_METRICS:
+        newer = and_(
+            new[f"{metric}_last_ts"].isnot(None),
+            or_(
+                current[f"{metric}_last_ts"].is_(None),
+                new[f"{metric}_last_ts"] >= current[f"{metric}_last_ts"]
+            )
+        )
+        merge[f"{metric}_min"] = func.least(current[f"{metric}_min"], new[f"{metric}_min"])
+        merge[f"{metric}_max"] = func.greatest(current[f"{metric}_max"], new[f"{metric}_max"])
+        merge[f"{metric}_sum"] = func.coalesce(current[f"{metric}_sum"], 0) + func.coalesce(new[f"{metric}_sum"], 0)
+        merge[f"{metric}_count"] = current[f"{metric}_count"] + new[f"{metric}_count"]
+        merge[f"{metric}_last"] = case((newer, new[f"{metric}_last"]), else_=current[f"{metric}_last"])
+        merge[f"{metric}_last_ts"] = case((newer, new[f"{metric}_last_ts"]), else_=current[f"{metric}_last_ts"])
+
+    return stmt.on_conflict_do_update(index_elements=["pond_id", "bucket"], set_=merge)
+
+
+class SensorRollupService:
+    """
+    Incrementally maintained 1-minute / 1-hour / 1-day rollups.
+
+    Each ingested batch is first aggregated in memory per (pond, bucket),
+    then merged into every rollup table with one upsert per resolution,
+    inside the ingest transaction. Nothing is ever recomputed from raw rows.
+    """
+
+    def __init__(self):
+        self._warned_dialect = False
+
+    def aggregate(self, rows: List[Dict[str, Any]], width: int) -> List[Dict[str, Any]]:
+        """Aggregate raw rows into bucket rows for one resolution"""
+        buckets: Dict[Any, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["pond_id"], floor_timestamp(row["timestamp"], width))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _empty_bucket(*key)
+
+            ts = row["timestamp"]
+            for metric in SENSOR_METRICS:
+                value = row.get(metric)
+                if value is None:
+                    continue
+                if bucket[f"{metric}_count"] == 0:
+                    bucket[f"{metric}_min"] = bucket[f"{metric}_max"] = value
+                    bucket[f"{metric}_sum"] = value
+                else:
+                    if value < bucket[f"{metric}_min"]:
+                        bucket[f"{metric}_min"] = value
+                    if value > bucket[f"{metric}_max"]:
+                        bucket[f"{metric}_max"] = value
+                    bucket[f"{metric}_sum"] += value
+                bucket[f"{metric}_count"] += 1
+                last_ts = bucket[f"{metric}_last_ts"]
+                if last_ts is None or ts >= last_ts:
+                    bucket[f"{metric}_last"] = value
+                    bucket[f"{metric}_last_ts"] = ts
+
+        # Sorted so concurrent upserts lock rows in the same order
+        return [buckets[key] for key in sorted(buckets, key=lambda k: (str(k[0]), k[1]))]
+
+    def apply_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """Ingest hook: merge a batch into every rollup table"""
+        if db.get_bind().dialect.name != "postgresql":
+            if not self._warned_dialect:
+                logger.warning("Sensor rollups require PostgreSQL; skipping")
+                self._warned_dialect = True
+            return
+
+        for resolution, width in ROLLUP_RESOLUTIONS.items():
+            db.execute(_upsert_statement(resolution), self.aggregate(rows, width))
+
+    def choose_resolution(self, start: datetime, end: datetime, max_points: int) -> str:
+        """
+        Finest resolution whose bucket count over [start, end) fits in
+        `max_points`; the coarsest one when none does
+        """
+        span = (end - start).total_seconds()
+        for resolution, width in sorted(ROLLUP_RESOLUTIONS.items(), key=lambda item: item[1]):
+            if span / width <= max_points:
+                return resolution
+        return max(ROLLUP_RESOLUTIONS, key=ROLLUP_RESOLUTIONS.get)
+
+    def query(
+        self,
+        db: Session,
+        pond_id: Any,
+        start: datetime,
+        end: datetime,
+        metrics: Sequence[str],
+        max_points: int,
+        resolution: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Columnar rollup series for a pond over [start, end)"""
+        resolution = resolution or self.choose_resolution(start, end, max_points)
+        table = SENSOR_ROLLUP_TABLES[resolution]
+
+        columns = [table.c.bucket]
+        for metric in metrics:
+            columns += [
+                table.c[f"{metric}_min"],
+                table.c[f"{metric}_max"],
+                table.c[f"{metric}_sum"],
+                table.c[f"{metric}_count"],
+                table.c[f"{metric}_last"],
+            ]
+
+        result = db.execute(
+            select(*columns)
+            .where(
+                table.c.pond_id == pond_id,
+                table.c.bucket >= floor_timestamp(start, ROLLUP_RESOLUTIONS[resolution]),
+                table.c.bucket < end
+            )
+            .order_by(table.c.bucket)
+            .limit(max_points)
+        ).all()
+
+        series = {}
+        for i, metric in enumerate(metrics):
+            base = 1 + i * 5
+            series[metric] = {
+                "min": [row[base] for row in result],
+                "max": [row[base + 1] for row in result],
+                "avg": [row[base + 2] / row[base + 3] if row[base + 3] else None for row in result],
+                "count": [row[base + 3] for row in result],
+                "last": [row[base + 4] for row in result],
+            }
+
+        return {
+            "pond_id": pond_id,
+            "resolution": resolution,
+            "start_time": start,
+            "end_time": end,
+            "buckets": [row[0] for row in result],
+            "series": series
+        }
+
+
+def _empty_bucket(pond_id: Any, bucket: datetime) -> Dict[str, Any]:
+    row = {"pond_id": pond_id, "bucket": bucket}
+    for metric in SENSOR_METRICS:
+        row[f"{metric}_min"] = None
+        row[f"{metric}_max"] = None
+        row[f"{metric}_sum"] = None
+        row[f"{metric}_count"] = 0
+        row[f"{metric}_last"] = None
+        row[f"{metric}_last_ts"] = None
+    return row
+
+
+# Create global instance
+rollup_service = SensorRollupService()
+ingestion_service.add_before_commit_hook(rollup_service.apply_rows)
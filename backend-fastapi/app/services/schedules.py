@@ -0,0 +1,436 @@
+"""
+Feeding reminders and maintenance-due alerts from pond schedules.
+
+`Pond.feeding_schedule` is parsed into a `PondSchedule`. It is either a
+list of local feeding times:
+
+    "07:00, 12:30, 18:00"
+
+or JSON that may also carry a maintenance cycle and a time zone:
+
+    {"feeding": ["07:00", "18:00"],
+     "maintenance": {"every_days": 14, "start": "2024-01-01", "at": "09:00"},
+     "timezone": "Africa/Algiers"}
+
+Any other text (including malformed times) is kept as free text and simply
+not scheduled; only malformed JSON is rejected.
+
+The scheduler holds the next due time of every scheduled pond in one
+min-heap and a single task sleeps until the earliest one. Due entries
+(within `schedule_batch_window_seconds` of each other) are fired together:
+their ponds are re-read in one query, so a schedule changed by another
+worker is honoured, and all reminders are inserted in one statement.
+Alert ids are derived from (pond, kind, due time) and inserted with
+ON CONFLICT DO NOTHING, so several workers running the scheduler raise each
+reminder once. A new reminder resolves the previous unresolved one of the
+same pond and kind, so reminders do not pile up. Changing a pond
+reschedules only that pond; stale heap entries are skipped through a
+per-pond version number.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Alert, AlertSeverity, AlertType, Pond, PondStatus
+from .alert_state import AlertChanges, AlertTracker, alert_tracker
+
+logger = logging.getLogger(__name__)
+
+FEEDING = "feeding"
+MAINTENANCE = "maintenance"
+ALERT_TYPES = {FEEDING: AlertType.FEEDING_REMINDER, MAINTENANCE: AlertType.MAINTENANCE_DUE}
+MAX_MAINTENANCE_DAYS = 3650
+
+_TIME_RE = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+_REMINDER_NAMESPACE = uuid.UUID("6f1c8f5e-3b7a-4f53-9a59-2f8e0f3f5a61")
+_RETRY_SECONDS = 30  # pause after a batch failed to fire
+
+DueEntry = Tuple[datetime, Any, str, int]  # (due, pond id, kind, version)
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+@dataclass
+class PondSchedule:
+    feeding_times: List[time] = field(default_factory=list)
+    maintenance_every: Optional[timedelta] = None
+    maintenance_start: Optional[date] = None
+    maintenance_at: time = time(9, 0)
+    timezone: str = "UTC"
+
+    def next_due(self, kind: str, after: datetime) -> Optional[datetime]:
+        """First occurrence of `kind` strictly after `after` (naive UTC), in naive UTC"""
+        zone = ZoneInfo(self.timezone)
+        local = after.replace(tzinfo=timezone.utc).astimezone(zone)
+        if kind == FEEDING:
+            if not self.feeding_times:
+                return None
+            for days in range(2):
+                day = local.date() + timedelta(days=days)
+                for at in self.feeding_times:
+                    candidate = datetime.combine(day, at, tzinfo=zone)
+                    if candidate > local:
+                        return _utc(candidate)
+            return None
+        if kind == MAINTENANCE:
+            if self.maintenance_every is None:
+                return None
+            first = datetime.combine(self.maintenance_start or local.date(), self.maintenance_at, tzinfo=zone)
+            if first > local:
+                return _utc(first)
+            periods = (local - first) // self.maintenance_every + 1
+            return _utc(first + periods * self.maintenance_every)
+        return None
+
+    def kinds(self) -> List[str]:
+        kinds = []
+        if self.feeding_times:
+            kinds.append(FEEDING)
+        if self.maintenance_every is not None:
+            kinds.append(MAINTENANCE)
+        return kinds
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_times(value: Any) -> List[time]:
+    items = value if isinstance(value, list) else re.split(r"[,;\s]+", str(value or ""))
+    times = set()
+    for item in items:
+        item = str(item).strip()
+        if not item:
+            continue
+        match = _TIME_RE.match(item)
+        if not match:
+            raise ScheduleError(f"Invalid time {item!r}, expected HH:MM")
+        times.add(time(int(match.group(1)), int(match.group(2))))
+    return sorted(times)
+
+
+def parse_schedule(text: Optional[str], default_timezone: str = "UTC") -> Optional[PondSchedule]:
+    """
+    Parsed schedule, or None for empty or free-form text. Plain text is a
+    schedule only when every item is an HH:MM time; a JSON object that is
+    not a valid schedule raises ScheduleError.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if not text.startswith("{"):
+        items = [item for item in re.split(r"[,;\s]+", text) if item]
+        if not all(_TIME_RE.match(item) for item in items):
+            return None
+        return PondSchedule(feeding_times=parse_times(items), timezone=default_timezone)
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ScheduleError(f"Invalid schedule JSON: {e}")
+    if not isinstance(data, dict):
+        raise ScheduleError("Schedule JSON must be an object")
+
+    schedule = PondSchedule(
+        feeding_times=parse_times(data.get("feeding")),
+        timezone=data.get("timezone") or default_timezone
+    )
+    try:
+        ZoneInfo(schedule.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ScheduleError(f"Unknown time zone {schedule.timezone!r}")
+
+    maintenance = data.get("maintenance")
+    if maintenance is not None:
+        if not isinstance(maintenance, dict):
+            raise ScheduleError("maintenance must be an object")
+        try:
+            every_days = float(maintenance["every_days"])
+            start = maintenance.get("start")
+            schedule.maintenance_start = date.fromisoformat(start) if start else None
+        except (KeyError, TypeError, ValueError):
+            raise ScheduleError("maintenance needs every_days and an optional start date (YYYY-MM-DD)")
+        if not every_days.is_integer() or not 1 <= every_days <= MAX_MAINTENANCE_DAYS:
+            raise ScheduleError(f"maintenance every_days must be a whole number from 1 to {MAX_MAINTENANCE_DAYS}")
+        schedule.maintenance_every = timedelta(days=int(every_days))
+        if maintenance.get("at"):
+            schedule.maintenance_at = parse_times([maintenance["at"]])[0]
+    return schedule
+
+
+class PondScheduler:
+    def __init__(self, tracker: AlertTracker, default_timezone: str, batch_window_seconds: int):
+        self.tracker = tracker
+        self.default_timezone = default_timezone
+        self.batch_window = timedelta(seconds=batch_window_seconds)
+        self.heap: List[Tuple[datetime, int, Any, str, int]] = []  # (due, seq, pond id, kind, version)
+        self.versions: Dict[Any, int] = {}
+        self.schedules: Dict[Any, PondSchedule] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.duplicates = 0
+        self.batches = 0
+
+    def parse(self, text: Optional[str]) -> Optional[PondSchedule]:
+        return parse_schedule(text, self.default_timezone)
+
+    def _set(self, pond_id: Any, schedule: Optional[PondSchedule], now: datetime):
+        """Replace a pond's entries; caller holds the lock"""
+        version = self.versions.get(pond_id, 0) + 1
+        self.versions[pond_id] = version
+        if len(self.heap) > 4 * len(self.schedules) + 64:
+            # Mostly superseded entries: drop them rather than wait for them to come due
+            self.heap = [entry for entry in self.heap if self.versions.get(entry[2]) == entry[4]]
+            heapq.heapify(self.heap)
+        if schedule is None:
+            self.schedules.pop(pond_id, None)
+            return
+        self.schedules[pond_id] = schedule
+        for kind in schedule.kinds():
+            due = schedule.next_due(kind, now)
+            if due is not None:
+                heapq.heappush(self.heap, (due, next(self._sequence), pond_id, kind, version))
+
+    def _schedule_of(self, pond: Any) -> Optional[PondSchedule]:
+        if pond is None or pond.status not in (None, PondStatus.ACTIVE):
+            return None
+        try:
+            return self.parse(pond.feeding_schedule)
+        except ScheduleError as e:
+            logger.warning(f"Ignoring schedule of pond {pond.id}: {e}")
+            return None
+
+    def reschedule(self, pond: Any):
+        """Recompute one pond's next reminders after it was created or changed"""
+        if self._task is None:
+            return
+        with self._lock:
+            earliest = self.heap[0][0] if self.heap else None
+            self._set(pond.id, self._schedule_of(pond), datetime.utcnow())
+            moved_earlier = self.heap and (earliest is None or self.heap[0][0] < earliest)
+        if moved_earlier:
+            self._wake_soon()
+
+    def unschedule(self, pond_id: Any):
+        if self._task is None:
+            return
+        with self._lock:
+            self._set(pond_id, None, datetime.utcnow())
+
+    def _wake_soon(self):
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    def load(self, db: Session):
+        """Schedule every active pond that has a feeding_schedule; done once at startup"""
+        ponds = db.query(Pond.id, Pond.status, Pond.feeding_schedule).filter(
+            Pond.feeding_schedule.isnot(None), Pond.feeding_schedule != ""
+        ).all()
+        now = datetime.utcnow()
+        with self._lock:
+            for pond in ponds:
+                self._set(pond.id, self._schedule_of(pond), now)
+
+    def pop_due(self, now: datetime) -> List[DueEntry]:
+        """Current entries due by `now` plus the batch window"""
+        horizon = now + self.batch_window
+        due = []
+        with self._lock:
+            while self.heap and self.heap[0][0] <= horizon:
+                at, _, pond_id, kind, version = heapq.heappop(self.heap)
+                if self.versions.get(pond_id) == version:
+                    due.append((at, pond_id, kind, version))
+        return due
+
+    def _push(self, entries: List[DueEntry]):
+        with self._lock:
+            for at, pond_id, kind, version in entries:
+                heapq.heappush(self.heap, (at, next(self._sequence), pond_id, kind, version))
+
+    def build_alert(self, pond: Any, kind: str, due: datetime, now: datetime) -> Dict[str, Any]:
+        schedule = self.schedules.get(pond.id)
+        zone = ZoneInfo(schedule.timezone if schedule else "UTC")
+        local = due.replace(tzinfo=timezone.utc).astimezone(zone)
+        if kind == FEEDING:
+            title = f"Feeding time for {pond.name}"
+            message = f"Scheduled feeding of {pond.name} at {local:%H:%M}"
+            severity = AlertSeverity.LOW
+        else:
+            title = f"Maintenance due for {pond.name}"
+            message = f"Scheduled maintenance of {pond.name} is due ({local:%Y-%m-%d %H:%M})"
+            severity = AlertSeverity.MEDIUM
+        return {
+            "id": uuid.uuid5(_REMINDER_NAMESPACE, f"{pond.id}:{kind}:{due.isoformat()}"),
+            "farm_id": pond.farm_id,
+            "pond_id": pond.id,
+            "user_id": None,
+            "type": ALERT_TYPES[kind],
+            "severity": severity,
+            "title": title,
+            "message": message,
+            "parameter": None,
+            "current_value": None,
+            "threshold_value": None,
+            "is_read": False,
+            "is_resolved": False,
+            "resolved_at": None,
+            "resolved_by": None,
+            "meta_data": json.dumps({"schedule": kind, "due": due.isoformat()}),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def fire(self, due: List[DueEntry]):
+        """
+        Insert the reminders of one batch and schedule each pond's next
+        occurrence. On failure the batch is put back on the heap.
+        """
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            ponds = {
+                pond.id: pond
+                for pond in db.query(Pond.id, Pond.farm_id, Pond.name, Pond.status, Pond.feeding_schedule)
+                .filter(Pond.id.in_({entry[1] for entry in due}))
+            }
+            alerts, following = [], []
+            with self._lock:
+                for at, pond_id, kind, version in due:
+                    pond = ponds.get(pond_id)
+                    schedule = self._schedule_of(pond)
+                    if schedule != self.schedules.get(pond_id):
+                        # Changed or deleted through another worker
+                        self._set(pond_id, schedule, now)
+                        continue
+                    alerts.append(self.build_alert(pond, kind, at, now))
+                    next_at = schedule.next_due(kind, at)
+                    if next_at is not None:
+                        following.append((next_at, pond_id, kind, version))
+            if not alerts:
+                return
+
+            if db.get_bind().dialect.name == "postgresql":
+                inserted = set(db.execute(
+                    pg_insert(Alert).values(alerts).on_conflict_do_nothing(index_elements=["id"]).returning(Alert.id)
+                ).scalars())
+            else:
+                db.execute(insert(Alert), alerts)
+                inserted = {alert["id"] for alert in alerts}
+            # The new reminder supersedes the previous one of its pond and kind
+            db.execute(
+                update(Alert).where(
+                    tuple_(Alert.pond_id, Alert.type).in_({(alert["pond_id"], alert["type"]) for alert in alerts}),
+                    Alert.id.notin_([alert["id"] for alert in alerts]),
+                    Alert.is_resolved.is_(False)
+                ).values(is_resolved=True, resolved_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            changes = AlertChanges()
+            for alert in alerts:
+                if alert["id"] in inserted:
+                    changes.inserts.append(alert)
+                    changes.notify.append((alert["id"], (alert["pond_id"], f"schedule:{alert['type'].value}", alert["type"]), True))
+            self.tracker.defer(db, changes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Entries of ponds rescheduled meanwhile are skipped when they surface
+            self._push(due)
+            raise
+        finally:
+            db.close()
+        self._push(following)
+        self.fired += len(inserted)
+        self.duplicates += len(alerts) - len(inserted)
+        self.batches += 1
+
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _load_all(self):
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    async def _run(self):
+        try:
+            await run_in_threadpool(self._load_all)
+        except Exception as e:
+            logger.error(f"Loading pond schedules failed: {e}")
+        while True:
+            with self._lock:
+                next_due = self.heap[0][0] if self.heap else None
+            # Sleep until the earliest reminder, or until a reschedule moves it
+            timeout = None if next_due is None else max((next_due - datetime.utcnow()).total_seconds(), 0.0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            due = self.pop_due(datetime.utcnow())
+            if not due:
+                continue
+            try:
+                await run_in_threadpool(self.fire, due)
+            except Exception as e:
+                logger.error(f"Firing {len(due)} pond reminders failed: {e}")
+                await asyncio.sleep(_RETRY_SECONDS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "scheduled_ponds": len(self.schedules),
+                "heap_entries": len(self.heap),
+                "next_due": self.heap[0][0] if self.heap else None,
+                "fired": self.fired,
+                "duplicates_skipped": self.duplicates,
+                "batches": self.batches,
+            }
+
+
+# Create global instance
+pond_scheduler = PondScheduler(
+    alert_tracker,
+    default_timezone=settings.schedule_timezone,
+    batch_window_seconds=settings.schedule_batch_window_seconds,
+)
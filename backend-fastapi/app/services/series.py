@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Any, Dict, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ROLLUP_RESOLUTIONS, SensorData
+from .downsampling import METHODS
+from .rollups import rollup_service
+
+MINUTE = ROLLUP_RESOLUTIONS["1m"]
+
+
+class SensorSeriesService:
+    """
+    Downsampled chart series for a pond.
+
+    Short ranges are read from `sensor_data`, fetching only the timestamp and
+    the requested columns. Once the range holds more minutes than
+    `max_points * series_oversample`, the finest rollup table with at most
+    that many buckets is read instead, so the rows fetched (and the time
+    spent) follow the point budget rather than the stored volume.
+    """
+
+    def __init__(self, oversample: int):
+        self.oversample = oversample
+
+    def choose_source(self, start: datetime, end: datetime, max_points: int) -> str:
+        budget = max_points * self.oversample
+        if (end - start).total_seconds() / MINUTE <= budget:
+            return "raw"
+        return rollup_service.choose_resolution(start, end, budget)
+
+    def fetch_raw(
+        self, db: Session, pond_id: Any, start: datetime, end: datetime, metrics: Sequence[str]
+    ) -> Dict[str, Any]:
+        columns = [SensorData.timestamp] + [getattr(SensorData, metric) for metric in metrics]
+        rows = db.execute(
+            select(*columns)
+            .where(
+                SensorData.pond_id == pond_id,
+                SensorData.timestamp >= start,
+                SensorData.timestamp < end
+            )
+            .order_by(SensorData.timestamp)
+        ).all()
+
+        transposed = list(zip(*rows)) if rows else [()] * len(columns)
+        timestamps = np.array(transposed[0], dtype="datetime64[us]")
+        return {
+            metric: (timestamps, np.array(transposed[i + 1], dtype=float))
+            for i, metric in enumerate(metrics)
+        }
+
+    def fetch_rollup(
+        self,
+        db: Session,
+        pond_id: Any,
+        start: datetime,
+        end: datetime,
+        metrics: Sequence[str],
+        resolution: str,
+        method: str
+    ) -> Dict[str, Any]:
+        width = ROLLUP_RESOLUTIONS[resolution]
+        buckets_in_range = int((end - start).total_seconds() // width) + 2
+        rollup = rollup_service.query(
+            db, pond_id, start, end, metrics, max_points=buckets_in_range, resolution=resolution
+        )
+        buckets = np.array(rollup["buckets"], dtype="datetime64[us]")
+
+        points = {}
+        for metric in metrics:
+            series = rollup["series"][metric]
+            if method == "minmax":
+                # Both extremes of each bucket are candidates, so spikes survive
+                timestamps = np.concatenate([buckets, buckets])
+                values = np.array(series["min"] + series["max"], dtype=float)
+                order = np.argsort(timestamps, kind="stable")
+                points[metric] = (timestamps[order], values[order])
+            else:
+                points[metric] = (buckets, np.array(series["avg"], dtype=float))
+        return points
+
+    def query(
+        self,
+        db: Session,
+        pond_id: Any,
+        start: datetime,
+        end: datetime,
+        metrics: Sequence[str],
+        max_points: int,
+        method: str
+    ) -> Dict[str, Any]:
+        """Columnar series of at most `max_points` points per metric over [start, end)"""
+        source = self.choose_source(start, end, max_points)
+        if source == "raw":
+            points = self.fetch_raw(db, pond_id, start, end, metrics)
+        else:
+            points = self.fetch_rollup(db, pond_id, start, end, metrics, source, method)
+
+        downsample = METHODS[method]
+        series = {}
+        for metric, (timestamps, values) in points.items():
+            x = timestamps.astype("int64") / 1e6
+            keep = downsample(x, values, max_points)
+            series[metric] = {
+                "timestamps": timestamps[keep].tolist(),
+                "values": values[keep].tolist(),
+            }
+
+        return {
+            "pond_id": pond_id,
+            "method": method,
+            "source": source,
+            "start_time": start,
+            "end_time": end,
+            "max_points": max_points,
+            "series": series
+        }
+
+
+# Create global instance
+series_service = SensorSeriesService(oversample=settings.series_oversample)
@@ -0,0 +1,254 @@
+"""
+Streaming threshold evaluation.
+
+Active thresholds are kept in memory, indexed by pond and then parameter,
+together with each pond's farm. Every ingested batch is checked against the
+index inside the ingest transaction (O(parameters) per reading, no database
+reads). Per pond parameter, the batch's worst violating reading - or its
+latest reading when none violates - is handed to the alert tracker, which
+opens, updates or clears its `Alert` row in the same transaction with
+hysteresis and deduplication (see `alert_state`).
+"""
+
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import AlertSeverity, AlertType, Pond, Threshold
+from .alert_state import SEVERITY_RANK, AlertChanges, AlertTracker, Violation, alert_tracker
+from .ingestion import ingestion_service
+
+# (type when above the range, type when below it) per parameter
+ALERT_TYPES: Dict[str, Tuple[AlertType, AlertType]] = {
+    "temperature": (AlertType.TEMPERATURE_HIGH, AlertType.TEMPERATURE_LOW),
+    "ph_level": (AlertType.PH_HIGH, AlertType.PH_LOW),
+    "dissolved_oxygen": (AlertType.OXYGEN_HIGH, AlertType.OXYGEN_LOW),
+    "turbidity": (AlertType.TURBIDITY_HIGH, AlertType.TURBIDITY_HIGH),
+    "ammonia_level": (AlertType.WATER_CHANGE, AlertType.WATER_CHANGE),
+    "nitrite_level": (AlertType.WATER_CHANGE, AlertType.WATER_CHANGE),
+    "nitrate_level": (AlertType.WATER_CHANGE, AlertType.WATER_CHANGE),
+}
+DEFAULT_ALERT_TYPES = (AlertType.SYSTEM_ERROR, AlertType.SYSTEM_ERROR)
+
+# Threshold columns copied onto a rule
+RULE_FIELDS = ("pond_id", "parameter", "min_value", "max_value", "optimal_min", "optimal_max")
+
+
+class ThresholdRule:
+    __slots__ = ("threshold_id", "pond_id", "parameter", "min_value", "max_value", "optimal_min", "optimal_max",
+                 "band")
+
+    def __init__(self, threshold: Threshold):
+        for name in RULE_FIELDS:
+            setattr(self, name, getattr(threshold, name))
+        self.threshold_id = threshold.id
+        if self.min_value is not None and self.max_value is not None:
+            span = self.max_value - self.min_value
+        elif self.optimal_min is not None and self.optimal_max is not None:
+            span = self.optimal_max - self.optimal_min
+        else:
+            span = None
+        self.band = alert_tracker.band(self.parameter, span)
+
+    def check(self, value: float) -> Optional[Tuple[str, AlertSeverity, float]]:
+        """(direction, severity, bound) of the worst bound `value` crosses, if any"""
+        if self.max_value is not None and value > self.max_value:
+            return "high", AlertSeverity.HIGH, self.max_value
+        if self.min_value is not None and value < self.min_value:
+            return "low", AlertSeverity.HIGH, self.min_value
+        if self.optimal_max is not None and value > self.optimal_max:
+            return "high", AlertSeverity.LOW, self.optimal_max
+        if self.optimal_min is not None and value < self.optimal_min:
+            return "low", AlertSeverity.LOW, self.optimal_min
+        return None
+
+
+class ThresholdIndex:
+    """
+    Active thresholds by pond and parameter, plus pond -> farm.
+
+    Threshold routes update it in place; a periodic reload (piggybacking on
+    ingestion, every `threshold_reload_seconds`) picks up changes made by
+    other workers.
+    """
+
+    def __init__(self, reload_seconds: int):
+        self.reload_seconds = reload_seconds
+        self.rules: Dict[Any, Dict[str, ThresholdRule]] = {}
+        self.pond_farms: Dict[Any, Any] = {}
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        rules: Dict[Any, Dict[str, ThresholdRule]] = {}
+        pond_farms = {}
+        for threshold, farm_id in db.query(Threshold, Pond.farm_id).join(
+            Pond, Pond.id == Threshold.pond_id
+        ).filter(Threshold.is_active.is_(True)):
+            rules.setdefault(threshold.pond_id, {})[threshold.parameter] = ThresholdRule(threshold)
+            pond_farms[threshold.pond_id] = farm_id
+        with self._lock:
+            self.rules, self.pond_farms = rules, pond_farms
+            self.loaded_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session) -> bool:
+        """Reload when stale; True if it did"""
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.reload_seconds:
+            self.load(db)
+            return True
+        return False
+
+    def upsert(self, threshold: Threshold, farm_id: Any):
+        """Apply a created or updated threshold"""
+        with self._lock:
+            rules = self._without(threshold.id)
+            if threshold.is_active:
+                by_parameter = dict(rules.get(threshold.pond_id, {}))
+                by_parameter[threshold.parameter] = ThresholdRule(threshold)
+                rules[threshold.pond_id] = by_parameter
+                self.pond_farms = {**self.pond_farms, threshold.pond_id: farm_id}
+            self.rules = rules
+
+    def remove(self, threshold_id: Any):
+        with self._lock:
+            self.rules = self._without(threshold_id)
+
+    def _without(self, threshold_id: Any) -> Dict[Any, Dict[str, ThresholdRule]]:
+        """
+        Copy of the rules minus one threshold. Changes are copy-on-write so
+        ingest threads can iterate the current rules without locking.
+        """
+        rules = {}
+        for pond_id, by_parameter in self.rules.items():
+            kept = {
+                parameter: rule for parameter, rule in by_parameter.items()
+                if rule.threshold_id != threshold_id
+            }
+            if kept:
+                rules[pond_id] = kept
+        return rules
+
+
+class ThresholdEngine:
+    def __init__(self, index: ThresholdIndex, tracker: AlertTracker):
+        self.index = index
+        self.tracker = tracker
+        self.evaluated = 0
+        self.violations = 0
+
+    def evaluate(self, rows: List[Dict[str, Any]]) -> Dict[Tuple[Any, str], tuple]:
+        """
+        One observation per watched pond parameter in a batch, as (rule, row,
+        value, violation or None). Every reading is checked: the worst
+        violation (highest severity, then furthest past its bound) is kept,
+        so an excursion that recovers within the batch still raises an alert;
+        without any violation the latest reading is used.
+        """
+        rules = self.index.rules
+        # key -> [rule, latest row, latest value, (rank, row, value, check) of the worst violation]
+        found: Dict[Tuple[Any, str], list] = {}
+        for row in rows:
+            by_parameter = rules.get(row["pond_id"])
+            if not by_parameter:
+                continue
+            self.evaluated += 1
+            for parameter, rule in by_parameter.items():
+                value = row.get(parameter)
+                if value is None:
+                    continue
+                key = (row["pond_id"], parameter)
+                current = found.get(key)
+                if current is None:
+                    current = found[key] = [rule, row, value, None]
+                elif row["timestamp"] >= current[1]["timestamp"]:
+                    current[1], current[2] = row, value
+                check = rule.check(value)
+                if check is not None:
+                    rank = (SEVERITY_RANK[check[1]], abs(value - check[2]))
+                    if current[3] is None or rank > current[3][0]:
+                        current[3] = (rank, row, value, check)
+        observations = {}
+        for key, (rule, row, value, worst) in found.items():
+            violation = None
+            if worst is not None:
+                self.violations += 1
+                _, row, value, (direction, severity, bound) = worst
+                high_type, low_type = ALERT_TYPES.get(rule.parameter, DEFAULT_ALERT_TYPES)
+                violation = Violation(high_type if direction == "high" else low_type, severity, direction, bound)
+            observations[key] = (rule, row, value, violation)
+        return observations
+
+    def build_alert(
+        self,
+        rule: ThresholdRule,
+        row: Dict[str, Any],
+        violation: Violation,
+        value: float
+    ) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        label = rule.parameter.replace("_", " ").capitalize()
+        limit = "maximum" if violation.direction == "high" else "minimum"
+        if violation.severity == AlertSeverity.LOW:
+            limit = f"optimal {limit}"
+        return {
+            "id": uuid.uuid4(),
+            "farm_id": self.index.pond_farms[rule.pond_id],
+            "pond_id": rule.pond_id,
+            "user_id": None,
+            "type": violation.alert_type,
+            "severity": violation.severity,
+            "title": f"{label} {'above' if violation.direction == 'high' else 'below'} {limit}",
+            "message": f"{label} is {value:g}, {limit} is {violation.bound:g}",
+            "parameter": rule.parameter,
+            "current_value": value,
+            "threshold_value": violation.bound,
+            "is_read": False,
+            "is_resolved": False,
+            "resolved_at": None,
+            "resolved_by": None,
+            "meta_data": json.dumps({
+                "threshold_id": str(rule.threshold_id),
+                "reading_id": str(row["id"]),
+                "reading_timestamp": row["timestamp"].isoformat(),
+            }),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def apply_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """Ingest hook: open, update or clear the alerts of the batch's pond parameters"""
+        if self.index.ensure_fresh(db) or not self.tracker.loaded:
+            self.tracker.load(db)
+        if not self.index.rules:
+            return
+        changes = AlertChanges()
+        for (pond_id, parameter), (rule, row, value, violation) in self.evaluate(rows).items():
+            self.tracker.observe(
+                changes, pond_id, parameter, value, violation, rule.band,
+                partial(self.build_alert, rule, row, violation, value)
+            )
+        self.tracker.record(db, changes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ponds": len(self.index.rules),
+            "rules": sum(len(by_parameter) for by_parameter in self.index.rules.values()),
+            "evaluated": self.evaluated,
+            "violations": self.violations,
+            "alerts": self.tracker.get_stats(),
+        }
+
+
+# Create global instance
+threshold_engine = ThresholdEngine(
+    ThresholdIndex(reload_seconds=settings.threshold_reload_seconds),
+    alert_tracker
+)
+ingestion_service.add_before_commit_hook(threshold_engine.apply_rows)
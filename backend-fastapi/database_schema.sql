@@ -123,9 +123,12 @@ CREATE INDEX idx_ponds_user_id ON ponds(user_id);
 CREATE INDEX idx_ponds_type ON ponds(type);
 CREATE INDEX idx_ponds_status ON ponds(status);
 
--- Sensor data table
+-- Sensor data table, range-partitioned by timestamp.
+-- Monthly (or weekly) partitions named sensor_data_pYYYYMMDD are created
+-- ahead of time and expired by the partition maintenance task
+-- (app/services/partitions.py).
 CREATE TABLE sensor_data (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     pond_id UUID NOT NULL REFERENCES ponds(id) ON DELETE CASCADE,
     user_id UUID NOT NULL REFERENCES users(id),
     sensor_type sensor_type,
@@ -141,21 +144,129 @@ CREATE TABLE sensor_data (
     flow_rate REAL, -- L/min
     value REAL,
     unit VARCHAR(20),
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     quality VARCHAR(20), -- GOOD, WARNING, CRITICAL
     device_id VARCHAR(50),
     location VARCHAR(255), -- GPS coordinates or zone identifier
     meta_data TEXT, -- JSON string
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catches readings outside every managed partition (e.g. old replays)
+CREATE TABLE sensor_data_default PARTITION OF sensor_data DEFAULT;
 
--- Create indexes on sensor_data
-CREATE INDEX idx_sensor_data_pond_id ON sensor_data(pond_id);
+-- Create indexes on sensor_data (created on every partition)
+-- Serves per-pond time range scans and keyset pagination on (timestamp, id)
+CREATE INDEX idx_sensor_data_pond_id_timestamp_id ON sensor_data(pond_id, timestamp DESC, id DESC);
 CREATE INDEX idx_sensor_data_user_id ON sensor_data(user_id);
-CREATE INDEX idx_sensor_data_timestamp ON sensor_data(timestamp);
+-- Serves unfiltered newest-first listings (merged across partitions) and time range scans
+CREATE INDEX idx_sensor_data_timestamp_id ON sensor_data(timestamp DESC, id DESC);
 CREATE INDEX idx_sensor_data_sensor_type ON sensor_data(sensor_type);
 CREATE INDEX idx_sensor_data_quality ON sensor_data(quality);
 
+-- Latest reading per pond, upserted on ingest so dashboards never scan
+-- sensor_data (app/services/latest_readings.py)
+CREATE TABLE pond_latest_readings (
+    pond_id UUID PRIMARY KEY REFERENCES ponds(id) ON DELETE CASCADE,
+    id UUID NOT NULL, -- sensor_data.id of the reading
+    user_id UUID NOT NULL REFERENCES users(id),
+    sensor_type sensor_type,
+    temperature REAL,
+    ph_level REAL,
+    dissolved_oxygen REAL,
+    turbidity REAL,
+    ammonia_level REAL,
+    nitrite_level REAL,
+    nitrate_level REAL,
+    salinity REAL,
+    water_level REAL,
+    flow_rate REAL,
+    value REAL,
+    unit VARCHAR(20),
+    timestamp TIMESTAMP NOT NULL,
+    quality VARCHAR(20),
+    device_id VARCHAR(50),
+    location VARCHAR(255),
+    meta_data TEXT,
+    created_at TIMESTAMP
+);
+
+-- Sensor rollups: min/max/sum/count/last per measured column, per pond and
+-- time bucket. Maintained incrementally on ingest (app/services/rollups.py);
+-- avg = sum / count.
+CREATE TABLE sensor_rollups_1m (
+    pond_id UUID NOT NULL REFERENCES ponds(id) ON DELETE CASCADE,
+    bucket TIMESTAMP NOT NULL,
+    temperature_min REAL,
+    temperature_max REAL,
+    temperature_sum REAL,
+    temperature_count INTEGER NOT NULL DEFAULT 0,
+    temperature_last REAL,
+    temperature_last_ts TIMESTAMP,
+    ph_level_min REAL,
+    ph_level_max REAL,
+    ph_level_sum REAL,
+    ph_level_count INTEGER NOT NULL DEFAULT 0,
+    ph_level_last REAL,
+    ph_level_last_ts TIMESTAMP,
+    dissolved_oxygen_min REAL,
+    dissolved_oxygen_max REAL,
+    dissolved_oxygen_sum REAL,
+    dissolved_oxygen_count INTEGER NOT NULL DEFAULT 0,
+    dissolved_oxygen_last REAL,
+    dissolved_oxygen_last_ts TIMESTAMP,
+    turbidity_min REAL,
+    turbidity_max REAL,
+    turbidity_sum REAL,
+    turbidity_count INTEGER NOT NULL DEFAULT 0,
+    turbidity_last REAL,
+    turbidity_last_ts TIMESTAMP,
+    ammonia_level_min REAL,
+    ammonia_level_max REAL,
+    ammonia_level_sum REAL,
+    ammonia_level_count INTEGER NOT NULL DEFAULT 0,
+    ammonia_level_last REAL,
+    ammonia_level_last_ts TIMESTAMP,
+    nitrite_level_min REAL,
+    nitrite_level_max REAL,
+    nitrite_level_sum REAL,
+    nitrite_level_count INTEGER NOT NULL DEFAULT 0,
+    nitrite_level_last REAL,
+    nitrite_level_last_ts TIMESTAMP,
+    nitrate_level_min REAL,
+    nitrate_level_max REAL,
+    nitrate_level_sum REAL,
+    nitrate_level_count INTEGER NOT NULL DEFAULT 0,
+    nitrate_level_last REAL,
+    nitrate_level_last_ts TIMESTAMP,
+    salinity_min REAL,
+    salinity_max REAL,
+    salinity_sum REAL,
+    salinity_count INTEGER NOT NULL DEFAULT 0,
+    salinity_last REAL,
+    salinity_last_ts TIMESTAMP,
+    water_level_min REAL,
+    water_level_max REAL,
+    water_level_sum REAL,
+    water_level_count INTEGER NOT NULL DEFAULT 0,
+    water_level_last REAL,
+    water_level_last_ts TIMESTAMP,
+    flow_rate_min REAL,
+    flow_rate_max REAL,
+    flow_rate_sum REAL,
+    flow_rate_count INTEGER NOT NULL DEFAULT 0,
+    flow_rate_last REAL,
+    flow_rate_last_ts TIMESTAMP,
+    PRIMARY KEY (pond_id, bucket)
+);
+
+CREATE TABLE sensor_rollups_1h (LIKE sensor_rollups_1m INCLUDING ALL);
+ALTER TABLE sensor_rollups_1h ADD FOREIGN KEY (pond_id) REFERENCES ponds(id) ON DELETE CASCADE;
+
+CREATE TABLE sensor_rollups_1d (LIKE sensor_rollups_1m INCLUDING ALL);
+ALTER TABLE sensor_rollups_1d ADD FOREIGN KEY (pond_id) REFERENCES ponds(id) ON DELETE CASCADE;
+
 -- Alerts table
 CREATE TABLE alerts (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -187,6 +298,89 @@ CREATE INDEX idx_alerts_severity ON alerts(severity);
 CREATE INDEX idx_alerts_is_read ON alerts(is_read);
 CREATE INDEX idx_alerts_is_resolved ON alerts(is_resolved);
 CREATE INDEX idx_alerts_created_at ON alerts(created_at);
+CREATE INDEX idx_alerts_pond_id_created_at_id ON alerts(pond_id, created_at DESC, id DESC);
+
+-- Only open/unread alerts: listing them and reconciling alert_counters
+-- never touches resolved history
+CREATE INDEX idx_alerts_unresolved ON alerts(farm_id, pond_id, severity) WHERE NOT is_resolved;
+CREATE INDEX idx_alerts_unread ON alerts(farm_id, pond_id, severity) WHERE NOT is_read;
+
+-- Unresolved/unread alert counts per pond and severity, maintained by the
+-- count_alerts triggers below in the same transaction as every alert write
+CREATE TABLE alert_counters (
+    farm_id UUID NOT NULL,
+    pond_id UUID NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    unresolved INTEGER NOT NULL DEFAULT 0,
+    unread INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (farm_id, pond_id, severity)
+);
+
+-- Applies the net change of one INSERT/UPDATE/DELETE statement on alerts,
+-- in key order so concurrent statements lock counter rows consistently
+CREATE OR REPLACE FUNCTION count_alerts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO alert_counters AS c (farm_id, pond_id, severity, unresolved, unread)
+        SELECT farm_id, pond_id, severity, sum(unresolved), sum(unread)
+        FROM (
+            SELECT farm_id, pond_id, severity::text AS severity,
+                   count(*) FILTER (WHERE NOT is_resolved) AS unresolved,
+                   count(*) FILTER (WHERE NOT is_read) AS unread
+            FROM new_rows GROUP BY 1, 2, 3
+        ) AS delta
+        GROUP BY farm_id, pond_id, severity
+        HAVING sum(unresolved) <> 0 OR sum(unread) <> 0
+        ORDER BY farm_id, pond_id, severity
+        ON CONFLICT (farm_id, pond_id, severity) DO UPDATE
+        SET unresolved = c.unresolved + EXCLUDED.unresolved, unread = c.unread + EXCLUDED.unread;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO alert_counters AS c (farm_id, pond_id, severity, unresolved, unread)
+        SELECT farm_id, pond_id, severity, sum(unresolved), sum(unread)
+        FROM (
+            SELECT farm_id, pond_id, severity::text AS severity,
+                   count(*) FILTER (WHERE NOT is_resolved) AS unresolved,
+                   count(*) FILTER (WHERE NOT is_read) AS unread
+            FROM new_rows GROUP BY 1, 2, 3
+            UNION ALL
+            SELECT farm_id, pond_id, severity::text AS severity,
+                   -count(*) FILTER (WHERE NOT is_resolved) AS unresolved,
+                   -count(*) FILTER (WHERE NOT is_read) AS unread
+            FROM old_rows GROUP BY 1, 2, 3
+        ) AS delta
+        GROUP BY farm_id, pond_id, severity
+        HAVING sum(unresolved) <> 0 OR sum(unread) <> 0
+        ORDER BY farm_id, pond_id, severity
+        ON CONFLICT (farm_id, pond_id, severity) DO UPDATE
+        SET unresolved = c.unresolved + EXCLUDED.unresolved, unread = c.unread + EXCLUDED.unread;
+    ELSE
+        INSERT INTO alert_counters AS c (farm_id, pond_id, severity, unresolved, unread)
+        SELECT farm_id, pond_id, severity, sum(unresolved), sum(unread)
+        FROM (
+            SELECT farm_id, pond_id, severity::text AS severity,
+                   -count(*) FILTER (WHERE NOT is_resolved) AS unresolved,
+                   -count(*) FILTER (WHERE NOT is_read) AS unread
+            FROM old_rows GROUP BY 1, 2, 3
+        ) AS delta
+        GROUP BY farm_id, pond_id, severity
+        HAVING sum(unresolved) <> 0 OR sum(unread) <> 0
+        ORDER BY farm_id, pond_id, severity
+        ON CONFLICT (farm_id, pond_id, severity) DO UPDATE
+        SET unresolved = c.unresolved + EXCLUDED.unresolved, unread = c.unread + EXCLUDED.unread;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER count_alerts_insert AFTER INSERT ON alerts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts();
+
+CREATE TRIGGER count_alerts_update AFTER UPDATE ON alerts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts();
+
+CREATE TRIGGER count_alerts_delete AFTER DELETE ON alerts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_alerts();
 
 -- Thresholds table
 CREATE TABLE thresholds (
@@ -207,6 +401,18 @@ CREATE INDEX idx_thresholds_pond_id ON thresholds(pond_id);
 CREATE INDEX idx_thresholds_parameter ON thresholds(parameter);
 CREATE INDEX idx_thresholds_is_active ON thresholds(is_active);
 
+-- Expected reporting intervals for sensor offline detection; device_id NULL
+-- applies to every device of the pond, pond_id NULL to the device anywhere
+CREATE TABLE heartbeat_intervals (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    pond_id UUID REFERENCES ponds(id) ON DELETE CASCADE,
+    device_id VARCHAR(50),
+    interval_seconds INTEGER NOT NULL, -- 0 disables monitoring
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_heartbeat_intervals_pond_device UNIQUE (pond_id, device_id)
+);
+
 -- User sessions table
 CREATE TABLE user_sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -268,6 +474,9 @@ CREATE TRIGGER update_alerts_updated_at BEFORE UPDATE ON alerts
 CREATE TRIGGER update_thresholds_updated_at BEFORE UPDATE ON thresholds
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_heartbeat_intervals_updated_at BEFORE UPDATE ON heartbeat_intervals
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
 -- Insert sample data for testing
 INSERT INTO users (email, password_hash, first_name, last_name, role) VALUES
 ('admin@example.com', '$2b$12$sample_hash', 'Admin', 'User', 'ADMIN'),
@@ -294,7 +503,10 @@ COMMENT ON TABLE users IS 'User accounts for the aquaculture management system';
 COMMENT ON TABLE farms IS 'Aquaculture farms managed by the system';
 COMMENT ON TABLE ponds IS 'Individual ponds within farms';
 COMMENT ON TABLE sensor_data IS 'Sensor readings from IoT devices monitoring pond conditions';
+COMMENT ON TABLE pond_latest_readings IS 'Most recent sensor reading of each pond';
+COMMENT ON TABLE sensor_rollups_1m IS 'Per-minute sensor aggregates per pond (also _1h and _1d)';
 COMMENT ON TABLE alerts IS 'System alerts triggered by threshold violations or other events';
+COMMENT ON TABLE alert_counters IS 'Unresolved and unread alert counts per pond and severity';
 COMMENT ON TABLE thresholds IS 'Threshold values for monitoring pond parameters';
 COMMENT ON TABLE user_sessions IS 'Active user sessions for authentication';
 COMMENT ON TABLE user_activities IS 'Log of user actions for audit purposes';
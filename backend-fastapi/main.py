@@ -10,8 +10,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.database import engine, get_db
 from app.models import Base
-from app.routers import auth, farms, ponds, sensors, alerts
+from app.routers import auth, farms, ponds, sensors, sensor_ingest, alerts, thresholds, heartbeats, metrics, telemetry
 from app.config import settings
+from app.lifespan import lifespan
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -21,7 +22,8 @@ app = FastAPI(
     description="Smart and Responsive Management of Fish Ponds",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -31,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -38,7 +41,12 @@ app.include_router(auth.router, prefix="/api/v1")
 app.include_router(farms.router, prefix="/api/v1")
 app.include_router(ponds.router, prefix="/api/v1")
 app.include_router(sensors.router, prefix="/api/v1")
+app.include_router(sensor_ingest.router, prefix="/api/v1")
 app.include_router(alerts.router, prefix="/api/v1")
+app.include_router(thresholds.router, prefix="/api/v1")
+app.include_router(heartbeats.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
+app.include_router(telemetry.router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
@@ -26,8 +26,15 @@ def run_server():
         "--port", "8000"
     ])
 
+def run_listener():
+    """Run the TCP/UDP line-protocol listener without the HTTP API"""
+    print("Starting line-protocol listener...")
+    subprocess.run([sys.executable, "-m", "app.listener"])
+
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "install":
         install_dependencies()
+    elif len(sys.argv) > 1 and sys.argv[1] == "listener":
+        run_listener()
     else:
         run_server()
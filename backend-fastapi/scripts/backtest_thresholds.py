@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Backtest proposed thresholds against a pond's or farm's stored history.
+
+Each --threshold is "parameter:bound=value,...", with bounds among
+min_value, max_value, optimal_min, optimal_max and hysteresis_band. Without
+any, each pond's active thresholds are replayed.
+
+Usage:
+    python scripts/backtest_thresholds.py --pond-id <uuid> [--days 90] \\
+        [--threshold dissolved_oxygen:min_value=4,optimal_min=5] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import SENSOR_METRICS
+from app.schemas import BacktestThreshold
+from app.services.backtest import backtest_service
+
+
+def parse_threshold(spec: str) -> BacktestThreshold:
+    parameter, _, bounds = spec.partition(":")
+    if parameter not in SENSOR_METRICS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {parameter!r}")
+    try:
+        values = {
+            name.strip(): float(value)
+            for name, value in (item.split("=") for item in bounds.split(",") if item)
+        }
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad bounds in {spec!r}")
+    return BacktestThreshold(parameter=parameter, **values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--pond-id", type=uuid.UUID)
+    scope.add_argument("--farm-id", type=uuid.UUID)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--threshold", type=parse_threshold, action="append", dest="thresholds")
+    parser.add_argument("--cooldown-minutes", type=int)
+    parser.add_argument("--max-events", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    end = datetime.utcnow()
+    start = end - timedelta(days=args.days)
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        result = backtest_service.run(
+            db, start, end,
+            pond_id=args.pond_id,
+            farm_id=args.farm_id,
+            thresholds=args.thresholds,
+            cooldown_minutes=args.cooldown_minutes,
+            max_events=args.max_events
+        )
+        elapsed = time.perf_counter() - began
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(result, default=str, indent=2))
+        return
+
+    readings = sum(pond["readings"] for pond in result["ponds"])
+    print(f"{readings:,} readings from {start:%Y-%m-%d} to {end:%Y-%m-%d} in {elapsed:.2f}s")
+    for pond in result["ponds"]:
+        print(f"\npond {pond['pond_id']} ({pond['readings']:,} readings)")
+        for side in pond["results"]:
+            print(
+                f"  {side['parameter']:<18} {side['direction']:<4} {side['bound']:>8g} "
+                f"band {side['band']:<6g} violating {side['violating_readings']:>8,} "
+                f"crossings {side['crossings']:>6,} alerts {side['alerts']:>5,} "
+                f"total {side['total_duration_seconds'] / 3600:>8.1f}h"
+            )
+
+
+if __name__ == "__main__":
+    main()
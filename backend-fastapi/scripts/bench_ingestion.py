@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark sensor-data ingestion against a running API.
+
+Compares the single-row endpoint (one HTTP request and one transaction per
+reading) with the batch endpoint (one request and one transaction for all
+readings).
+
+Usage:
+    python scripts/bench_ingestion.py --pond-id <uuid> [--count 2000]
+"""
+
+import argparse
+import random
+import time
+
+import httpx
+
+
+def login(client: httpx.Client, email: str, password: str) -> str:
+    """Log in and return the session token"""
+    response = client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def make_readings(pond_id: str, count: int):
+    """Generate synthetic readings for one pond"""
+    return [
+        {
+            "pond_id": pond_id,
+            "temperature": round(random.uniform(20, 30), 2),
+            "ph_level": round(random.uniform(6.5, 8.5), 2),
+            "dissolved_oxygen": round(random.uniform(4, 9), 2),
+            "device_id": "bench-device",
+        }
+        for _ in range(count)
+    ]
+
+
+def bench_single(client: httpx.Client, token: str, readings) -> float:
+    """POST each reading on its own"""
+    start = time.perf_counter()
+    for reading in readings:
+        response = client.post("/api/v1/sensor-data/", params={"session_token": token}, json=reading)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def bench_batch(client: httpx.Client, token: str, readings, batch_size: int) -> float:
+    """POST readings through the batch endpoint"""
+    start = time.perf_counter()
+    for i in range(0, len(readings), batch_size):
+        response = client.post(
+            "/api/v1/sensor-data/batch",
+            params={"session_token": token},
+            json=readings[i:i + batch_size]
+        )
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sensor-data ingestion")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--pond-id", required=True)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=300) as client:
+        token = login(client, args.email, args.password)
+        readings = make_readings(args.pond_id, args.count)
+
+        single = bench_single(client, token, readings)
+        batch = bench_batch(client, token, readings, args.batch_size)
+
+    print(f"readings:    {args.count}")
+    print(f"single-row:  {single:.2f}s  ({args.count / single:,.0f} rows/s)")
+    print(f"batch:       {batch:.2f}s  ({args.count / batch:,.0f} rows/s)")
+    print(f"speedup:     {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark the fast list serialization against the pydantic path.
+
+For each list schema, builds synthetic rows, encodes them the way FastAPI
+does for `response_model=List[...]` (validate from attributes, then
+jsonable_encoder and json.dumps) and through `app.serialization`, asserts
+that both decode to the same JSON and reports rows per second for each.
+
+Usage:
+    python scripts/bench_serialization.py [--rows 20000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, get_args
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Alert, Farm, Pond, SensorData
+from app.schemas import AlertResponse, FarmResponse, PondResponse, SensorDataResponse
+from app.serialization import rows_response, schema_columns
+
+
+def synthetic_value(column, optional: bool, i: int):
+    """A plausible value for a column, or None now and then for optional fields"""
+    if optional and i % 3 == 0:
+        return None
+    enum_class = getattr(column.type, "enum_class", None)
+    if enum_class is not None:
+        return random.choice(list(enum_class))
+    if getattr(column.type, "as_uuid", False):
+        return uuid.uuid4()
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime(2024, 1, 1) + timedelta(seconds=i, microseconds=random.randint(0, 999999))
+    if python_type is float:
+        return round(random.uniform(0, 100), 3)
+    if python_type is int:
+        return random.randint(0, 5000)
+    if python_type is bool:
+        return random.random() < 0.5
+    return f"{column.name}-{i}"
+
+
+def build(model, schema, count: int):
+    """Matching ORM objects and Core-style row tuples"""
+    columns = schema_columns(model, schema)
+    optional = {
+        name: type(None) in get_args(field.annotation) for name, field in schema.model_fields.items()
+    }
+    rows, objects = [], []
+    for i in range(count):
+        values = {column.name: synthetic_value(column, optional[column.name], i) for column in columns}
+        rows.append(tuple(values[column.name] for column in columns))
+        objects.append(model(**values))
+    return rows, objects
+
+
+def pydantic_path(schema, objects) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    validated = adapter.validate_python(objects, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def fast_path(model, schema, rows) -> bytes:
+    return rows_response(rows, model, schema).body
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = [
+        (Farm, FarmResponse),
+        (Pond, PondResponse),
+        (Alert, AlertResponse),
+        (SensorData, SensorDataResponse),
+    ]
+
+    for model, schema in cases:
+        rows, objects = build(model, schema, args.rows)
+        slow, slow_elapsed = timed(pydantic_path, schema, objects)
+        fast, fast_elapsed = timed(fast_path, model, schema, rows)
+
+        if json.loads(slow) != json.loads(fast):
+            print(f"{schema.__name__}: MISMATCH")
+            sys.exit(1)
+
+        print(
+            f"{schema.__name__:<20} pydantic {args.rows / slow_elapsed:>10,.0f} rows/s   "
+            f"fast {args.rows / fast_elapsed:>10,.0f} rows/s   "
+            f"x{slow_elapsed / fast_elapsed:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
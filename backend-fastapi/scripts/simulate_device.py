@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Simulate a pond sensor that uploads readings in the compact binary format.
+
+Usage:
+    python scripts/simulate_device.py --pond-id <uuid> [--readings 600]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.binary_protocol import encode_frames
+
+
+def make_readings(count: int, interval: int):
+    """One reading every `interval` seconds, ending now"""
+    now = int(time.time())
+    start = now - count * interval
+    return [
+        {
+            "timestamp": start + i * interval,
+            "temperature": round(random.uniform(20, 30), 2),
+            "ph_level": round(random.uniform(6.5, 8.5), 2),
+            "dissolved_oxygen": round(random.uniform(4, 9), 2),
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a binary-protocol pond sensor")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--pond-id", required=True)
+    parser.add_argument("--device-id", default="sim-device-1")
+    parser.add_argument("--readings", type=int, default=600)
+    parser.add_argument("--interval", type=int, default=60, help="seconds between readings")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    readings = make_readings(args.readings, args.interval)
+    body = encode_frames(args.pond_id, args.device_id, readings)
+    json_size = len(json.dumps([{"pond_id": args.pond_id, "device_id": args.device_id, **r} for r in readings]))
+    print(f"binary: {len(body)} bytes, JSON equivalent: {json_size} bytes")
+
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        login = client.post("/api/v1/auth/login", json={"email": args.email, "password": args.password})
+        login.raise_for_status()
+        response = client.post(
+            "/api/v1/sensor-data/binary",
+            params={"session_token": login.json()["access_token"]},
+            content=body,
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        response.raise_for_status()
+        print(response.json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import uuid
+
+import pytest
+
+# Tests touching the database need a throwaway PostgreSQL database; its
+# tables are dropped and recreated for the session
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app import models  # noqa: F401 - registers the tables
+    from app.database import Base, engine
+    from app.services.partitions import partition_manager
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    partition_manager.run_maintenance()
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db(engine):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def pond(db):
+    from app.models import Farm, Pond, User
+
+    user = User(
+        email=f"{uuid.uuid4().hex}@example.com", password_hash="x", first_name="Test", last_name="User"
+    )
+    farm = Farm(name="Test farm")
+    db.add_all([user, farm])
+    db.flush()
+    pond = Pond(farm_id=farm.id, user_id=user.id, name="Test pond")
+    db.add(pond)
+    db.commit()
+    return pond
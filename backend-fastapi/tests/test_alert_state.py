@@ -0,0 +1,131 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import Alert, AlertSeverity, AlertType, SensorData, Threshold
+from app.services import alert_state
+from app.services.alert_state import AlertChanges, AlertTracker, Violation
+from app.services.ingestion import ingestion_service
+from app.services.thresholds import threshold_engine
+
+POND = uuid.uuid4()
+HIGH = Violation(AlertType.TEMPERATURE_HIGH, AlertSeverity.MEDIUM, "high", 30.0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(alert_state, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def tracker(clock):
+    return AlertTracker(hysteresis_fraction=0.05, hysteresis_bands={}, cooldown_minutes=10, renotify_check_minutes=5)
+
+
+def observe(tracker, value, violation):
+    changes = AlertChanges()
+    tracker.observe(
+        changes, POND, "temperature", value, violation, 1.0,
+        lambda: {"id": uuid.uuid4(), "farm_id": uuid.uuid4(), "pond_id": POND}
+    )
+    return changes
+
+
+def test_persisting_violation_updates_the_open_alert(tracker):
+    opened = observe(tracker, 35.0, HIGH)
+    again = observe(tracker, 36.0, HIGH)
+
+    assert len(opened.inserts) == 1
+    assert not again.inserts
+    assert again.updates == [{
+        "b_id": opened.inserts[0]["id"], "b_value": 36.0, "b_threshold": 30.0, "b_severity": AlertSeverity.MEDIUM
+    }]
+
+
+def test_condition_clears_only_past_the_hysteresis_band(tracker):
+    observe(tracker, 35.0, HIGH)
+
+    observe(tracker, 29.5, None)
+    assert tracker.is_open(POND, "temperature")
+
+    observe(tracker, 28.9, None)
+    assert not tracker.is_open(POND, "temperature")
+
+
+def test_violation_within_the_cooldown_reopens_the_alert(tracker, clock):
+    opened = observe(tracker, 35.0, HIGH)
+    observe(tracker, 25.0, None)
+
+    clock.now += 9 * 60
+    reopened = observe(tracker, 33.0, HIGH)
+
+    assert not reopened.inserts and not reopened.resolves
+    assert reopened.updates[0]["b_id"] == opened.inserts[0]["id"]
+    assert tracker.is_open(POND, "temperature")
+
+
+def test_violation_after_the_cooldown_resolves_the_cleared_alert(tracker, clock):
+    opened = observe(tracker, 35.0, HIGH)
+    observe(tracker, 25.0, None)
+
+    clock.now += 11 * 60
+    again = observe(tracker, 33.0, HIGH)
+
+    assert again.resolves == [opened.inserts[0]["id"]]
+    assert len(again.inserts) == 1
+    assert again.inserts[0]["id"] != opened.inserts[0]["id"]
+
+
+def test_cleared_alert_is_resolved_once_the_cooldown_lapses(tracker, clock):
+    opened = observe(tracker, 35.0, HIGH)
+    observe(tracker, 25.0, None)
+
+    clock.now += 9 * 60
+    assert not observe(tracker, 25.0, None).resolves
+
+    clock.now += 2 * 60
+    assert observe(tracker, 25.0, None).resolves == [opened.inserts[0]["id"]]
+    assert not tracker.states
+
+
+def test_escalation_raises_severity_and_notifies(tracker, clock):
+    opened = observe(tracker, 35.0, HIGH)
+
+    clock.now += 1
+    escalated = observe(tracker, 40.0, Violation(AlertType.TEMPERATURE_HIGH, AlertSeverity.CRITICAL, "high", 30.0))
+
+    alert_id = opened.inserts[0]["id"]
+    assert escalated.updates[0]["b_severity"] == AlertSeverity.CRITICAL
+    assert escalated.notify == [(alert_id, (POND, "temperature", AlertType.TEMPERATURE_HIGH), True)]
+    assert tracker.escalated == 1
+
+    # A lower severity afterwards does not downgrade the open alert
+    assert observe(tracker, 35.0, HIGH).updates[0]["b_severity"] == AlertSeverity.CRITICAL
+
+
+def ingest_temperature(db, pond, value, timestamp):
+    rows = ingestion_service.rows_from_readings(
+        [{"pond_id": pond.id, "temperature": value, "timestamp": timestamp}], pond.user_id
+    )
+    return ingestion_service.ingest(db, rows)
+
+
+def test_consecutive_violations_update_the_open_alert(db, pond):
+    db.add(Threshold(pond_id=pond.id, parameter="temperature", min_value=10, max_value=30))
+    db.commit()
+    threshold_engine.index.load(db)
+    threshold_engine.tracker.load(db)
+
+    start = datetime.utcnow()
+    assert ingest_temperature(db, pond, 35.0, start) == 1
+    assert ingest_temperature(db, pond, 36.0, start + timedelta(seconds=10)) == 1
+
+    alerts = db.query(Alert).filter(Alert.pond_id == pond.id).all()
+    assert len(alerts) == 1
+    assert alerts[0].current_value == 36.0
+    assert not alerts[0].is_resolved
+    assert db.query(SensorData).filter(SensorData.pond_id == pond.id).count() == 2
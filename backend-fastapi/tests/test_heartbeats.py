@@ -0,0 +1,54 @@
+import time
+import uuid
+
+import pytest
+
+from app.services import heartbeats
+from app.services.alert_state import AlertTracker
+from app.services.heartbeats import HeartbeatMonitor
+
+
+class UnreachableSession:
+    def query(self, *entities):
+        raise ConnectionError("database is down")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_due_devices_are_retried_after_a_failed_check(monkeypatch):
+    tracker = AlertTracker(hysteresis_fraction=0.05, hysteresis_bands={}, cooldown_minutes=10, renotify_check_minutes=5)
+    monitor = HeartbeatMonitor(
+        tracker, default_interval=60, missed_intervals=3, tick_seconds=5, reload_seconds=60, seed_hours=24
+    )
+    monitor.intervals_loaded_at = time.monotonic()
+    key = (uuid.uuid4(), "probe-1")
+    with monitor._lock:
+        monitor._observe(key, time.time() - 600, time.time(), allow_overdue=True)
+    monkeypatch.setattr(heartbeats, "SessionLocal", UnreachableSession)
+
+    with pytest.raises(ConnectionError):
+        monitor.check()
+
+    assert not monitor.devices[key].offline
+    assert [device.key for device in monitor.pop_due(time.time())] == [key]
+
+
+def test_monitors_of_different_processes_raise_the_same_offline_alert():
+    pond_id, farm_id = uuid.uuid4(), uuid.uuid4()
+    seen = time.time() - 600
+    alert_ids = set()
+    for _ in range(2):
+        tracker = AlertTracker(hysteresis_fraction=0.05, hysteresis_bands={}, cooldown_minutes=10, renotify_check_minutes=5)
+        monitor = HeartbeatMonitor(
+            tracker, default_interval=60, missed_intervals=3, tick_seconds=5, reload_seconds=60, seed_hours=24
+        )
+        monitor.pond_farms[pond_id] = farm_id
+        with monitor._lock:
+            monitor._observe((pond_id, "probe-1"), seen, time.time(), allow_overdue=True)
+        alert_ids.add(monitor.build_alert(monitor.devices[(pond_id, "probe-1")], 600.0)["id"])
+
+    assert len(alert_ids) == 1
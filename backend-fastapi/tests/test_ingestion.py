@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from app.models import SensorData
+from app.schemas import SensorDataCreate
+from app.services.ingestion import ingestion_service
+from app.services.rollups import floor_timestamp
+
+
+def test_offset_timestamps_are_stored_as_naive_utc():
+    reading = SensorDataCreate(pond_id=uuid.uuid4(), temperature=24.5, timestamp="2024-05-01T14:00:00+02:00")
+
+    row = ingestion_service.prepare_row(reading, uuid.uuid4())
+
+    assert row["timestamp"] == datetime(2024, 5, 1, 12, 0)
+    assert floor_timestamp(row["timestamp"], 3600) == datetime(2024, 5, 1, 12, 0)
+
+
+def test_ingest_accepts_z_timestamps(db, pond):
+    reading = SensorDataCreate(pond_id=pond.id, temperature=24.5, timestamp="2024-05-01T12:00:00.123Z")
+
+    assert ingestion_service.ingest(db, [ingestion_service.prepare_row(reading, pond.user_id)]) == 1
+
+    stored = db.query(SensorData).filter(SensorData.pond_id == pond.id).one()
+    assert stored.timestamp == datetime(2024, 5, 1, 12, 0, 0, 123000)
@@ -0,0 +1,52 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import schedules
+from app.services.alert_state import AlertTracker
+from app.services.schedules import FEEDING, PondScheduler, ScheduleError, parse_schedule
+
+
+class UnreachableSession:
+    def query(self, *entities):
+        raise ConnectionError("database is down")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_scheduler():
+    tracker = AlertTracker(hysteresis_fraction=0.05, hysteresis_bands={}, cooldown_minutes=10, renotify_check_minutes=5)
+    return PondScheduler(tracker, default_timezone="UTC", batch_window_seconds=60)
+
+
+def test_failed_batch_is_put_back_on_the_heap(monkeypatch):
+    scheduler = make_scheduler()
+    pond_id = uuid.uuid4()
+    with scheduler._lock:
+        scheduler._set(pond_id, parse_schedule("07:00, 18:00"), datetime(2024, 5, 1, 6, 0))
+    due = scheduler.pop_due(datetime(2024, 5, 1, 7, 0))
+    assert [(at, kind) for at, _, kind, _ in due] == [(datetime(2024, 5, 1, 7, 0), FEEDING)]
+    monkeypatch.setattr(schedules, "SessionLocal", UnreachableSession)
+
+    with pytest.raises(ConnectionError):
+        scheduler.fire(due)
+
+    assert scheduler.pop_due(datetime(2024, 5, 1, 7, 0)) == due
+
+
+@pytest.mark.parametrize("every_days", [0, 0.00001, 1.5, -7, "nan", "inf", 100000])
+def test_maintenance_repeats_in_whole_days(every_days):
+    with pytest.raises(ScheduleError):
+        parse_schedule('{"maintenance": {"every_days": %s}}' % json.dumps(every_days))
+
+
+def test_maintenance_every_whole_days_is_accepted():
+    schedule = parse_schedule('{"maintenance": {"every_days": 14, "start": "2024-01-01"}}')
+
+    assert schedule.maintenance_every == timedelta(days=14)
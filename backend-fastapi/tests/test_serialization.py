@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime
+from typing import List
+
+import orjson
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import Boolean, DateTime, Enum, Float, Integer
+
+from app.models import Alert, Farm, Pond, SensorData
+from app.schemas import AlertResponse, FarmResponse, PondResponse, SensorDataResponse
+from app.serialization import json_bytes, rows_response, rows_to_dicts, schema_columns
+
+MODELS = [
+    (Farm, FarmResponse),
+    (Pond, PondResponse),
+    (SensorData, SensorDataResponse),
+    (Alert, AlertResponse),
+]
+
+
+def database_value(column, seed: int):
+    """A value of the kind the database driver returns for `column`"""
+    column_type = column.type
+    if isinstance(column_type, Enum):
+        members = list(column_type.enum_class)
+        return members[seed % len(members)]
+    if isinstance(column_type, DateTime):
+        return datetime(2024, 5, 1, 12, 30, 15, 123456 * (seed % 2))
+    if isinstance(column_type, Boolean):
+        return bool(seed % 2)
+    if isinstance(column_type, Integer):
+        return 10 + seed
+    if isinstance(column_type, Float):
+        return 1.25 + seed
+    if column.name == "id" or (column.name.endswith("_id") and column.name != "device_id"):
+        return uuid.uuid4()
+    return f"{column.name} {seed}"
+
+
+def make_rows(model, schema, nulls: bool):
+    rows = []
+    for seed in range(3):
+        row = []
+        for column in schema_columns(model, schema):
+            field = schema.model_fields[column.name]
+            if nulls and not field.is_required() and field.default is None:
+                row.append(None)
+            else:
+                row.append(database_value(column, seed))
+        rows.append(tuple(row))
+    return rows
+
+
+@pytest.mark.parametrize("nulls", [False, True])
+@pytest.mark.parametrize("model,schema", MODELS, ids=[schema.__name__ for _, schema in MODELS])
+def test_fast_path_matches_pydantic(model, schema, nulls):
+    rows = make_rows(model, schema, nulls)
+    adapter = TypeAdapter(List[schema])
+
+    fast = orjson.loads(rows_response(rows, model, schema).body)
+    cached = orjson.loads(json_bytes(rows_to_dicts(rows, model, schema)))
+
+    # The fast output is a valid response of the schema...
+    adapter.validate_python(fast)
+    # ...and identical to what FastAPI's pydantic serialization produces
+    expected = adapter.dump_python(adapter.validate_python(rows_to_dicts(rows, model, schema)), mode="json")
+    assert fast == expected
+    assert cached == expected
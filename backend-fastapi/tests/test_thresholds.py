@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.models import AlertSeverity, AlertType
+from app.services.alert_state import alert_tracker
+from app.services.thresholds import ThresholdEngine, ThresholdIndex, ThresholdRule
+
+
+def make_engine(pond_id):
+    threshold = SimpleNamespace(
+        id=uuid.uuid4(), pond_id=pond_id, parameter="temperature",
+        min_value=10.0, max_value=30.0, optimal_min=None, optimal_max=None
+    )
+    index = ThresholdIndex(reload_seconds=60)
+    index.rules = {pond_id: {"temperature": ThresholdRule(threshold)}}
+    index.pond_farms = {pond_id: uuid.uuid4()}
+    return ThresholdEngine(index, alert_tracker)
+
+
+def readings(pond_id, *values):
+    start = datetime(2024, 5, 1, 12, 0)
+    return [
+        {"id": uuid.uuid4(), "pond_id": pond_id, "temperature": value, "timestamp": start + timedelta(seconds=i)}
+        for i, value in enumerate(values)
+    ]
+
+
+def test_excursion_recovered_within_a_batch_is_reported():
+    pond_id = uuid.uuid4()
+    engine = make_engine(pond_id)
+
+    rule, row, value, violation = engine.evaluate(readings(pond_id, 25.0, 34.0, 36.0, 24.0))[(pond_id, "temperature")]
+
+    assert value == 36.0
+    assert violation.alert_type == AlertType.TEMPERATURE_HIGH
+    assert violation.severity == AlertSeverity.HIGH
+    assert violation.bound == 30.0
+
+
+def test_batch_without_violation_uses_the_latest_reading():
+    pond_id = uuid.uuid4()
+    engine = make_engine(pond_id)
+
+    rule, row, value, violation = engine.evaluate(readings(pond_id, 25.0, 22.0))[(pond_id, "temperature")]
+
+    assert value == 22.0
+    assert violation is None